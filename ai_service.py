@@ -0,0 +1,414 @@
+"""Headless Gemini helpers shared by the Streamlit UI and background jobs
+
+Nothing in this module touches Streamlit, so it is safe to call from worker threads.
+"""
+import logging
+import os
+import re
+import time
+from typing import Callable, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from google import genai
+from google.genai import types
+
+import metrics
+from response_cache import ResponseCache, make_cache_key
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Gemini models used for company insights / chat and for news
+INSIGHTS_MODEL = "gemini-2.5-flash"
+NEWS_MODEL = "gemini-2.5-pro"
+
+# Idle connections to the Gemini API are kept open this long for reuse
+KEEPALIVE_SECONDS = 120
+
+# Coalesces identical in-flight Gemini calls across every session in this process
+SINGLE_FLIGHT = SingleFlight()
+
+# System instruction used for flash responses (no thinking for speed)
+CONCISE_INSTRUCTION = "Provide direct, concise responses without internal reasoning steps."
+
+
+def get_api_key() -> Optional[str]:
+    """API key from the environment; GOOGLE_API_KEY (new SDK standard) or GEMINI_API_KEY (legacy)"""
+    return os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')
+
+
+def create_client(api_key: str = None, pool_size: int = 20) -> genai.Client:
+    """Create a Gemini client with a keep-alive connection pool, reading the API key from the environment if not given
+    
+    Create one per process and share it: each client owns its own HTTP connection pool.
+    """
+    http_options = types.HttpOptions(
+        client_args={
+            'limits': httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=KEEPALIVE_SECONDS,
+            ),
+        },
+    )
+    return genai.Client(api_key=api_key or get_api_key(), http_options=http_options)
+
+
+def build_company_info_prompt(company_name: str) -> str:
+    """Prompt for the verified company overview shown on the details page"""
+    return f"""You are an AI research assistant providing factual, verifiable information about investment companies.
+
+**CRITICAL REQUIREMENTS - NO HALLUCINATION ALLOWED:**
+
+1. **VERIFICATION MANDATE**: Every single fact, figure, investment, or claim you make about "{company_name}" MUST be verifiable from real, current sources
+2. **NO FABRICATION**: Do not invent portfolio companies, investment amounts, dates, or any other details
+3. **SOURCE VERIFICATION**: If you cannot find verifiable information about something, explicitly state "Information not available" rather than guessing
+4. **CURRENT DATA ONLY**: Use only recent, verifiable information - do not rely on potentially outdated training data
+5. **CONSERVATIVE APPROACH**: When in doubt, provide less information rather than potentially incorrect information
+
+**OBJECTIVE:**
+Provide comprehensive, factual information about "{company_name}" in the following format:
+
+## About the Company
+[Provide a verifiable overview focusing on: founding year (if verifiable), headquarters location, key founders/leaders (if verifiable), and core mission. Only include information you can verify through current sources. 3-4 sentences maximum.]
+
+## What They Do  
+[Describe their verified investment focus, confirmed sectors of operation, and documented strategies. Only mention specific sectors, deal types, or strategies you can verify. 3-4 sentences maximum.]
+
+## Major Investments
+[List ONLY verified, documented portfolio companies or investments. Each entry must include:
+- Company name (verified)
+- Brief description of what the company does
+- Investment type/date if verifiable
+- Do NOT fabricate investment amounts or dates
+- If fewer than 5 verified investments are found, list only what you can verify
+- If no specific investments can be verified, state "Specific portfolio investments require verification"]
+
+**FORMATTING REQUIREMENTS:**
+- Use proper markdown formatting
+- Be direct and factual
+- Include disclaimer if information is limited
+- Prioritize accuracy over completeness
+
+**SOURCES PRIORITY ORDER:**
+1. Official company website and press releases
+2. SEC filings and regulatory documents  
+3. Major financial news publications (Bloomberg, Reuters, WSJ)
+4. Verified industry publications (Private Equity International, PE Hub)
+
+Remember: It is better to provide limited verified information than extensive unverified claims."""
+
+
+def build_news_prompt(company_name: str) -> str:
+    """Prompt for recent, verifiable news about the company"""
+    return f"""Find REAL, VERIFIABLE news articles about "{company_name}" from the last 6 months.
+
+**CRITICAL REQUIREMENT: NO HALLUCINATION**
+- Every URL must be real and working
+- Every headline must be from an actual article
+- Every date must be accurate
+- If you cannot find real articles, say "No verified news articles found"
+
+**RESEARCH TASK:**
+Find recent news articles about "{company_name}" (the investment firm/private equity company) from the last 6 months focusing on:
+1. Major acquisitions or investments
+2. Fund closings or capital raises
+3. Strategic partnerships
+4. Executive appointments or leadership changes
+5. Portfolio company activities
+
+**OUTPUT REQUIREMENTS:**
+- Maximum 3 articles (for speed)
+- Only include articles you can verify exist
+- Use clean markdown formatting
+- No bracketed numbers [1], [2], etc. in headlines or URLs
+- Include working links only
+
+**FORMAT:**
+
+### [Actual Headline]
+**Source:** [Real Publication Name]  
+**Date:** [Actual Date]  
+**Link:** [Working URL]  
+**Summary:** [Brief factual summary]
+
+**VERIFICATION STANDARD:**
+Think through each article you want to include. Can you verify this is a real article from a real source? If not, don't include it. Better to find 2 real articles than 5 fake ones.
+
+Please research and provide real news about {company_name}."""
+
+
+# Every cleanup rule as one alternation, applied in a single left-to-right pass. The pattern
+# starts with a character class so the regex engine only tries positions that can begin a
+# match; each rule's left side is then checked by lookbehind and its right side by lookahead,
+# so the match is just the text that gets a space appended.
+MONEY_UNIT = r'(?=million|billion|Million|Billion)'
+CAPITALIZED = r'(?=[A-Z][a-z])'
+CLEANUP_PATTERN = re.compile(
+    r'[\d$atuv](?:'
+    # "1-50million" -> "1-50 million", "50million" -> "50 million" (from the start of the number)
+    rf'(?<=\d)(?<!\d\d)\d*(?:[-–]\d+)?{MONEY_UNIT}'
+    # Number followed by a capitalized word
+    rf'|(?<=\d){CAPITALIZED}'
+    # "$5B" -> "$5 B"
+    r'|(?<=\$)\d+(?=[a-zA-Z])'
+    # Glued words like "andEnterprise" -> "and Enterprise"
+    rf'|(?<=a)nd{CAPITALIZED}|(?<=t)o{CAPITALIZED}|(?<=u)p{CAPITALIZED}|(?<=v)alues{CAPITALIZED}'
+    r')'
+)
+
+
+def _cleanup_replacement(match: re.Match) -> str:
+    return match.group().replace('–', '-') + " "
+
+
+def clean_response_text(result: str) -> str:
+    """Fix monetary spacing and glued words that Gemini tends to produce
+    
+    Same rules as the former one-regex-per-rule version, except that a glued word directly
+    following another fix ("andTandMillion") is now split as well.
+    """
+    return CLEANUP_PATTERN.sub(_cleanup_replacement, result)
+
+
+class StreamingCleaner:
+    """Applies clean_response_text to streamed chunks without rescanning earlier text
+
+    No cleanup rule spans whitespace, so everything up to the last whitespace seen is
+    final; only the trailing partial word is held back until more text arrives.
+    """
+
+    def __init__(self):
+        self._cleaned = ""
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk; returns the cleaned text so far followed by the raw pending tail"""
+        pending = self._pending + chunk
+        cut = max(pending.rfind(' '), pending.rfind('\n'), pending.rfind('\t')) + 1
+        if cut:
+            self._cleaned += clean_response_text(pending[:cut])
+        self._pending = pending[cut:]
+        return self._cleaned + self._pending
+
+    def finish(self) -> str:
+        """Flush the held-back tail and return the whole cleaned text"""
+        self._cleaned += clean_response_text(self._pending)
+        self._pending = ""
+        return self._cleaned
+
+
+def collect_citation_urls(supports, chunks) -> List[str]:
+    """Unique web source URLs referenced by grounding supports, in first-cited order"""
+    urls = {}
+    chunk_count = len(chunks)
+    for support in supports:
+        for chunk_idx in getattr(support, 'grounding_chunk_indices', None) or ():
+            if chunk_idx >= chunk_count:
+                continue
+            web = getattr(chunks[chunk_idx], 'web', None)
+            uri = web.uri if web else None
+            # Filter out Google Vertex AI search URLs and get actual sources
+            if uri and 'vertexaisearch.cloud.google.com' not in uri:
+                urls[uri] = None
+    return list(urls)
+
+
+def format_sources(urls: List[str]) -> str:
+    """Numbered markdown Sources section for the given URLs"""
+    lines = ["\n\n## Sources"]
+    for i, uri in enumerate(urls, 1):
+        try:
+            domain = urlparse(uri).netloc.replace('www.', '') or uri
+            lines.append(f"{i}. [{domain}]({uri})")
+        except ValueError:
+            lines.append(f"{i}. [Source]({uri})")
+    return "\n".join(lines) + "\n"
+
+
+def add_wikipedia_style_citations(response, text: str = None) -> str:
+    """Add clean Wikipedia-style citations without affecting the main text"""
+    if not response or not hasattr(response, 'text'):
+        return ""
+    
+    if text is None:
+        text = response.text
+    if not text:
+        return ""
+    
+    # Check if response has grounding data
+    try:
+        candidates = getattr(response, 'candidates', None)
+        grounding_metadata = getattr(candidates[0], 'grounding_metadata', None) if candidates else None
+        supports = getattr(grounding_metadata, 'grounding_supports', None) if grounding_metadata else None
+        chunks = getattr(grounding_metadata, 'grounding_chunks', None) if grounding_metadata else None
+        if not supports or not chunks:
+            return text
+        
+        # Only add sources section at the end if we have real URLs
+        citation_urls = collect_citation_urls(supports, chunks)
+        return text + format_sources(citation_urls) if citation_urls else text
+        
+    except Exception as e:
+        logger.error(f"Error processing citations: {str(e)}")
+        return text
+
+
+def build_grounded_config(system_instruction: str = None, cached_content: str = None,
+                          search: bool = True) -> types.GenerateContentConfig:
+    """Generation config with Google Search grounding enabled (unless search is False)
+    
+    With cached_content the tools and system instruction come from the context cache,
+    since Gemini rejects requests that set them alongside a cache.
+    """
+    if cached_content:
+        return types.GenerateContentConfig(
+            cached_content=cached_content,
+            response_modalities=["TEXT"]
+        )
+
+    if not search:
+        return types.GenerateContentConfig(
+            response_modalities=["TEXT"],
+            system_instruction=system_instruction
+        )
+
+    # Define the grounding tool
+    grounding_tool = types.Tool(
+        google_search=types.GoogleSearch()
+    )
+
+    return types.GenerateContentConfig(
+        tools=[grounding_tool],
+        response_modalities=["TEXT"],
+        system_instruction=system_instruction
+    )
+
+
+def generate_grounded_text(client, model: str, prompt: str, system_instruction: str = None,
+                           clean: bool = False, on_text: Callable[[str], None] = None,
+                           cached_content: str = None, search: bool = True) -> Optional[str]:
+    """Call Gemini with Google Search grounding and return the text with a Sources section
+    
+    When on_text is given the response is streamed and on_text receives the accumulated
+    text (cleaned as it arrives when clean is set) after every chunk; citations are added
+    to the finished text only.
+    cached_content names a Gemini context cache to answer against (see chat_context).
+    search=False answers from the prompt alone, without Google Search.
+    Returns None for an empty response; API errors are raised to the caller.
+    """
+    config = build_grounded_config(system_instruction, cached_content, search)
+
+    with metrics.timer('gemini_request_seconds', model=model, mode='unary' if on_text is None else 'stream') as timing:
+        if on_text is None:
+            response = client.models.generate_content(
+                model=model,
+                contents=prompt,
+                config=config,
+            )
+            raw_text = response.text if response else None
+            record_usage(model, getattr(response, 'usage_metadata', None))
+        else:
+            # Streamed text is cleaned chunk by chunk, so it needs no second pass below
+            response, raw_text = stream_content(client, model, prompt, config, on_text, clean=clean)
+        if not response or not raw_text:
+            timing.labels['status'] = 'empty'
+
+    if not response or not raw_text:
+        logger.warning(f"⚠️ Empty response from {model}")
+        return None
+
+    text = raw_text.strip()
+    logger.info(f"✅ Raw response received from {model}, length: {len(text)} characters")
+    if clean and on_text is None:
+        text = clean_response_text(text)
+    return add_wikipedia_style_citations(response, text)
+
+
+def record_usage(model: str, usage) -> None:
+    """Record prompt, output, cached and thinking token counts of one call"""
+    if usage is None or not metrics.REGISTRY.enabled:
+        return
+    for kind, attribute in (('prompt', 'prompt_token_count'), ('output', 'candidates_token_count'),
+                            ('cached', 'cached_content_token_count'), ('thoughts', 'thoughts_token_count')):
+        count = getattr(usage, attribute, None)
+        if count:
+            metrics.observe('gemini_tokens', count, model=model, kind=kind)
+            metrics.inc('gemini_tokens_total', count, model=model, kind=kind)
+
+
+def stream_content(client, model: str, prompt: str, config: types.GenerateContentConfig,
+                   on_text: Callable[[str], None], clean: bool = False):
+    """Stream a response, reporting partial text; returns (grounded chunk, full text)
+    
+    With clean the text (partial and final) goes through clean_response_text incrementally.
+    """
+    start = time.perf_counter()
+    text = ""
+    cleaner = StreamingCleaner() if clean else None
+    grounded_chunk = None
+    last_chunk = None
+
+    for chunk in client.models.generate_content_stream(model=model, contents=prompt, config=config):
+        last_chunk = chunk
+        # Grounding metadata arrives on the final chunk(s); keep it for the Sources section
+        if chunk.candidates and getattr(chunk.candidates[0], 'grounding_metadata', None):
+            grounded_chunk = chunk
+        if not chunk.text:
+            continue
+        if not text:
+            first_token_seconds = time.perf_counter() - start
+            logger.info(f"⏱️ time_to_first_token model={model} seconds={first_token_seconds:.3f}")
+            metrics.observe('gemini_time_to_first_token_seconds', first_token_seconds, model=model)
+        text = cleaner.feed(chunk.text) if cleaner else text + chunk.text
+        on_text(text)
+
+    if cleaner:
+        text = cleaner.finish()
+    # Token counts are reported on the last chunk
+    record_usage(model, getattr(last_chunk, 'usage_metadata', None))
+    logger.info(f"⏱️ stream_complete model={model} seconds={time.perf_counter() - start:.3f}")
+    return grounded_chunk or last_chunk, text
+
+
+def generate_cached(client, cache: Optional[ResponseCache], company_name: str, model: str, prompt: str,
+                    **kwargs) -> Optional[str]:
+    """Serve a company response from the shared cache, generating and storing it on a miss"""
+    key = make_cache_key(company_name, model, prompt)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info(f"🌐 Shared cache hit for key: {key}")
+            return cached
+
+    def generate() -> Optional[str]:
+        # A previous caller may have stored the response while this one was on its way in
+        if cache is not None:
+            cached = cache.peek(key)
+            if cached is not None:
+                return cached
+        text = generate_grounded_text(client, model, prompt, **kwargs)
+        if text and cache is not None:
+            cache.set(key, text, company_name)
+        return text
+
+    # Identical concurrent requests (e.g. 30 attendees opening one company) share one Gemini call
+    return SINGLE_FLIGHT.do(key, generate)
+
+
+def generate_company_info(client, company_name: str, cache: ResponseCache = None,
+                          on_text: Callable[[str], None] = None) -> Optional[str]:
+    """Generate the verified company overview for one investor"""
+    logger.info(f"🎯 Generating company info for: {company_name}")
+    prompt = build_company_info_prompt(company_name)
+    return generate_cached(client, cache, company_name, INSIGHTS_MODEL, prompt,
+                           system_instruction=CONCISE_INSTRUCTION, clean=True, on_text=on_text)
+
+
+def generate_news_articles(client, company_name: str, cache: ResponseCache = None,
+                           on_text: Callable[[str], None] = None) -> Optional[str]:
+    """Generate recent verified news for one investor using the Pro model with thinking"""
+    logger.info(f"📰 Generating news for: {company_name}")
+    prompt = build_news_prompt(company_name)
+    return generate_cached(client, cache, company_name, NEWS_MODEL, prompt, on_text=on_text)
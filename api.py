@@ -0,0 +1,369 @@
+"""Headless HTTP/JSON API over InvestorService for badge scanners, the mobile app and scripts
+
+    python api.py --port 8000        # or: uvicorn api:app --port 8000
+
+    GET  /health
+    GET  /api/search?q=accel&limit=10
+    GET  /api/suggest?q=acc&limit=10
+    GET  /api/companies/lookup?name=Accel-KKR
+    GET  /api/investors?type=Growth/Expansion&country=United States&dry_powder_min=1000&sort=-recent_investments
+    GET  /api/companies/{row_id}
+    GET  /api/companies/{row_id}/insights        ?stream=1 (or Accept: text/event-stream) for SSE
+    GET  /api/companies/{row_id}/news            same
+    GET  /api/companies/{row_id}/peers?limit=5   most similar investors in the list
+    POST /api/companies/{row_id}/chat            {"question": ..., "history": [...], "summary": {...}, "stream": false}
+    GET  /metrics                                Prometheus text when METRICS_ENABLED=1
+
+The event loop never waits on Gemini or pandas: service calls run on a pool of API_WORKERS
+threads, and every request shares the pooled Gemini client and the process-wide caches
+(also shared with the Streamlit app when both run in one process). Streaming endpoints send
+Server-Sent Events: `delta` events with new text, then a `done` event with the same JSON body
+the non-streaming call returns, or an `error` event. Chat is stateless: callers send the
+history and the `summary` returned by the previous answer.
+"""
+import argparse
+import asyncio
+import functools
+import hmac
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from google.genai import errors as genai_errors
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import metrics
+from dataset_reload import start_dataset_watcher
+from facets import FACETS, METRICS
+from peers import DEFAULT_PEERS
+from investor_data import investor_record
+from investor_service import InvestorService, create_investor_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 32
+MAX_LIMIT = 50
+MAX_QUESTION_CHARS = 2000
+# Comment lines keep idle SSE connections open through proxies while Gemini thinks
+SSE_KEEPALIVE_SECONDS = 15
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+class ApiError(Exception):
+    """Error returned to the caller as {"error": message} with an HTTP status"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def investor_json(row_id: int, investor) -> Dict:
+    return {'row_id': row_id, **investor_record(investor)}
+
+
+def gemini_error(error: Exception) -> ApiError:
+    """HTTP error for a failed Gemini call; quota errors stay 429 so clients back off"""
+    if isinstance(error, RuntimeError) and "not initialized" in str(error):
+        return ApiError(503, "Gemini API key not configured")
+    if isinstance(error, genai_errors.APIError) and error.code == 429:
+        return ApiError(429, "Gemini quota exhausted, retry later")
+    return ApiError(502, f"Gemini request failed: {str(error)}")
+
+
+def sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def query_limit(request: Request, default: int = 10) -> int:
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except ValueError:
+        raise ApiError(400, "limit must be an integer")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def facet_query(request: Request) -> Dict:
+    """FacetIndex.query arguments from ?<facet>=value (repeatable), ?<metric>_min/_max and ?sort=[-]metric"""
+    params = request.query_params
+    selected = {facet: params.getlist(facet) for facet in FACETS if params.getlist(facet)}
+    ranges = {}
+    try:
+        for metric in METRICS:
+            low, high = params.get(f'{metric}_min'), params.get(f'{metric}_max')
+            if low is not None or high is not None:
+                ranges[metric] = (float(low) if low else None, float(high) if high else None)
+        offset = max(0, int(params.get('offset', 0)))
+    except ValueError:
+        raise ApiError(400, "offset and metric bounds must be numbers")
+    sort = params.get('sort', '')
+    if sort and sort.lstrip('-') not in METRICS:
+        raise ApiError(400, f"sort must be one of {', '.join(METRICS)}, optionally prefixed with -")
+    return {'selected': selected, 'ranges': ranges, 'sort_by': sort.lstrip('-') or None,
+            'descending': sort.startswith('-'), 'limit': query_limit(request), 'offset': offset}
+
+
+def wants_stream(request: Request) -> bool:
+    return (request.query_params.get('stream', '').lower() in ('1', 'true', 'yes')
+            or 'text/event-stream' in request.headers.get('accept', ''))
+
+
+class TokenAuthMiddleware:
+    """Require `Authorization: Bearer <API_TOKEN>` on /api/ routes when a token is configured"""
+
+    def __init__(self, app, token: Optional[str]):
+        self.app = app
+        self.expected = f"Bearer {token}".encode() if token else None
+
+    async def __call__(self, scope, receive, send):
+        if self.expected and scope['type'] == 'http' and scope['path'].startswith('/api/'):
+            provided = dict(scope['headers']).get(b'authorization', b'')
+            if not hmac.compare_digest(provided, self.expected):
+                await JSONResponse({'error': "Unauthorized"}, status_code=401)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def create_app(service: InvestorService = None, workers: int = None) -> Starlette:
+    """API application; the service is created from the environment at startup unless given"""
+    executor = ThreadPoolExecutor(max_workers=workers or int(os.getenv('API_WORKERS', DEFAULT_WORKERS)),
+                                  thread_name_prefix="api")
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        metrics.configure_from_env()
+        watcher = None
+        if app.state.service is None:
+            app.state.service = await asyncio.get_running_loop().run_in_executor(executor, create_investor_service)
+            # Row ids stay valid across reloads, so clients can keep the ones they hold
+            watcher = start_dataset_watcher(app.state.service)
+        app.state.service.warm_peer_index()
+        if app.state.service.client is None:
+            logger.warning("⚠️ No Gemini API key: insights, news and chat will return 503")
+        logger.info(f"🌐 API ready with {len(app.state.service.df)} investors")
+        yield
+        if watcher is not None:
+            watcher.stop()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(fn: Callable, *args, **kwargs):
+        """Run a blocking service call on the worker pool"""
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+    def get_service(request: Request) -> InvestorService:
+        return request.app.state.service
+
+    def company(request: Request):
+        """(row_id, investor row) from the path, or 404"""
+        row_id = request.path_params['row_id']
+        investor = get_service(request).investor(row_id)
+        if investor is None:
+            raise ApiError(404, f"No investor with row_id {row_id}")
+        return row_id, investor
+
+    async def stream_events(fn: Callable, args: tuple, done: Callable[[Optional[str]], Dict]) -> AsyncIterator[str]:
+        """SSE events for a call that reports accumulated text through on_text"""
+        loop = asyncio.get_running_loop()
+        updates: asyncio.Queue = asyncio.Queue()
+
+        def on_text(partial_text: str):
+            loop.call_soon_threadsafe(updates.put_nowait, partial_text)
+
+        future = loop.run_in_executor(executor, functools.partial(fn, *args, on_text=on_text))
+        # Partial text is queued from the worker before the call returns, so None comes last
+        future.add_done_callback(lambda _: updates.put_nowait(None))
+
+        sent = ""
+        while True:
+            try:
+                partial_text = await asyncio.wait_for(updates.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if partial_text is None:
+                break
+            if partial_text.startswith(sent):
+                if len(partial_text) > len(sent):
+                    yield sse('delta', {'text': partial_text[len(sent):]})
+            else:
+                # Cleanup rewrote text that was already sent; replace it on the client
+                yield sse('snapshot', {'text': partial_text})
+            sent = partial_text
+
+        try:
+            result = future.result()
+        except Exception as e:
+            error = gemini_error(e)
+            logger.error(f"❌ Streaming request failed: {str(e)}")
+            yield sse('error', {'error': error.message, 'status': error.status_code})
+            return
+        yield sse('done', done(result))
+
+    async def health(request: Request) -> Response:
+        service = get_service(request)
+        return JSONResponse({'status': 'ok', 'investors': len(service.df) - len(service.removed_rows),
+                             'dataset_version': service.dataset_version, 'gemini': service.client is not None})
+
+    async def search(request: Request) -> Response:
+        query = request.query_params.get('q', '')
+        matches = await run(get_service(request).search, query, query_limit(request))
+        return JSONResponse({
+            'query': query,
+            'results': [
+                {'score': match['score'], 'matched_field': match['matched_field'], 'matched_value': match['matched_value'],
+                 'company': investor_json(match['row_id'], match['investor'])}
+                for match in matches
+            ],
+        })
+
+    async def suggest(request: Request) -> Response:
+        query = request.query_params.get('q', '')
+        return JSONResponse({'query': query, 'suggestions': await run(get_service(request).suggest, query, query_limit(request))})
+
+    async def lookup(request: Request) -> Response:
+        name = request.query_params.get('name', '')
+        service = get_service(request)
+        row_id = await run(service.lookup, name)
+        if row_id is None:
+            raise ApiError(404, f"No investor named {name!r}")
+        return JSONResponse(investor_json(row_id, service.investor(row_id)))
+
+    async def profile(request: Request) -> Response:
+        row_id, investor = company(request)
+        return JSONResponse(investor_json(row_id, investor))
+
+    async def investors(request: Request) -> Response:
+        result = await run(get_service(request).filter_investors, **facet_query(request))
+        return JSONResponse({
+            'total': result['total'],
+            'results': [investor_json(row_id, investor) for row_id, investor in zip(result['row_ids'], result['investors'])],
+            'facets': result['counts'],
+        })
+
+    async def peers(request: Request) -> Response:
+        row_id, _ = company(request)
+        matches = await run(get_service(request).peers, row_id, query_limit(request, DEFAULT_PEERS))
+        return JSONResponse({
+            'row_id': row_id,
+            'peers': [{'similarity': peer['similarity'], 'company': investor_json(peer['row_id'], peer['investor'])}
+                      for peer in matches],
+        })
+
+    def generated_text_endpoint(method: str, field: str):
+        """Insights or news for a company, as JSON or SSE"""
+        async def endpoint(request: Request) -> Response:
+            row_id, investor = company(request)
+            company_name = investor['Investors']
+            generate = getattr(get_service(request), method)
+            done = lambda text: {'row_id': row_id, 'company': company_name, field: text}
+            if wants_stream(request):
+                return StreamingResponse(stream_events(generate, (company_name,), done),
+                                         media_type='text/event-stream', headers=SSE_HEADERS)
+            try:
+                text = await run(generate, company_name)
+            except Exception as e:
+                raise gemini_error(e)
+            return JSONResponse(done(text))
+        return endpoint
+
+    async def chat(request: Request) -> Response:
+        row_id, investor = company(request)
+        try:
+            body = await request.json()
+        except ValueError:
+            raise ApiError(400, "Body must be JSON")
+        if not isinstance(body, dict):
+            raise ApiError(400, "Body must be a JSON object")
+        question = body.get('question')
+        if not isinstance(question, str) or not question.strip():
+            raise ApiError(400, "question is required")
+        if len(question) > MAX_QUESTION_CHARS:
+            raise ApiError(400, f"question is longer than {MAX_QUESTION_CHARS} characters")
+        history = body.get('history') or []
+        if not isinstance(history, list):
+            raise ApiError(400, "history must be a list of {\"user\", \"assistant\"} objects")
+        for i, turn in enumerate(history):
+            if not isinstance(turn, dict):
+                raise ApiError(400, f"history[{i}] must be a {{\"user\", \"assistant\"}} object")
+            for field in ('user', 'assistant'):
+                if not isinstance(turn.get(field), str):
+                    raise ApiError(400, f"history[{i}].{field} must be a string")
+        summary = body.get('summary') or {}
+        if not isinstance(summary, dict):
+            raise ApiError(400, "summary must be the object returned by the previous answer")
+
+        service = get_service(request)
+        company_name = investor['Investors']
+        metadata = investor.to_dict()
+        # Same grounding as the details page: whatever insights and news have been generated
+        insights = service.cached_company_info(company_name) or ""
+        news = service.cached_news(company_name) or ""
+        # Comparison questions are answered from these instead of a web search
+        peers = await run(service.peers, row_id)
+        args = (company_name, question, history, summary, metadata, insights, news, peers)
+        # The summary is updated in place while the prompt is built
+        done = lambda answer: {'row_id': row_id, 'company': company_name, 'answer': answer, 'summary': summary}
+        if body.get('stream') or wants_stream(request):
+            return StreamingResponse(stream_events(service.chat, args, done),
+                                     media_type='text/event-stream', headers=SSE_HEADERS)
+        try:
+            answer = await run(service.chat, *args)
+        except Exception as e:
+            raise gemini_error(e)
+        return JSONResponse(done(answer))
+
+    async def metrics_endpoint(request: Request) -> Response:
+        if not metrics.REGISTRY.enabled:
+            raise ApiError(404, "Metrics are disabled; set METRICS_ENABLED=1")
+        return PlainTextResponse(metrics.REGISTRY.render_prometheus(), media_type='text/plain; version=0.0.4')
+
+    async def api_error(request: Request, error: ApiError) -> Response:
+        return JSONResponse({'error': error.message}, status_code=error.status_code)
+
+    routes: List[Route] = [
+        Route('/health', health),
+        Route('/metrics', metrics_endpoint),
+        Route('/api/search', search),
+        Route('/api/suggest', suggest),
+        Route('/api/companies/lookup', lookup),
+        Route('/api/investors', investors),
+        Route('/api/companies/{row_id:int}', profile),
+        Route('/api/companies/{row_id:int}/insights', generated_text_endpoint('company_info', 'insights')),
+        Route('/api/companies/{row_id:int}/news', generated_text_endpoint('news', 'news')),
+        Route('/api/companies/{row_id:int}/peers', peers),
+        Route('/api/companies/{row_id:int}/chat', chat, methods=['POST']),
+    ]
+    app = Starlette(routes=routes, lifespan=lifespan, exception_handlers={ApiError: api_error})
+    app.state.service = service
+    app.add_middleware(TokenAuthMiddleware, token=os.getenv('API_TOKEN'))
+    return app
+
+
+load_dotenv()
+app = create_app()
+
+
+def main(argv: List[str] = None) -> int:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the investor API")
+    parser.add_argument('--host', default=os.getenv('API_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('API_PORT', 8000)))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    # One process: the caches live in memory and are shared by every request
+    uvicorn.run(app, host=args.host, port=args.port, log_level='info')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
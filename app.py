@@ -1,18 +1,27 @@
 import streamlit as st
 import pandas as pd
-from google import genai
-from google.genai import types
-from rapidfuzz import process, fuzz
 import os
 from typing import List, Dict, Optional
 import json
-import requests
-from bs4 import BeautifulSoup
-import re
-from urllib.parse import urlparse
 from dotenv import load_dotenv
 import logging
 import time
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from search_index import AliasIndex, SearchIndex, SuggestionIndex
+from investor_service import InvestorService, create_chat_cache
+from dataset_reload import start_dataset_watcher
+from facets import FACETS
+from response_cache import ResponseCache, create_response_cache
+import ai_service
+from investor_data import DEFAULT_CSV_PATH, load_investor_dataset, get_investor_names
+import prewarm
+import chat_context
+import metrics
+from semantic_cache import SemanticCache, create_semantic_cache
+from session_cache import SessionCacheBudget, create_session_cache, create_session_cache_budget
+from link_preview import LinkPreviewer, extract_urls
+from gemini_scheduler import GeminiScheduler, create_gemini_scheduler, PRIORITY_BACKGROUND
 # Removed voice input dependencies - keeping it text-only
 
 # Configure logging
@@ -22,6 +31,36 @@ logger = logging.getLogger(__name__)
 # Load environment variables from .env file
 load_dotenv()
 
+# Pre-generate insights and news for every investor in a background thread at startup
+PREWARM_ON_STARTUP = os.getenv('AI_PREWARM', '0').lower() in ('1', 'true', 'yes')
+
+# Company search: "dropdown" ships every name to the browser, "typeahead" ranks on the server,
+# "auto" switches to typeahead once the list is too long for a responsive dropdown
+SEARCH_MODE = os.getenv('SEARCH_MODE', 'auto').lower()
+TYPEAHEAD_THRESHOLD = 200
+TYPEAHEAD_PAGE_SIZE = 10
+TYPEAHEAD_MIN_CHARS = 2
+
+# Investor filters: facet labels, sort options and page size of the ranked results
+FACET_LABELS = {'type': "Investor type", 'country': "HQ country", 'category': "Size category"}
+SORT_OPTIONS = {
+    '': "List order",
+    'recent_investments': "Deals in the last 12 months",
+    'dry_powder': "Dry powder",
+    'aum': "AUM",
+    'investments': "Total investments",
+    'active_portfolio': "Active portfolio",
+    'exits': "Exits",
+}
+FILTER_PAGE_SIZE = 10
+
+# Stream Gemini responses into the page as they are generated (AI_STREAMING=0 to disable)
+STREAMING_ENABLED = os.getenv('AI_STREAMING', '1').lower() not in ('0', 'false', 'no')
+
+# Upper bound on the size of one ARIA chat prompt, in estimated tokens
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv('CHAT_PROMPT_TOKEN_BUDGET', chat_context.DEFAULT_TOKEN_BUDGET))
+
+
 # Page config for mobile responsiveness
 st.set_page_config(
     page_title="Investor Event Assistant",
@@ -185,42 +224,151 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_session_cache_budget() -> SessionCacheBudget:
+    """Global byte budget shared by every session's AI cache"""
+    return create_session_cache_budget()
+
 # Initialize session state
-if 'investors_df' not in st.session_state:
-    st.session_state.investors_df = None
-if 'selected_investor' not in st.session_state:
-    st.session_state.selected_investor = None
+if 'selected_investor_id' not in st.session_state:
+    st.session_state.selected_investor_id = None
 if 'ai_cache' not in st.session_state:
-    st.session_state.ai_cache = {}
+    st.session_state.ai_cache = create_session_cache(get_session_cache_budget())
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "search"
-if 'citation_counter' not in st.session_state:
-    st.session_state.citation_counter = 0
-if 'citations_map' not in st.session_state:
-    st.session_state.citations_map = {}
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 if 'current_company' not in st.session_state:
     st.session_state.current_company = None
+if 'chat_summary' not in st.session_state:
+    st.session_state.chat_summary = {}
 
-@st.cache_data
+@st.cache_resource
 def load_investor_data():
-    """Load and cache investor data from CSV"""
+    """Load the typed investor dataset once per process (Parquet copy of the CSV when unchanged)
+    
+    The DataFrame is shared by every session, so treat it as read-only.
+    """
+    csv_path = os.getenv('INVESTOR_CSV_PATH', DEFAULT_CSV_PATH)
     try:
-        df = pd.read_csv('Yogen.csv')
+        df = load_investor_dataset(csv_path)
         return df
     except FileNotFoundError:
-        st.error("Yogen.csv file not found. Please make sure it's in the same directory as this app.")
+        st.error(f"{csv_path} file not found. Please make sure it's in the same directory as this app.")
         return None
     except Exception as e:
         st.error(f"Error loading CSV file: {str(e)}")
         return None
 
+@st.cache_resource
+def get_investor_service() -> Optional[InvestorService]:
+    """Process-wide service behind every page (and the same one api.py serves over HTTP)"""
+    df = load_investor_data()
+    if df is None:
+        return None
+    service = InvestorService(
+        df,
+        response_cache=get_response_cache(),
+        chat_cache=get_chat_cache(),
+        semantic_cache=get_semantic_cache(),
+        context_cache=get_context_cache(),
+        scheduler=get_gemini_scheduler(),
+        chat_token_budget=CHAT_PROMPT_TOKEN_BUDGET,
+    )
+    # Similar investors show on every details page; build them while visitors are still searching
+    service.warm_peer_index()
+    return service
+
+def session_cache_keys(company_name: str) -> List[str]:
+    """Keys of a company's insights and news in the per-session AI caches"""
+    return [f"{company_name}_full_info", f"{company_name}_news"]
+
+@st.cache_resource
+def watch_investor_data(_service: InvestorService):
+    """Apply edits to the investor CSV without a restart, once per server process"""
+    def drop_session_entries(summary: Dict):
+        keys = [key for company_name in summary['companies'] for key in session_cache_keys(company_name)]
+        dropped = get_session_cache_budget().invalidate(keys)
+        logger.info(f"🔄 Dropped {dropped} session cache entries for {len(summary['companies'])} changed companies")
+    
+    _service.add_reload_listener(drop_session_entries)
+    return start_dataset_watcher(_service)
+
+def load_search_index() -> Optional[SearchIndex]:
+    """The fuzzy search index, built once per loaded dataset"""
+    service = get_investor_service()
+    return service.search_index if service is not None else None
+
+def load_alias_index() -> Optional[AliasIndex]:
+    """The case-insensitive company name to row id index"""
+    service = get_investor_service()
+    return service.alias_index if service is not None else None
+
+def get_investor(row_id: Optional[int]) -> Optional[pd.Series]:
+    """Investor row for a row id from the alias or search index"""
+    service = get_investor_service()
+    return service.investor(row_id) if service is not None else None
+
+def get_peers(row_id: Optional[int]) -> List[Dict]:
+    """Most similar investors in the list by metrics and description, from the local peer index"""
+    service = get_investor_service()
+    return service.peers(row_id) if service is not None and row_id is not None else []
+
+def load_suggestion_index() -> Optional[SuggestionIndex]:
+    """The typeahead index over all company names"""
+    service = get_investor_service()
+    return service.suggestion_index if service is not None else None
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    """Process-wide AI response cache shared by every browser session"""
+    return create_response_cache()
+
+@st.cache_resource
+def get_chat_cache() -> ResponseCache:
+    """Process-wide LRU of ARIA answers keyed by company, normalized question and context"""
+    return create_chat_cache()
+
+@st.cache_resource
+def get_semantic_cache() -> SemanticCache:
+    """Process-wide index of answered chat questions for near-duplicate reuse"""
+    return create_semantic_cache()
+
+@st.cache_resource
+def get_context_cache() -> Optional[chat_context.CompanyContextCache]:
+    """Process-wide registry of Gemini context caches for chat, or None when disabled"""
+    return chat_context.create_context_cache()
+
+@st.cache_resource
+def get_ai_executor() -> ThreadPoolExecutor:
+    """Shared worker pool so insights and news requests run concurrently"""
+    return ThreadPoolExecutor(max_workers=int(os.getenv('AI_WORKERS', 8)), thread_name_prefix="gemini")
+
+@st.cache_resource
+def get_gemini_scheduler() -> GeminiScheduler:
+    """Process-wide scheduler that keeps every session's Gemini calls inside quota"""
+    return create_gemini_scheduler()
+
+@st.cache_resource
+def start_prewarm(_client):
+    """Start the background prewarm thread once per server process"""
+    df = load_investor_data()
+    if df is None:
+        return None
+    client = get_gemini_scheduler().bind(_client, PRIORITY_BACKGROUND)
+    return prewarm.start_background_prewarm(client, get_investor_names(df), get_response_cache())
+
+@st.cache_resource
+def get_gemini_client(api_key: str):
+    """One pooled, keep-alive Gemini client per API key for the whole process"""
+    logger.info("🔌 Creating shared Gemini client")
+    return ai_service.create_client(api_key, pool_size=int(os.getenv('GEMINI_POOL_SIZE', 20)))
+
 def setup_gemini_api():
     """Setup Gemini API with API key from environment variables"""
     # Try to get API key from environment variables first (.env file or system env)
     # Support both GEMINI_API_KEY (legacy) and GOOGLE_API_KEY (new SDK standard)
-    api_key = os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')
+    api_key = ai_service.get_api_key()
     
     # Fallback to Streamlit secrets for cloud deployment
     if not api_key:
@@ -239,532 +387,97 @@ def setup_gemini_api():
         return False, None
     
     try:
-        # Initialize client with new SDK structure
-        client = genai.Client(api_key=api_key)
+        # Reuse the process-wide client instead of building one (and a TLS pool) per rerun
+        client = get_gemini_client(api_key)
         return True, client
     except Exception as e:
         st.error(f"Error configuring Gemini API: {str(e)}")
         return False, None
 
-def fuzzy_search_investors(query: str, df: pd.DataFrame, limit: int = 10) -> List[Dict]:
-    """Perform fuzzy search on investor data"""
+def fuzzy_search_investors(query: str, df: pd.DataFrame, limit: int = 10, index: SearchIndex = None) -> List[Dict]:
+    """Perform fuzzy search on investor data using the precomputed search index"""
     if df is None or query.strip() == "":
         return []
     
-    # Search in multiple fields
-    search_fields = ['Investors', 'Name in PEI Event List', 'HQ Location', 'Primary Investor Type']
-    all_matches = []
-    
-    for field in search_fields:
-        if field in df.columns:
-            # Get non-null values for the field
-            field_values = df[field].dropna().astype(str).tolist()
-            matches = process.extract(query, field_values, scorer=fuzz.partial_ratio, limit=limit)
-            
-            for match, score, idx in matches:
-                if score > 60:  # Minimum score threshold
-                    # Find the row with this value
-                    matching_rows = df[df[field].astype(str) == match]
-                    if not matching_rows.empty:
-                        row = matching_rows.iloc[0]
-                        all_matches.append({
-                            'investor': row,
-                            'score': score,
-                            'matched_field': field,
-                            'matched_value': match
-                        })
-    
-    # Sort by score and remove duplicates
-    seen_investors = set()
-    unique_matches = []
-    for match in sorted(all_matches, key=lambda x: x['score'], reverse=True):
-        investor_name = match['investor']['Investors']
-        if investor_name not in seen_investors:
-            seen_investors.add(investor_name)
-            unique_matches.append(match)
-    
-    return unique_matches[:limit]
-
-def add_wikipedia_style_citations(response):
-    """Add clean Wikipedia-style citations without affecting the main text"""
-    if not response or not hasattr(response, 'text'):
-        return ""
+    if index is None:
+        index = load_search_index()
+    if index is None:
+        return []
     
-    text = response.text
-    if not text:
-        return ""
+    # One batched scoring pass over all search fields; hits carry row positions
+    matches = index.search(query, limit=limit)
+    for match in matches:
+        match['investor'] = df.iloc[match['row_id']]
     
-    # Check if response has grounding data
-    try:
-        if not hasattr(response, 'candidates') or not response.candidates:
-            return text
-        
-        candidate = response.candidates[0]
-        if not hasattr(candidate, 'grounding_metadata') or not candidate.grounding_metadata:
-            return text
-        
-        grounding_metadata = candidate.grounding_metadata
-        if not hasattr(grounding_metadata, 'grounding_supports') or not grounding_metadata.grounding_supports:
-            return text
-        
-        supports = grounding_metadata.grounding_supports
-        chunks = grounding_metadata.grounding_chunks if hasattr(grounding_metadata, 'grounding_chunks') else []
-        
-        if not supports or not chunks:
-            return text
-        
-        # Clear previous citations for this response
-        st.session_state.citation_counter = 0
-        st.session_state.citations_map = {}
-        
-        # Process supports and collect unique URLs
-        citation_urls = []
-        for support in supports:
-            if hasattr(support, 'grounding_chunk_indices') and support.grounding_chunk_indices:
-                for chunk_idx in support.grounding_chunk_indices:
-                    if chunk_idx < len(chunks) and hasattr(chunks[chunk_idx], 'web') and chunks[chunk_idx].web:
-                        uri = chunks[chunk_idx].web.uri
-                        # Filter out Google Vertex AI search URLs and get actual sources
-                        if uri and 'vertexaisearch.cloud.google.com' not in uri and uri not in citation_urls:
-                            citation_urls.append(uri)
-        
-        # Only add sources section at the end if we have real URLs
-        if citation_urls:
-            text += "\n\n## Sources\n"
-            for i, uri in enumerate(citation_urls, 1):
-                try:
-                    domain = urlparse(uri).netloc.replace('www.', '') or uri
-                    text += f"{i}. [{domain}]({uri})\n"
-                except:
-                    text += f"{i}. [Source]({uri})\n"
-        
-        return text
-        
-    except Exception as e:
-        logger.error(f"Error processing citations: {str(e)}")
-        return text
+    return matches
 
-def get_gemini_response(prompt: str, cache_key: str = None) -> Optional[str]:
-    """Get response from Gemini API with Google Search grounding and caching"""
-    # Initialize processing_key early to avoid scoping issues
-    processing_key = f"{cache_key}_processing" if cache_key else None
-    
-    logger.info(f"🔍 Starting API call for cache_key: {cache_key}")
-    
-    if cache_key and cache_key in st.session_state.ai_cache:
+def get_session_ai_response(cache_key: str, label: str, generate, *args) -> Optional[str]:
+    """Serve AI text from this session's cache, generating it through the shared service on a miss"""
+    cached = st.session_state.ai_cache.get(cache_key)
+    if cached is not None:
         logger.info(f"📋 Cache hit for key: {cache_key}")
-        return st.session_state.ai_cache[cache_key]
+        return cached
     
-    # Check if we're already processing this cache key to prevent duplicates
-    if processing_key and processing_key in st.session_state:
-        logger.info(f"⏳ Request already in progress for: {cache_key}")
-        return "Loading..."
-    
-    if 'gemini_client' not in st.session_state:
-        logger.error("❌ Gemini client not initialized")
-        st.error("Gemini client not initialized")
-        return None
-
     try:
-        # Mark as processing to prevent duplicates
-        if processing_key:
-            st.session_state[processing_key] = True
-            logger.info(f"🔒 Marked {processing_key} as processing")
-        
-        logger.info(f"🚀 Making Gemini API call with cache_key: {cache_key}")
-        
-        # Define the grounding tool
-        grounding_tool = types.Tool(
-            google_search=types.GoogleSearch()
-        )
-
-        # Configure generation settings (use Flash for faster responses without thinking)
-        config = types.GenerateContentConfig(
-            tools=[grounding_tool],
-            response_modalities=["TEXT"],
-            system_instruction="Provide direct, concise responses without internal reasoning steps."
-        )
-
-        # Make the request with 2.5 Flash (no thinking for speed)
-        response = st.session_state.gemini_client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-            config=config,
-        )
-        
-        if response and response.text:
-            result = response.text.strip()
-            logger.info(f"✅ Raw response received, length: {len(result)} characters")
-            
-            # Fix monetary formatting issues by adding spaces around numbers and units
-            # Handle specific patterns like "1-50million" -> "1-50 million"
-            result = re.sub(r'(\d+)[-–](\d+)(million|billion|Million|Billion)', r'\1-\2 \3', result)
-            # Handle standalone numbers with monetary units
-            result = re.sub(r'(\d+)(million|billion|Million|Billion)', r'\1 \2', result)
-            # Fix dollar amounts
-            result = re.sub(r'(\$\d+)([a-zA-Z])', r'\1 \2', result)
-            # Fix compound words like "andenterprise" -> "and enterprise"
-            result = re.sub(r'(and)([A-Z][a-z])', r'\1 \2', result)
-            result = re.sub(r'(to)([A-Z][a-z])', r'\1 \2', result)
-            result = re.sub(r'(up)([A-Z][a-z])', r'\1 \2', result)
-            result = re.sub(r'(values)([A-Z][a-z])', r'\1 \2', result)
-            # General fix for number followed by capital letter
-            result = re.sub(r'(\d)([A-Z][a-z])', r'\1 \2', result)
-            
-            # Add Wikipedia-style citations to the response
-            text_with_citations = add_wikipedia_style_citations(response)
-            
-            if cache_key:
-                st.session_state.ai_cache[cache_key] = text_with_citations
-                logger.info(f"💾 Cached response for key: {cache_key}")
-                # Clear processing flag
-                if processing_key and processing_key in st.session_state:
-                    del st.session_state[processing_key]
-                    logger.info(f"🔓 Cleared processing flag for {processing_key}")
-            return text_with_citations
-        else:
-            logger.warning("⚠️ Empty response from Gemini")
-            # Clear processing flag
-            if processing_key and processing_key in st.session_state:
-                del st.session_state[processing_key]
-                logger.info(f"🔓 Cleared processing flag after empty response")
-            return "No response generated."
-            
+        text = generate(*args)
     except Exception as e:
-        logger.error(f"❌ Error getting AI response: {str(e)}")
+        logger.error(f"❌ Error getting {label}: {str(e)}")
         logger.exception("Full traceback:")  # This will log the full stack trace
-        # Clear processing flag on error
-        if processing_key and processing_key in st.session_state:
-            del st.session_state[processing_key]
-            logger.info(f"🔓 Cleared processing flag after error")
-        st.error(f"Error getting AI response: {str(e)}")
+        st.error(f"Error getting {label}: {str(e)}")
         return None
+    
+    if not text:
+        return "No response generated."
+    st.session_state.ai_cache[cache_key] = text
+    logger.info(f"💾 Cached response for key: {cache_key}")
+    return text
 
 def generate_company_info(company_name: str) -> str:
     """Generate comprehensive AI content about the company with strict no-hallucination guidelines"""
-    logger.info(f"🎯 Generating company info prompt for: {company_name}")
-    
-    prompt = f"""You are an AI research assistant providing factual, verifiable information about investment companies.
-
-**CRITICAL REQUIREMENTS - NO HALLUCINATION ALLOWED:**
-
-1. **VERIFICATION MANDATE**: Every single fact, figure, investment, or claim you make about "{company_name}" MUST be verifiable from real, current sources
-2. **NO FABRICATION**: Do not invent portfolio companies, investment amounts, dates, or any other details
-3. **SOURCE VERIFICATION**: If you cannot find verifiable information about something, explicitly state "Information not available" rather than guessing
-4. **CURRENT DATA ONLY**: Use only recent, verifiable information - do not rely on potentially outdated training data
-5. **CONSERVATIVE APPROACH**: When in doubt, provide less information rather than potentially incorrect information
-
-**OBJECTIVE:**
-Provide comprehensive, factual information about "{company_name}" in the following format:
-
-## About the Company
-[Provide a verifiable overview focusing on: founding year (if verifiable), headquarters location, key founders/leaders (if verifiable), and core mission. Only include information you can verify through current sources. 3-4 sentences maximum.]
-
-## What They Do  
-[Describe their verified investment focus, confirmed sectors of operation, and documented strategies. Only mention specific sectors, deal types, or strategies you can verify. 3-4 sentences maximum.]
-
-## Major Investments
-[List ONLY verified, documented portfolio companies or investments. Each entry must include:
-- Company name (verified)
-- Brief description of what the company does
-- Investment type/date if verifiable
-- Do NOT fabricate investment amounts or dates
-- If fewer than 5 verified investments are found, list only what you can verify
-- If no specific investments can be verified, state "Specific portfolio investments require verification"]
-
-**FORMATTING REQUIREMENTS:**
-- Use proper markdown formatting
-- Be direct and factual
-- Include disclaimer if information is limited
-- Prioritize accuracy over completeness
-
-**SOURCES PRIORITY ORDER:**
-1. Official company website and press releases
-2. SEC filings and regulatory documents  
-3. Major financial news publications (Bloomberg, Reuters, WSJ)
-4. Verified industry publications (Private Equity International, PE Hub)
-
-Remember: It is better to provide limited verified information than extensive unverified claims."""
-    
-    cache_key = f"{company_name}_full_info"
-    response = get_gemini_response(prompt, cache_key)
+    response = get_session_ai_response(session_cache_keys(company_name)[0], "AI response", get_investor_service().company_info, company_name)
     return response or "Information not available."
 
+@st.cache_resource
+def get_link_previewer() -> LinkPreviewer:
+    """Process-wide link previewer with a pooled HTTP session and TTL cache"""
+    return LinkPreviewer()
+
 def get_link_preview(url: str) -> Dict[str, str]:
     """Get basic link preview information with better error handling"""
-    try:
-        # Skip invalid URLs or Google vertex search URLs
-        if not url or 'vertexaisearch.cloud.google.com' in url:
-            return {
-                'title': "Invalid link",
-                'description': "Unable to preview this link",
-                'domain': "unknown"
-            }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=5)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        title = soup.find('title')
-        description = soup.find('meta', attrs={'name': 'description'}) or soup.find('meta', attrs={'property': 'og:description'})
-        
-        # Safe URL parsing
-        try:
-            domain = urlparse(url).netloc.replace('www.', '') if url else "unknown"
-        except:
-            domain = "unknown"
-        
-        return {
-            'title': title.text.strip() if title else "No title available",
-            'description': description.get('content', '').strip() if description else "No description available",
-            'domain': domain
-        }
-    except Exception as e:
-        try:
-            domain = urlparse(url).netloc.replace('www.', '') if url else "unknown"
-        except:
-            domain = "unknown"
-        return {
-            'title': "Link preview unavailable",
-            'description': f"Could not fetch preview: {str(e)[:50]}",
-            'domain': domain
-        }
-
-def get_gemini_news_response(prompt: str, cache_key: str = None) -> Optional[str]:
-    """Get response from Gemini 2.5 Pro with thinking enabled for news generation"""
-    # Initialize processing_key early to avoid scoping issues
-    processing_key = f"{cache_key}_processing" if cache_key else None
-    
-    logger.info(f"🔍 Starting news generation for cache_key: {cache_key}")
-    
-    if cache_key and cache_key in st.session_state.ai_cache:
-        logger.info(f"📋 News cache hit for key: {cache_key}")
-        return st.session_state.ai_cache[cache_key]
-    
-    # Check if we're already processing this cache key to prevent duplicates
-    if processing_key and processing_key in st.session_state:
-        logger.info(f"⏳ News request already in progress for: {cache_key}")
-        return "Loading news..."
-    
-    # Simple rate limiting - don't allow more than 3 concurrent news requests
-    active_news_requests = [k for k in st.session_state.keys() if k.endswith('_news_processing') or (k.endswith('_processing') and '_news_' in k)]
-    if len(active_news_requests) >= 3:
-        logger.info(f"🚦 Rate limit hit - {len(active_news_requests)} active news requests")
-        return "Please wait, processing other news requests..."
-    
-    if 'gemini_client' not in st.session_state:
-        logger.error("❌ Gemini client not initialized for news")
-        st.error("Gemini client not initialized")
-        return None
-    
-    try:
-        # Mark as processing to prevent duplicates
-        if processing_key:
-            st.session_state[processing_key] = True
-            logger.info(f"🔒 Marked {processing_key} as processing")
-        
-        logger.info(f"🚀 Making Gemini Pro API call for news with cache_key: {cache_key}")
-        
-        # Define the grounding tool
-        grounding_tool = types.Tool(
-            google_search=types.GoogleSearch()
-        )
-
-        # Configure generation settings - USE PRO model with thinking enabled for better verification
-        config = types.GenerateContentConfig(
-            tools=[grounding_tool],
-            response_modalities=["TEXT"],
-            # Enable thinking for better news verification (no system instruction to allow thinking)
-        )
-
-        # Make the request with 2.5 Pro model with thinking enabled for better news verification
-        response = st.session_state.gemini_client.models.generate_content(
-            model="gemini-2.5-pro",  # Use Pro model with thinking for news
-            contents=prompt,
-            config=config,
-        )
-        
-        if response and response.text:
-            logger.info(f"✅ News response received, length: {len(response.text)} characters")
-            # Add clean citations without brackets in content
-            text_with_citations = add_wikipedia_style_citations(response)
-            if cache_key:
-                st.session_state.ai_cache[cache_key] = text_with_citations
-                logger.info(f"💾 Cached news response for key: {cache_key}")
-            
-            # Clear processing flag
-            if processing_key and processing_key in st.session_state:
-                del st.session_state[processing_key]
-                logger.info(f"🔓 Cleared processing flag for {processing_key}")
-            
-            return text_with_citations
-        else:
-            logger.warning("⚠️ Empty news response from Gemini Pro")
-            # Clear processing flag
-            if processing_key and processing_key in st.session_state:
-                del st.session_state[processing_key]
-                logger.info(f"🔓 Cleared processing flag after empty response")
-            return "No response generated."
-            
-    except Exception as e:
-        logger.error(f"❌ Error getting news response: {str(e)}")
-        logger.exception("Full traceback:")  # This will log the full stack trace
-        # Clear processing flag on error
-        if processing_key and processing_key in st.session_state:
-            del st.session_state[processing_key]
-            logger.info(f"🔓 Cleared processing flag after error")
-        st.error(f"Error getting news response: {str(e)}")
-        return None
-
+    return get_link_previewer().get(url)
 
+def get_link_previews(urls: List[str]) -> Dict[str, Dict[str, str]]:
+    """Preview many links concurrently, e.g. every URL in a news section"""
+    return get_link_previewer().get_many(urls)
 
 def generate_news_articles(company_name: str) -> str:
     """Generate news articles using Gemini 2.5 Pro with thinking for verification"""
-    logger.info(f"📰 Generating news prompt for: {company_name}")
-    
-    prompt = f"""Find REAL, VERIFIABLE news articles about "{company_name}" from the last 6 months.
-
-**CRITICAL REQUIREMENT: NO HALLUCINATION**
-- Every URL must be real and working
-- Every headline must be from an actual article
-- Every date must be accurate
-- If you cannot find real articles, say "No verified news articles found"
-
-**RESEARCH TASK:**
-Find recent news articles about "{company_name}" (the investment firm/private equity company) from the last 6 months focusing on:
-1. Major acquisitions or investments
-2. Fund closings or capital raises
-3. Strategic partnerships
-4. Executive appointments or leadership changes
-5. Portfolio company activities
-
-**OUTPUT REQUIREMENTS:**
-- Maximum 3 articles (for speed)
-- Only include articles you can verify exist
-- Use clean markdown formatting
-- No bracketed numbers [1], [2], etc. in headlines or URLs
-- Include working links only
-
-**FORMAT:**
-
-### [Actual Headline]
-**Source:** [Real Publication Name]  
-**Date:** [Actual Date]  
-**Link:** [Working URL]  
-**Summary:** [Brief factual summary]
-
-**VERIFICATION STANDARD:**
-Think through each article you want to include. Can you verify this is a real article from a real source? If not, don't include it. Better to find 2 real articles than 5 fake ones.
-
-Please research and provide real news about {company_name}."""
-    
-    cache_key = f"{company_name}_news"
-    response = get_gemini_news_response(prompt, cache_key)
-    
+    response = get_session_ai_response(session_cache_keys(company_name)[1], "news response", get_investor_service().news, company_name)
     return response or "No recent verified news articles found."
 
-def generate_chatbot_response(company_name: str, question: str, chat_history: List[Dict], company_metadata: Dict = None, company_insights: str = None, company_news: str = None) -> str:
-    """Generate contextual chatbot response with sophisticated prompt engineering"""
-    
-    # Build company context from metadata and AI insights
-    company_context = ""
-    if company_metadata:
-        company_context += "\n**COMPANY METADATA:**\n"
-        company_context += f"Name: {company_metadata.get('Investors', 'N/A')}\n"
-        company_context += f"Type: {company_metadata.get('Primary Investor Type', 'N/A')}\n"
-        company_context += f"Location: {company_metadata.get('HQ Location', 'N/A')}, {company_metadata.get('HQ Country/Territory/Region', 'N/A')}\n"
-        company_context += f"AUM: {company_metadata.get('AUM', 'N/A')}\n"
-        company_context += f"PE Category: {company_metadata.get('PE Category', 'N/A')}\n"
-        company_context += f"Total Investments: {company_metadata.get('Investments', 'N/A')}\n"
-        company_context += f"Active Portfolio: {company_metadata.get('Active Portfolio', 'N/A')}\n"
-        company_context += f"Exits: {company_metadata.get('Exits', 'N/A')}\n"
-        company_context += f"Investments (Last 12 Months): {company_metadata.get('Investments in the last 12 months', 'N/A')}\n"
-        company_context += f"Dry Powder: {company_metadata.get('Dry Powder', 'N/A')}\n"
-        if company_metadata.get('Description'):
-            company_context += f"Description: {company_metadata.get('Description')}\n"
-    
-    if company_insights:
-        company_context += "\n**AI-GENERATED COMPANY INSIGHTS:**\n"
-        company_context += company_insights + "\n"
-    
-    if company_news:
-        company_context += "\n**RECENT NEWS & DEVELOPMENTS:**\n"
-        company_context += company_news + "\n"
-    
-    # Build conversation context
-    context = ""
-    if chat_history:
-        context = "\n**CONVERSATION HISTORY:**\n"
-        for entry in chat_history[-6:]:  # Last 6 exchanges for context
-            context += f"User: {entry['user']}\nAssistant: {entry['assistant']}\n\n"
-    
-    # Build the conversation-aware prompt
-    conversation_analysis = ""
-    if chat_history:
-        conversation_analysis = "**CONVERSATION ANALYSIS:**\n"
-        conversation_analysis += f"We've had {len(chat_history)} exchanges about {company_name}. "
-        
-        # Analyze what has been discussed
-        topics_discussed = []
-        for exchange in chat_history:
-            if "strategy" in exchange['user'].lower():
-                topics_discussed.append("investment strategy")
-            if "compare" in exchange['user'].lower() or "peer" in exchange['user'].lower():
-                topics_discussed.append("competitive analysis")
-            if "performance" in exchange['user'].lower():
-                topics_discussed.append("performance metrics")
-            if "portfolio" in exchange['user'].lower():
-                topics_discussed.append("portfolio analysis")
-        
-        if topics_discussed:
-            conversation_analysis += f"Previous topics covered: {', '.join(set(topics_discussed))}. "
-        
-        # Check if this is a follow-up question
-        follow_up_indicators = ["what", "how", "why", "tell me more", "explain", "elaborate", "details"]
-        if any(indicator in question.lower() for indicator in follow_up_indicators) and len(question.split()) < 5:
-            conversation_analysis += "This appears to be a follow-up question requiring context from our previous discussion. "
-
-    prompt = f"""You are ARIA, an expert investment analyst having a dynamic conversation about {company_name}. Be conversational, specific, and NEVER repeat the same information.
-
-{company_context}
-
-{conversation_analysis}
-
-**CONVERSATION HISTORY:**
-{context}
-
-**CURRENT QUESTION:** "{question}"
-
-**CRITICAL INSTRUCTIONS:**
-1. **NO REPETITION**: If you've already discussed something, don't repeat it. Build on it or explore new angles.
-2. **BE CONVERSATIONAL**: This is a dialogue, not a report. Respond naturally to follow-up questions.
-3. **USE SPECIFIC DATA**: Reference the actual numbers from the company metadata (AUM: {company_metadata.get('AUM', 'N/A') if company_metadata else 'N/A'}, Investments: {company_metadata.get('Investments', 'N/A') if company_metadata else 'N/A'}, etc.)
-4. **CONTEXT AWARENESS**: If the user asks "What" or "How" or similar short questions, they're asking about the previous topic.
-5. **VARY YOUR RESPONSES**: Each answer should feel fresh and explore different aspects.
-
-**RESPONSE STYLE:**
-- Keep it to 2-3 sentences maximum
-- Be specific and data-driven using the provided metrics
-- If it's a follow-up, directly reference what we discussed before
-- Offer new insights or angles on the topic
-- Be conversational, not robotic
-
-**FOR FOLLOW-UP QUESTIONS:**
-- If user asks "What?" after discussing strategy, explain specifics about their strategy
-- If user asks "How?" after mentioning performance, explain their approach
-- If user asks "Why?" after any statement, provide reasoning or context
-- Always connect back to the specific data about this company
-
-Answer the question naturally, as if you're an expert who has been studying this company and can provide specific insights based on their actual metrics and data:"""
+def generate_chatbot_response(company_name: str, question: str, chat_history: List[Dict], company_metadata: Dict = None, company_insights: str = None, company_news: str = None, company_peers: List[Dict] = None, on_text=None) -> str:
+    """Generate contextual chatbot response with sophisticated prompt engineering
     
-    # Create more unique cache key to prevent conflicts
-    import hashlib
-    import time
-    unique_str = f"{company_name}_{question}_{len(chat_history)}_{str(time.time())[:10]}"
-    cache_key = f"chat_{hashlib.md5(unique_str.encode()).hexdigest()[:8]}"
-    response = get_gemini_response(prompt, cache_key)
+    See InvestorService.chat for the prompt budget and the shared answer caches; the
+    running summary of older turns is kept in this session.
+    """
+    try:
+        response = get_investor_service().chat(
+            company_name,
+            question,
+            chat_history,
+            st.session_state.chat_summary,
+            metadata=company_metadata,
+            insights=company_insights,
+            news=company_news,
+            peers=company_peers,
+            on_text=on_text,
+        )
+    except Exception as e:
+        logger.error(f"❌ Error getting AI response: {str(e)}")
+        logger.exception("Full traceback:")
+        st.error(f"Error getting AI response: {str(e)}")
+        response = None
     
     return response or "I apologize, but I'm unable to provide a response at the moment. Please try rephrasing your question."
 
@@ -774,43 +487,75 @@ def format_value(value, default="N/A"):
         return default
     return str(value)
 
-def get_all_company_names(df: pd.DataFrame) -> List[str]:
-    """Get all unique company names from the CSV"""
-    if df is None:
+def format_aum(value, default="N/A"):
+    """Format AUM (typed as millions by the loader) in billions"""
+    if value is None or pd.isna(value):
+        return default
+    return f"${value / 1000:.1f}B"
+
+def get_search_suggestions(query: str, company_names: List[str], index: SuggestionIndex = None, limit: int = 10) -> List[str]:
+    """Get search suggestions based on substring and fuzzy matching"""
+    if not query or len(query) < 1:
         return []
     
-    names = []
-    if 'Investors' in df.columns:
-        names.extend(df['Investors'].dropna().astype(str).unique().tolist())
-    if 'Name in PEI Event List' in df.columns:
-        alt_names = df['Name in PEI Event List'].dropna().astype(str).unique().tolist()
-        for name in alt_names:
-            if name not in names and name != '#N/A':
-                names.append(name)
+    if index is None:
+        # Reuse the cached index for the app's own name list; index any other list on the fly
+        index = load_suggestion_index()
+        if index is None or company_names is not index.names:
+            index = SuggestionIndex(company_names)
     
-    return sorted([name for name in names if name and name.strip()])
+    return index.suggest(query, limit=limit)
 
-def get_search_suggestions(query: str, company_names: List[str]) -> List[str]:
-    """Get search suggestions based on fuzzy matching"""
-    if not query or len(query) < 1:
+@st.cache_data(max_entries=2000, ttl=600, show_spinner=False)
+def get_typeahead_page(query: str, limit: int, dataset_version: int = 0) -> List[str]:
+    """Top-ranked suggestions for a prefix, memoized across sessions per dataset version"""
+    index = load_suggestion_index()
+    if index is None:
         return []
+    return get_search_suggestions(query, index.names, index=index, limit=limit)
+
+def use_typeahead(company_names: List[str]) -> bool:
+    """Whether to rank matches on the server instead of shipping every name to the browser"""
+    if SEARCH_MODE == "auto":
+        return len(company_names) > TYPEAHEAD_THRESHOLD
+    return SEARCH_MODE == "typeahead"
+
+def typeahead_select() -> str:
+    """Server-side typeahead: only the top-k matches for the typed prefix reach the browser"""
+    query = st.text_input(
+        "Search for a company:",
+        placeholder="Type a company name and press Enter",
+        key="company_query"
+    ).strip()
+    
+    # The text box only reruns the script when input is committed, which debounces keystrokes
+    if len(query) < TYPEAHEAD_MIN_CHARS:
+        return ""
+    
+    # Reset paging whenever the query changes
+    if st.session_state.get('typeahead_query') != query:
+        st.session_state.typeahead_query = query
+        st.session_state.typeahead_limit = TYPEAHEAD_PAGE_SIZE
+    limit = st.session_state.typeahead_limit
     
-    query = query.lower()
-    suggestions = []
+    suggestions = get_typeahead_page(query.lower(), limit, get_investor_service().dataset_version)
+    if not suggestions:
+        st.info("No matching companies found.")
+        return ""
     
-    # First, add exact matches and starts-with matches
-    for name in company_names:
-        if query in name.lower():
-            suggestions.append(name)
+    selected_company = st.selectbox(
+        f"Top matches for \"{query}\":",
+        options=[""] + suggestions,
+        index=0,
+        format_func=lambda x: "Choose a company..." if x == "" else x,
+        key="company_typeahead"
+    )
     
-    # Then add fuzzy matches if we don't have enough
-    if len(suggestions) < 10:
-        fuzzy_matches = process.extract(query, company_names, scorer=fuzz.partial_ratio, limit=10)
-        for match, score, _ in fuzzy_matches:
-            if score > 60 and match not in suggestions:
-                suggestions.append(match)
+    if len(suggestions) >= limit and st.button("Show more matches", key="typeahead_more"):
+        st.session_state.typeahead_limit = limit + TYPEAHEAD_PAGE_SIZE
+        st.rerun()
     
-    return suggestions[:10]
+    return selected_company
 
 def search_page():
     """Display the search page with proper dropdown search"""
@@ -818,43 +563,38 @@ def search_page():
     st.markdown("*Find and learn about investment companies with AI-powered insights*")
     
     # Load data
-    df = st.session_state.investors_df
-    if df is None:
+    suggestion_index = load_suggestion_index()
+    if suggestion_index is None:
         st.error("Data not loaded. Please refresh the page.")
         return
     
-    # Get all company names for dropdown
-    if 'all_company_names' not in st.session_state:
-        st.session_state.all_company_names = get_all_company_names(df)
-    
-    company_names = st.session_state.all_company_names
+    # Get all company names for dropdown (shared across sessions)
+    company_names = suggestion_index.names
     
     # Search interface with clean styling
     st.markdown("## 🔍 Search Investors")
     st.markdown("*Find investment companies using the search box below*")
     
-    # Dropdown search with all company names
-    selected_company = st.selectbox(
-        "Select or search for a company:",
-        options=[""] + company_names,
-        index=0,
-        format_func=lambda x: "Type to search..." if x == "" else x,
-        help="Start typing to filter companies",
-        key="company_selectbox"
-    )
+    if use_typeahead(company_names):
+        selected_company = typeahead_select()
+    else:
+        # Dropdown search with all company names
+        selected_company = st.selectbox(
+            "Select or search for a company:",
+            options=[""] + company_names,
+            index=0,
+            format_func=lambda x: "Type to search..." if x == "" else x,
+            help="Start typing to filter companies",
+            key="company_selectbox"
+        )
     
     # If a company is selected, find and display it
     if selected_company:
-        # Find the investor data for the selected company
-        investor_row = None
-        
-        # Search in both Investors and Name in PEI Event List columns
-        matches = df[df['Investors'] == selected_company]
-        if matches.empty:
-            matches = df[df['Name in PEI Event List'] == selected_company]
+        # Constant-time lookup across both Investors and Name in PEI Event List columns
+        row_id = load_alias_index().lookup(selected_company)
+        investor_row = get_investor(row_id)
         
-        if not matches.empty:
-            investor_row = matches.iloc[0]
+        if investor_row is not None:
             
             # Display the selected investor
             col1, col2 = st.columns([3, 1])
@@ -863,39 +603,143 @@ def search_page():
                 st.markdown(f"**{investor_row['Investors']}**")
                 st.markdown(f"*{format_value(investor_row.get('Primary Investor Type'))} | {format_value(investor_row.get('HQ Location'))}*")
                 
-                # Convert AUM from millions to billions for consistency
-                aum_raw = investor_row.get('AUM', '')
-                if aum_raw and pd.notna(aum_raw) and str(aum_raw).replace('.', '').replace('-', '').isdigit():
-                    try:
-                        aum_billions = float(aum_raw) / 1000
-                        aum_display = f"${aum_billions:.1f}B"
-                    except (ValueError, TypeError):
-                        aum_display = format_value(aum_raw)
-                else:
-                    aum_display = format_value(aum_raw)
-                
-                st.markdown(f"AUM: {aum_display}")
+                st.markdown(f"AUM: {format_aum(investor_row.get('AUM'))}")
             
             with col2:
                 if st.button("View Details", key=f"btn_{investor_row['Investors']}", type="primary"):
-                    st.session_state.selected_investor = investor_row
+                    st.session_state.selected_investor_id = row_id
                     st.session_state.current_page = "details"
                     st.rerun()
         else:
             st.error("Company not found in database.")
+    
+    investor_filters()
+
+def filter_ranges() -> Dict:
+    """Metric ranges from the minimum inputs (amounts are entered in billions, stored in millions)"""
+    minimums = {
+        'aum': st.session_state.get('filter_min_aum', 0.0) * 1000,
+        'dry_powder': st.session_state.get('filter_min_dry_powder', 0.0) * 1000,
+        'recent_investments': st.session_state.get('filter_min_recent', 0),
+    }
+    return {metric: (minimum, None) for metric, minimum in minimums.items() if minimum}
+
+def investor_filters():
+    """Faceted filters with live counts, ranked by a metric; results open the details page"""
+    service = get_investor_service()
+    st.markdown("## 🎛️ Filter Investors")
+    st.markdown("*Narrow the list by type, country and size, then rank it*")
+    
+    # Counts depend on every filter, so query with the current widget state before drawing them
+    selected = {facet: st.session_state.get(f"filter_{facet}", []) for facet in FACETS}
+    ranges = filter_ranges()
+    sort_by = st.session_state.get('filter_sort', '')
+    active = any(selected.values()) or ranges or sort_by
+    signature = (repr(selected), repr(ranges), sort_by, service.dataset_version)
+    if st.session_state.get('filter_signature') != signature:
+        st.session_state.filter_signature = signature
+        st.session_state.filter_limit = FILTER_PAGE_SIZE
+    limit = st.session_state.filter_limit
+    result = service.filter_investors(selected, ranges, sort_by=sort_by or None, limit=limit)
+    
+    columns = st.columns(len(FACETS))
+    for column, facet in zip(columns, FACETS):
+        counts = result['counts'].get(facet, {})
+        # Keep chosen values listed even when other filters leave them no matches
+        options = sorted(set(counts) | set(selected[facet]), key=lambda value: (-counts.get(value, 0), value))
+        column.multiselect(FACET_LABELS[facet], options=options, key=f"filter_{facet}",
+                           format_func=lambda value, counts=counts: f"{value} ({counts.get(value, 0):,})")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.number_input("Min AUM ($B)", min_value=0.0, step=0.5, key="filter_min_aum")
+    col2.number_input("Min dry powder ($B)", min_value=0.0, step=0.5, key="filter_min_dry_powder")
+    col3.number_input("Min deals (12 months)", min_value=0, step=1, key="filter_min_recent")
+    col4.selectbox("Sort by", options=list(SORT_OPTIONS), format_func=SORT_OPTIONS.get, key="filter_sort")
+    
+    if not active:
+        return
+    st.markdown(f"**{result['total']:,} investors match**")
+    for row_id, investor in zip(result['row_ids'], result['investors']):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.markdown(f"**{investor['Investors']}**")
+            st.markdown(f"*{format_value(investor.get('Primary Investor Type'))} | {format_value(investor.get('HQ Location'))}* · "
+                        f"AUM {format_aum(investor.get('AUM'))} · Dry powder {format_aum(investor.get('Dry Powder'))} · "
+                        f"{format_value(investor.get('Investments in the last 12 months'), '0')} deals in 12 months")
+        with col2:
+            if st.button("View Details", key=f"filter_view_{row_id}"):
+                st.session_state.selected_investor_id = row_id
+                st.session_state.current_page = "details"
+                st.rerun()
+    
+    if result['total'] > limit and st.button("Show more investors", key="filter_more"):
+        st.session_state.filter_limit = limit + FILTER_PAGE_SIZE
+        st.rerun()
+
+def stream_to(updates: queue.Queue, section: str):
+    """Callback that forwards partial text from a worker thread to the page, if streaming is on"""
+    if not STREAMING_ENABLED:
+        return None
+    return lambda partial_text: updates.put((section, partial_text))
+
+def as_completed_with_streaming(pending: Dict[Future, str], placeholders: Dict, updates: queue.Queue):
+    """Yield (future, section) as each finishes, rendering streamed partial text meanwhile
+    
+    Worker threads cannot touch Streamlit elements, so partial text is queued and drawn here.
+    """
+    remaining = dict(pending)
+    while remaining:
+        try:
+            section, partial_text = updates.get(timeout=0.05)
+            # Every partial for a section is queued before its future completes, so skip late ones
+            if section in remaining.values():
+                placeholders[section].markdown(partial_text + " ▌")
+        except queue.Empty:
+            pass
+        for future in [f for f in remaining if f.done()]:
+            yield future, remaining.pop(future)
+
+def render_company_info(placeholder, company_info: str):
+    """Show the AI company insights in their reserved slot"""
+    placeholder.markdown(company_info)
+
+def render_news(placeholder, news_content: Optional[str]):
+    """Show the news section in its reserved slot"""
+    if news_content and news_content != "No recent verified news articles found.":
+        placeholder.markdown(news_content)
+    else:
+        placeholder.info("No recent verified news articles found for this company.")
+
+def render_news_previews(news_content: Optional[str]):
+    """Title and description of every article linked from the news section, fetched together"""
+    urls = extract_urls(news_content)
+    if not urls:
+        return
+    with st.expander(f"🔗 Article previews ({len(urls)})"):
+        for url, preview in get_link_previews(urls).items():
+            st.markdown(f"**[{preview['title']}]({url})** · {preview['domain']}")
+            st.caption(preview['description'])
 
 def details_page():
     """Display the details page with auto-loading insights"""
-    investor_row = st.session_state.selected_investor
+    investor_row = get_investor(st.session_state.selected_investor_id)
     
     if investor_row is None:
+        if st.session_state.selected_investor_id is not None:
+            # Removed from the investor list by a reload while this page was open
+            st.warning("This investor is no longer in the event list.")
+            if st.button("← Back to Search", key="back_button"):
+                st.session_state.current_page = "search"
+                st.session_state.selected_investor_id = None
+                st.rerun()
+            return
         st.error("No investor selected")
         return
     
     # Back button
     if st.button("← Back to Search", key="back_button"):
         st.session_state.current_page = "search"
-        st.session_state.selected_investor = None
+        st.session_state.selected_investor_id = None
         st.rerun()
     
     st.markdown(f"# {investor_row['Investors']}")
@@ -927,17 +771,7 @@ def details_page():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        # Convert AUM from millions to billions
-        aum_raw = investor_row.get('AUM', '')
-        if aum_raw and pd.notna(aum_raw) and str(aum_raw).replace('.', '').replace('-', '').isdigit():
-            try:
-                aum_billions = float(aum_raw) / 1000
-                aum_display = f"${aum_billions:.1f}B"
-            except (ValueError, TypeError):
-                aum_display = format_value(aum_raw)
-        else:
-            aum_display = format_value(aum_raw)
-        
+        aum_display = format_aum(investor_row.get('AUM'))
         st.markdown(f'<div style="background: #e8f5e8; padding: 16px; border-radius: 8px; text-align: center; margin: 5px 0;"><h4 style="margin: 0; color: #2e7d32;">AUM (Billions)</h4><h3 style="margin: 0; color: #1b5e20;">{aum_display}</h3></div>', unsafe_allow_html=True)
         
         pe_category = format_value(investor_row.get('PE Category'))
@@ -962,83 +796,96 @@ def details_page():
         description_text = investor_row["Description"]
         st.markdown(f'<div style="background: #e8f5e8; padding: 16px; border-radius: 8px; border-left: 4px solid #4caf50; font-size: 16px; line-height: 1.5;">{description_text}</div>', unsafe_allow_html=True)
     
+    # Peers come from the local similarity index, so they show before any AI content
+    peers = get_peers(st.session_state.selected_investor_id)
+    if peers:
+        st.markdown("## 🤝 Similar Investors")
+        st.markdown("*Closest in the event list by AUM, deal counts, dry powder and description*")
+        for peer in peers:
+            peer_row = peer['investor']
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.markdown(f"**{peer_row['Investors']}**")
+                st.markdown(f"*{format_value(peer_row.get('Primary Investor Type'))} | {format_value(peer_row.get('HQ Location'))}* · "
+                            f"AUM {format_aum(peer_row.get('AUM'))} · {format_value(peer_row.get('Investments'), '0')} investments")
+            with col2:
+                if st.button("View Details", key=f"peer_{peer['row_id']}"):
+                    st.session_state.selected_investor_id = peer['row_id']
+                    st.rerun()
+    
     # Progressive AI Content Loading
     st.markdown("---")
-    company_cache_key = f"{investor_row['Investors']}_full_info"
-    news_cache_key = f"{investor_row['Investors']}_news"
-    
-    # Load and display AI company insights immediately
+    company_cache_key, news_cache_key = session_cache_keys(investor_row['Investors'])
     company_name = investor_row['Investors']
-    logger.info(f"🏢 Starting company info load for: {company_name}")
     
     company_info = st.session_state.ai_cache.get(company_cache_key)
-    if not company_info:
-        # Show loading message for company info
-        company_loading = st.empty()
-        company_loading.info("🚀 Loading AI insights...")
-        logger.info(f"💭 Company info not cached, generating for: {company_name}")
-        
-        try:
-            company_info = generate_company_info(company_name)
-            if company_info:
-                st.session_state.ai_cache[company_cache_key] = company_info
-                company_loading.empty()
-                logger.info(f"✅ Company info loaded and cached for: {company_name}")
-        except Exception as e:
-            logger.error(f"❌ Error loading company info for {company_name}: {str(e)}")
-            logger.exception("Company info loading error traceback:")
-            company_loading.error(f"❌ Error loading AI insights: {str(e)}")
-            company_info = "Error loading company information."
-    else:
-        logger.info(f"📋 Company info cache hit for: {company_name}")
-    
-    # Display company information immediately when available
-    if company_info:
-        st.markdown(company_info)
+    news_content = st.session_state.ai_cache.get(news_cache_key)
     
-    # Recent News Section - Load separately
+    # Placeholders reserve each section so whichever result lands first renders first
+    company_placeholder = st.empty()
     st.markdown("---")
     st.markdown("## 📰 Recent News")
+    news_placeholder = st.empty()
     
-    # Load news separately (doesn't block company info display)
-    logger.info(f"📰 Starting news load for: {company_name}")
+    # Start insights (Flash) and news (Pro) concurrently; page latency is the slower of the two
+    pending = {}
+    updates = queue.Queue()
+    if company_info:
+        logger.info(f"📋 Company info cache hit for: {company_name}")
+    else:
+        company_placeholder.info("🚀 Loading AI insights...")
+        logger.info(f"💭 Company info not cached, generating for: {company_name}")
+        future = get_ai_executor().submit(get_investor_service().company_info, company_name, stream_to(updates, "company"))
+        pending[future] = "company"
     
-    news_content = st.session_state.ai_cache.get(news_cache_key)
-    if not news_content:
-        # Show loading message for news
-        news_loading = st.empty()
-        news_loading.info("🚀 Loading recent news...")
+    if news_content:
+        logger.info(f"📋 News cache hit for: {company_name}")
+    else:
+        news_placeholder.info("🚀 Loading recent news...")
         logger.info(f"📡 News not cached, generating for: {company_name}")
-        
+        future = get_ai_executor().submit(get_investor_service().news, company_name, stream_to(updates, "news"))
+        pending[future] = "news"
+    
+    if company_info:
+        render_company_info(company_placeholder, company_info)
+    if news_content:
+        render_news(news_placeholder, news_content)
+    
+    placeholders = {"company": company_placeholder, "news": news_placeholder}
+    for future, section in as_completed_with_streaming(pending, placeholders, updates):
         try:
-            news_content = generate_news_articles(company_name)
-            if news_content:
-                st.session_state.ai_cache[news_cache_key] = news_content
-                news_loading.empty()
-                logger.info(f"✅ News loaded and cached for: {company_name}")
+            result = future.result()
         except Exception as e:
-            logger.error(f"❌ Error loading news for {company_name}: {str(e)}")
-            logger.exception("News loading error traceback:")
-            news_loading.error(f"❌ Error loading news: {str(e)}")
-            news_content = "Error loading news articles."
-    else:
-        logger.info(f"📋 News cache hit for: {company_name}")
+            label = "AI insights" if section == "company" else "news"
+            logger.error(f"❌ Error loading {label} for {company_name}: {str(e)}")
+            logger.exception(f"{label} loading error traceback:")
+            placeholder = company_placeholder if section == "company" else news_placeholder
+            placeholder.error(f"❌ Error loading {label}: {str(e)}")
+            continue
+        
+        if section == "company":
+            if result:
+                st.session_state.ai_cache[company_cache_key] = result
+                logger.info(f"✅ Company info loaded and cached for: {company_name}")
+            render_company_info(company_placeholder, result or "Information not available.")
+        else:
+            if result:
+                st.session_state.ai_cache[news_cache_key] = result
+                logger.info(f"✅ News loaded and cached for: {company_name}")
+            render_news(news_placeholder, result)
+            news_content = result
     
-    # Display news content
-    if news_content and news_content != "No recent verified news articles found.":
-        st.markdown(news_content)
-    else:
-        st.info("No recent verified news articles found for this company.")
+    # After both sections, so slow sites never delay the AI content
+    render_news_previews(news_content)
         
     # Refresh button
     col1, col2, col3 = st.columns([1, 1, 1])
     with col2:
         if st.button("🔄 Refresh All Content", key="refresh_all", use_container_width=True):
             # Clear cache and reload
-            if company_cache_key in st.session_state.ai_cache:
-                del st.session_state.ai_cache[company_cache_key]
-            if news_cache_key in st.session_state.ai_cache:
-                del st.session_state.ai_cache[news_cache_key]
+            st.session_state.ai_cache.pop(company_cache_key, None)
+            st.session_state.ai_cache.pop(news_cache_key, None)
+            get_investor_service().invalidate_company(company_name)
             st.rerun()
     
     # AI Research Assistant Chatbot Section
@@ -1050,6 +897,7 @@ def details_page():
     if st.session_state.current_company != investor_row['Investors']:
         st.session_state.current_company = investor_row['Investors']
         st.session_state.chat_history = []  # Reset chat history for new company
+        st.session_state.chat_summary = {}
     
     # Chat input section with form for Enter-to-send
     with st.form(key="chat_form", clear_on_submit=True):
@@ -1066,6 +914,11 @@ def details_page():
     
     # Process chat when form is submitted
     if submit_button and chat_question:
+        answer_placeholder = st.empty()
+        stream_answer = None
+        if STREAMING_ENABLED:
+            stream_answer = lambda partial_text: answer_placeholder.markdown(f'<div class="assistant-message"><strong>🤖 ARIA:</strong> {partial_text} ▌</div>', unsafe_allow_html=True)
+        
         with st.spinner("ARIA is analyzing your question..."):
             logger.info(f"Processing chat question: {chat_question[:50]}...")
             
@@ -1082,7 +935,9 @@ def details_page():
                 st.session_state.chat_history,
                 company_metadata=company_metadata,
                 company_insights=company_insights,
-                company_news=news_content
+                company_news=news_content,
+                company_peers=peers,
+                on_text=stream_answer
             )
             
             # Add to chat history
@@ -1113,33 +968,72 @@ def details_page():
         with col2:
             if st.button("🗑️ Clear Chat History", key="clear_chat", use_container_width=True):
                 st.session_state.chat_history = []
+                st.session_state.chat_summary = {}
                 logger.info("Chat history cleared")
                 st.rerun()
 
+@st.cache_resource
+def init_metrics():
+    """Enable metrics per METRICS_* variables and register gauges for the shared resources, once per process"""
+    registry = metrics.configure_from_env()
+    if not registry.enabled:
+        return registry
+
+    def cache_entries():
+        return [({'cache': name}, len(cache)) for name, cache in
+                (('responses', get_response_cache()), ('chat', get_chat_cache()), ('link_preview', get_link_previewer().cache))]
+
+    def session_footprint():
+        stats = get_session_cache_budget().stats()
+        return [({'measure': 'bytes'}, stats['bytes']), ({'measure': 'entries'}, stats['entries']),
+                ({'measure': 'sessions'}, stats['sessions'])]
+
+    def scheduler_queues():
+        return [({'model': model}, lane['queue_depth']) for model, lane in get_gemini_scheduler().stats().items()]
+
+    def semantic_hit_rate():
+        return [({}, get_semantic_cache().stats()['hit_rate'])]
+
+    registry.gauge('cache_entries', cache_entries, "Entries held by each shared cache")
+    registry.gauge('session_cache', session_footprint, "Footprint of all per-session AI caches")
+    registry.gauge('gemini_queue_depth', scheduler_queues, "Callers waiting for the Gemini scheduler by model")
+    registry.gauge('semantic_cache_hit_rate', semantic_hit_rate, "Share of chat questions answered by a reworded match")
+    registry.gauge('gemini_in_flight', lambda: [({}, ai_service.SINGLE_FLIGHT.in_flight())], "Distinct Gemini calls in flight")
+    return registry
+
 def main():
     """Main application function with two-page structure"""
+    init_metrics()
+    
     # Setup
     api_success, client = setup_gemini_api()
     if not api_success:
         st.stop()
     
-    # Store client in session state
+    # Keep a reference to the shared client in session state
     st.session_state.gemini_client = client
     
-    # Load data
-    if st.session_state.investors_df is None:
-        with st.spinner("Loading investor data..."):
-            st.session_state.investors_df = load_investor_data()
+    if PREWARM_ON_STARTUP:
+        start_prewarm(client)
     
-    df = st.session_state.investors_df
-    if df is None:
+    # Load data
+    with st.spinner("Loading investor data..."):
+        service = get_investor_service()
+    if service is None:
         st.stop()
+    # Same process-wide client object on every run; the service is shared with it
+    service.client = client
+    watch_investor_data(service)
     
     # Page routing
-    if st.session_state.current_page == "search":
+    page = st.session_state.current_page
+    started = time.perf_counter()
+    if page == "search":
         search_page()
-    elif st.session_state.current_page == "details":
+    elif page == "details":
         details_page()
+    # Not a timer block: st.rerun() and st.stop() end the run with an exception
+    metrics.observe('page_render_seconds', time.perf_counter() - started, page=page)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""Synthetic investor CSVs in the Yogen.csv schema, for benchmarking at larger sizes
+
+Names are built from word parts so every row is unique and search queries behave like they
+do on real firm names; numeric columns follow the ranges (and missing-value rate) of the
+shipped list. Files are written once per (rows, seed) and reused:
+
+    python -m benchmarks.datasets --rows 100000 --out .cache/benchmarks
+"""
+import argparse
+import os
+import sys
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from investor_data import AMOUNT_COLUMNS, COUNT_COLUMNS, DEFAULT_CSV_PATH
+
+DEFAULT_DATA_DIR = os.path.join('.cache', 'benchmarks')
+
+NAME_PREFIXES = ["Accel", "Summit", "Harbor", "Granite", "Blue", "North", "Iron", "Silver", "Oak", "Pine",
+                 "Crescent", "Atlas", "Beacon", "Cedar", "Falcon", "Horizon", "Keystone", "Meridian",
+                 "Pinnacle", "Riverside", "Sterling", "Vista", "Willow", "Apex", "Bain", "Carlyle"]
+NAME_ROOTS = ["stone", "bridge", "point", "field", "gate", "crest", "wood", "view", "rock", "lake",
+              "ridge", "haven", "brook", "park", "peak", "shore", "vale", "mark", "light", "well"]
+NAME_SUFFIXES = ["Capital", "Partners", "Equity", "Ventures", "Investments", "Group", "Holdings",
+                 "Capital Partners", "Growth", "Advisors", "Management", "Private Equity"]
+INVESTOR_TYPES = ["PE/Buyout", "Growth/Expansion", "Venture Capital", "Fund of Funds", "Asset Manager",
+                  "Secondary Buyer", "Infrastructure", "Real Estate", "Mezzanine", "Family Office"]
+COUNTRIES = ["United States", "United Kingdom", "India", "Germany", "France", "Canada", "Singapore",
+             "Japan", "Australia", "Netherlands", "Sweden", "Switzerland"]
+CITIES = ["New York, NY", "Menlo Park, CA", "Boston, MA", "London", "Mumbai", "Frankfurt", "Paris",
+          "Toronto, ON", "Singapore", "Tokyo", "Sydney", "Amsterdam", "Stockholm", "Zurich"]
+PE_CATEGORIES = ["1. >100B AUM", "2. 50B-100B AUM", "3. 25B-50B AUM", "4. 10B-25B AUM",
+                 "5. 5B-10B AUM", "6. 1B-5B AUM", "7. <1B AUM"]
+SECTORS = ["software", "healthcare", "consumer", "industrial", "financial services", "energy",
+           "tech-enabled services", "infrastructure", "life sciences", "business services"]
+
+# Share of empty cells in the numeric columns, as in the shipped list
+MISSING_RATE = 0.15
+
+
+def synthetic_investors(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Raw (string-valued) investor rows in the Yogen.csv column order"""
+    rng = np.random.default_rng(seed)
+    prefixes = rng.choice(NAME_PREFIXES, rows)
+    roots = rng.choice(NAME_ROOTS, rows)
+    suffixes = rng.choice(NAME_SUFFIXES, rows)
+    # The row number keeps names unique at any size
+    names = [f"{p}{r} {s} {i}" for i, (p, r, s) in enumerate(zip(prefixes, roots, suffixes))]
+    short_names = np.where(rng.random(rows) < 0.1, "#N/A", [name.rsplit(' ', 1)[0] for name in names])
+
+    countries = rng.choice(COUNTRIES, rows)
+    sectors = rng.choice(SECTORS, (rows, 2))
+    founded = rng.integers(1970, 2024, rows)
+    descriptions = [
+        f"Founded in {year}, {name} is a private equity investment firm based in {country}. "
+        f"The firm prefers to invest in {a} and {b} companies."
+        for year, name, country, (a, b) in zip(founded, names, countries, sectors)
+    ]
+
+    df = pd.DataFrame({
+        'Investors': names,
+        'Name in PEI Event List': short_names,
+        'Primary Investor Type': rng.choice(INVESTOR_TYPES, rows),
+        'HQ Country/Territory/Region': countries,
+        'HQ Location': rng.choice(CITIES, rows),
+        'AUM': np.round(rng.lognormal(8.5, 1.5, rows), 2),
+        'PE Category': rng.choice(PE_CATEGORIES, rows),
+        'Investments': rng.integers(1, 3000, rows),
+        'Active Portfolio': rng.integers(0, 400, rows),
+        'Exits': rng.integers(0, 800, rows),
+        'Investments in the last 12 months': rng.integers(0, 120, rows),
+        'Dry Powder': np.round(rng.lognormal(7.5, 1.5, rows), 2),
+        'Last Investment Company': [f"{r.capitalize()}{s} Inc" for r, s in zip(rng.choice(NAME_ROOTS, rows), rng.choice(NAME_ROOTS, rows))],
+        'Description': descriptions,
+    })
+    for column in AMOUNT_COLUMNS + COUNT_COLUMNS:
+        df[column] = df[column].astype(str).where(rng.random(rows) >= MISSING_RATE, "")
+    return df
+
+
+def schema_columns(path: str = DEFAULT_CSV_PATH) -> List[str]:
+    """Column names of the shipped investor list"""
+    return pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns.tolist()
+
+
+def write_synthetic_csv(rows: int, data_dir: str = DEFAULT_DATA_DIR, seed: int = 0) -> str:
+    """Path of a synthetic CSV with the given row count, generating it if missing"""
+    path = os.path.join(data_dir, f"investors_{rows}_{seed}.csv")
+    if os.path.exists(path):
+        return path
+    os.makedirs(data_dir, exist_ok=True)
+    df = synthetic_investors(rows, seed)
+    if os.path.exists(DEFAULT_CSV_PATH):
+        df = df[schema_columns()]
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Write synthetic investor CSVs in the Yogen.csv schema")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--out', default=DEFAULT_DATA_DIR, help="Directory for the generated files")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for rows in args.rows:
+        path = write_synthetic_csv(rows, args.out, args.seed)
+        print(f"{rows:>9,} rows  {os.path.getsize(path) / 1e6:8.1f} MB  {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""Local stand-in for genai.Client so the app can be exercised without an API key
+
+FakeGeminiClient implements the parts of the SDK the app uses (models.generate_content,
+models.generate_content_stream, caches.create and inlined-request batches) and answers with response-shaped markdown,
+search grounding metadata and token usage. Latency, time to first token and the share of
+calls failing with a retryable 429/503 are configurable, so benchmarks and load tests can
+measure the app's own overhead or its behaviour under a flaky backend.
+
+    import ai_service
+    from benchmarks.fake_gemini import FakeGeminiClient
+
+    fake = FakeGeminiClient(latency_seconds=0.5, failure_rate=0.05)
+    ai_service.create_client = lambda *args, **kwargs: fake
+"""
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterator
+
+from google.genai import errors, types
+
+# Characters per streamed chunk
+CHUNK_CHARS = 200
+
+INSIGHTS_SECTIONS = ("About the Company", "What They Do", "Major Investments")
+NEWS_SECTIONS = ("Recent News",)
+
+
+def fake_failure(rng: random.Random) -> errors.APIError:
+    """A rate-limit or overload error as raised by the SDK"""
+    if rng.random() < 0.5:
+        return errors.ClientError(429, {'error': {'code': 429, 'message': 'Resource exhausted', 'status': 'RESOURCE_EXHAUSTED'}})
+    return errors.ServerError(503, {'error': {'code': 503, 'message': 'The model is overloaded', 'status': 'UNAVAILABLE'}})
+
+
+def fake_text(prompt: str, rng: random.Random, words: int) -> str:
+    """Markdown answer shaped like the prompt's expected output"""
+    vocabulary = ("the", "firm", "invests", "in", "software", "healthcare", "growth", "buyout", "fund",
+                  "portfolio", "companies", "across", "North", "America", "and", "Europe", "with", "$2.5 billion")
+    if "ARIA" in prompt:
+        return " ".join(rng.choice(vocabulary) for _ in range(words // 4)).capitalize() + "."
+    sections = NEWS_SECTIONS if "news" in prompt.lower() else INSIGHTS_SECTIONS
+    per_section = max(words // len(sections), 1)
+    return "\n\n".join(
+        f"## {heading}\n" + " ".join(rng.choice(vocabulary) for _ in range(per_section)) + "."
+        for heading in sections
+    )
+
+
+def fake_grounding(rng: random.Random, sources: int = 6):
+    """Grounding metadata with web sources, as attached to search-grounded responses"""
+    chunks = [SimpleNamespace(web=SimpleNamespace(uri=f"https://www.source{i}.example.com/article/{rng.randint(1, 9999)}"))
+              for i in range(sources)]
+    supports = [SimpleNamespace(grounding_chunk_indices=rng.sample(range(sources), k=2)) for _ in range(sources)]
+    return SimpleNamespace(grounding_metadata=SimpleNamespace(grounding_supports=supports, grounding_chunks=chunks))
+
+
+def fake_usage(prompt: str, text: str, cached: bool):
+    """Token counts estimated at four characters per token"""
+    prompt_tokens = len(prompt) // 4
+    return SimpleNamespace(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=len(text) // 4,
+        cached_content_token_count=prompt_tokens if cached else None,
+        thoughts_token_count=None,
+    )
+
+
+class FakeModels:
+    """client.models: unary and streaming generation"""
+
+    def __init__(self, client: "FakeGeminiClient"):
+        self._client = client
+
+    def generate_content(self, *, model: str, contents, config=None):
+        rng = self._client.begin_call('generate_content')
+        time.sleep(self._client.latency_seconds)
+        prompt = str(contents)
+        text = fake_text(prompt, rng, self._client.response_words)
+        cached = bool(getattr(config, 'cached_content', None))
+        return SimpleNamespace(text=text, candidates=[fake_grounding(rng)], usage_metadata=fake_usage(prompt, text, cached))
+
+    def generate_content_stream(self, *, model: str, contents, config=None) -> Iterator:
+        rng = self._client.begin_call('generate_content_stream')
+        prompt = str(contents)
+        text = fake_text(prompt, rng, self._client.response_words)
+        cached = bool(getattr(config, 'cached_content', None))
+        return self._stream(rng, prompt, text, cached)
+
+    def _stream(self, rng: random.Random, prompt: str, text: str, cached: bool) -> Iterator:
+        first_token = min(self._client.time_to_first_token_seconds, self._client.latency_seconds)
+        time.sleep(first_token)
+        pieces = [text[start:start + CHUNK_CHARS] for start in range(0, len(text), CHUNK_CHARS)] or [""]
+        per_chunk = (self._client.latency_seconds - first_token) / len(pieces)
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(per_chunk)
+            last = i == len(pieces) - 1
+            yield SimpleNamespace(
+                text=piece,
+                candidates=[fake_grounding(rng)] if last else [],
+                usage_metadata=fake_usage(prompt, text, cached) if last else None,
+            )
+
+
+class FakeCaches:
+    """client.caches: context cache creation"""
+
+    def __init__(self, client: "FakeGeminiClient"):
+        self._client = client
+
+    def create(self, *, model: str, config=None):
+        self._client.begin_call('caches.create', can_fail=False)
+        return SimpleNamespace(name=f"cachedContents/fake-{self._client.calls['caches.create']}")
+
+
+class FakeBatches:
+    """client.batches: inlined-request batch jobs that succeed after batch_polls status checks"""
+
+    def __init__(self, client: "FakeGeminiClient"):
+        self._client = client
+        self._jobs: Dict[str, Dict] = {}
+
+    def create(self, *, model: str, src, config=None):
+        rng = self._client.begin_call('batches.create', can_fail=False)
+        with self._client._lock:
+            name = f"batches/fake-{self._client.calls['batches.create']}"
+            self._jobs[name] = {'model': model, 'requests': list(src), 'polls': 0, 'rng': rng, 'responses': None}
+        return SimpleNamespace(name=name, state=types.JobState.JOB_STATE_PENDING, dest=None)
+
+    def get(self, *, name: str):
+        self._client.begin_call('batches.get', can_fail=False)
+        with self._client._lock:
+            job = self._jobs[name]
+            job['polls'] += 1
+            if job['polls'] < self._client.batch_polls and job['responses'] is None:
+                return SimpleNamespace(name=name, state=types.JobState.JOB_STATE_RUNNING, dest=None)
+            if job['responses'] is None:
+                job['responses'] = [self._respond(job['rng'], request) for request in job['requests']]
+            state = types.JobState.JOB_STATE_CANCELLED if job.get('cancelled') else types.JobState.JOB_STATE_SUCCEEDED
+            return SimpleNamespace(name=name, state=state, dest=SimpleNamespace(inlined_responses=job['responses']))
+
+    def cancel(self, *, name: str):
+        with self._client._lock:
+            self._jobs[name]['cancelled'] = True
+
+    def _respond(self, rng: random.Random, request):
+        """One inlined response; failures are reported per request like the real API"""
+        if rng.random() < self._client.failure_rate:
+            return SimpleNamespace(response=None, metadata=request.metadata,
+                                   error=SimpleNamespace(code=503, message="The model is overloaded"))
+        prompt = str(request.contents)
+        text = fake_text(prompt, rng, self._client.response_words)
+        response = SimpleNamespace(text=text, candidates=[fake_grounding(rng)], usage_metadata=fake_usage(prompt, text, False))
+        return SimpleNamespace(response=response, metadata=request.metadata, error=None)
+
+
+class FakeGeminiClient:
+    """Thread-safe fake Gemini client with configurable latency and failure rate"""
+
+    def __init__(self, latency_seconds: float = 0.5, time_to_first_token_seconds: float = 0.2,
+                 failure_rate: float = 0.0, response_words: int = 400, seed: int = 0, batch_polls: int = 2):
+        self.latency_seconds = latency_seconds
+        self.time_to_first_token_seconds = time_to_first_token_seconds
+        self.failure_rate = failure_rate
+        self.response_words = response_words
+        self.batch_polls = batch_polls
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {'generate_content': 0, 'generate_content_stream': 0, 'caches.create': 0,
+                                      'batches.create': 0, 'batches.get': 0}
+        self.failures = 0
+        self.models = FakeModels(self)
+        self.caches = FakeCaches(self)
+        self.batches = FakeBatches(self)
+
+    def begin_call(self, kind: str, can_fail: bool = True) -> random.Random:
+        """Count a call, raise an injected failure at the configured rate, else return its RNG"""
+        with self._lock:
+            self.calls[kind] += 1
+            fail = can_fail and self._rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+            rng = random.Random(self._rng.random())
+        if fail:
+            raise fake_failure(rng)
+        return rng
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'calls': dict(self.calls), 'injected_failures': self.failures}
@@ -0,0 +1,224 @@
+"""Load test for the JSON API (api.py) against a local fake Gemini backend
+
+Unless --url points at a running server, the API is started in a subprocess with
+FakeGeminiClient (so it does not share the GIL with the load generator), serving Yogen.csv or
+a synthetic dataset. --users simulated attendees then loop for --duration seconds: search,
+open a profile, stream the insights, stream one chat question. Companies are drawn from a hot
+set of --companies investors, like a room full of people looking at the same few firms, so
+the shared caches and request coalescing are exercised. Per-endpoint latency, SSE time to
+first event, throughput and errors are printed and written as JSON:
+
+    python -m benchmarks.load_test --users 50 --duration 30 --latency 1.0
+    python -m benchmarks.load_test --url http://localhost:8000 --users 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.datasets import DEFAULT_DATA_DIR, write_synthetic_csv
+from benchmarks.suite import CHAT_QUESTIONS, environment_info, summarize
+
+SERVER_START_TIMEOUT = 120
+
+
+class Recorder:
+    """Latencies and failures per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, seconds: float, ok: bool):
+        if ok:
+            self.latencies[name].append(seconds)
+        else:
+            self.errors[name] += 1
+
+
+async def timed_get(client: httpx.AsyncClient, recorder: Recorder, name: str, url: str, **params) -> Optional[Dict]:
+    started = time.perf_counter()
+    try:
+        response = await client.get(url, params=params)
+        ok = response.status_code == 200
+    except httpx.HTTPError:
+        response, ok = None, False
+    recorder.record(name, time.perf_counter() - started, ok)
+    return response.json() if ok else None
+
+
+async def timed_stream(client: httpx.AsyncClient, recorder: Recorder, name: str, method: str, url: str, **kwargs):
+    """Consume an SSE response, recording time to the first event and to the done event"""
+    started = time.perf_counter()
+    first_event = None
+    ok = False
+    try:
+        async with client.stream(method, url, headers={'Accept': 'text/event-stream'}, **kwargs) as response:
+            if response.status_code == 200:
+                async for line in response.aiter_lines():
+                    if line.startswith('event:'):
+                        if first_event is None:
+                            first_event = time.perf_counter() - started
+                        event = line.split(':', 1)[1].strip()
+                        if event in ('done', 'error'):
+                            ok = event == 'done'
+                            break
+    except httpx.HTTPError:
+        ok = False
+    recorder.record(name, time.perf_counter() - started, ok)
+    if ok and first_event is not None:
+        recorder.record(f"{name}_first_event", first_event, True)
+
+
+async def attendee(client: httpx.AsyncClient, recorder: Recorder, companies: List[Dict], deadline: float, seed: int):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        company = rng.choice(companies)
+        name = company['Investors']
+        await timed_get(client, recorder, 'search', '/api/search', q=name[:rng.randint(3, 8)], limit=10)
+        row_id = company['row_id']
+        await timed_get(client, recorder, 'profile', f'/api/companies/{row_id}')
+        await timed_stream(client, recorder, 'insights_stream', 'GET', f'/api/companies/{row_id}/insights')
+        await timed_stream(client, recorder, 'chat_stream', 'POST', f'/api/companies/{row_id}/chat',
+                           json={'question': rng.choice(CHAT_QUESTIONS), 'history': [], 'stream': True})
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args) -> (subprocess.Popen, str):
+    port = free_port()
+    command = [sys.executable, '-m', 'benchmarks.load_test', '--serve', '--port', str(port),
+               '--latency', str(args.latency), '--first-token', str(args.first_token),
+               '--failure-rate', str(args.failure_rate), '--rows', str(args.rows), '--data-dir', args.data_dir]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if not args.verbose else None)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("API server exited during startup (run with --verbose to see its log)")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return server, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"API server did not start within {SERVER_START_TIMEOUT}s")
+
+
+def serve(args) -> int:
+    """Run api.py with the fake Gemini client (the --serve subprocess)"""
+    import logging
+
+    import uvicorn
+
+    from benchmarks.fake_gemini import FakeGeminiClient
+    from investor_data import DEFAULT_CSV_PATH, load_investor_dataset
+
+    # Measure the service, not the production request quota
+    os.environ.update({'GEMINI_FLASH_RPM': '1000000', 'GEMINI_FLASH_BURST': '1000000',
+                       'GEMINI_PRO_RPM': '1000000', 'GEMINI_PRO_BURST': '1000000', 'AI_CACHE_DB_PATH': ''})
+    os.environ.pop('API_TOKEN', None)
+    logging.basicConfig(level=logging.WARNING)
+
+    import api
+    from investor_service import create_investor_service
+
+    csv_path = write_synthetic_csv(args.rows, args.data_dir) if args.rows else DEFAULT_CSV_PATH
+    fake = FakeGeminiClient(latency_seconds=args.latency, time_to_first_token_seconds=args.first_token,
+                            failure_rate=args.failure_rate)
+    service = create_investor_service(load_investor_dataset(csv_path), client=fake)
+    uvicorn.run(api.create_app(service), host='127.0.0.1', port=args.port, log_level='warning')
+    return 0
+
+
+async def run_load(url: str, args) -> Dict:
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client:
+        # Hot set of companies everyone looks at
+        rng = random.Random(args.seed)
+        companies = []
+        for row_id in rng.sample(range(args.rows or 100), args.companies):
+            record = (await client.get(f'/api/companies/{row_id}')).json()
+            if 'row_id' in record:
+                companies.append(record)
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(attendee(client, recorder, companies, deadline, args.seed + i) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+
+    completed = sum(len(values) for name, values in recorder.latencies.items() if not name.endswith('_first_event'))
+    return {
+        'elapsed_seconds': round(elapsed, 2),
+        'requests': completed + sum(recorder.errors.values()),
+        'requests_per_second': round(completed / elapsed, 1),
+        'errors': dict(recorder.errors),
+        'endpoints': {name: summarize(values) for name, values in sorted(recorder.latencies.items())},
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the JSON API against a fake Gemini backend")
+    parser.add_argument('--url', help="Test a running server instead of starting one")
+    parser.add_argument('--users', type=int, default=20, help="Concurrent simulated attendees")
+    parser.add_argument('--duration', type=float, default=20.0, help="Seconds to run")
+    parser.add_argument('--companies', type=int, default=10, help="Size of the hot set of companies")
+    parser.add_argument('--rows', type=int, default=0, help="Synthetic dataset size (0 serves Yogen.csv)")
+    parser.add_argument('--latency', type=float, default=1.0, help="Fake Gemini response time in seconds")
+    parser.add_argument('--first-token', type=float, default=0.3, help="Fake Gemini time to first chunk in seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of fake Gemini calls failing with 429/503")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--output', help="JSON results file (default: load-<timestamp>.json in --data-dir)")
+    parser.add_argument('--verbose', action='store_true', help="Show the server log")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=8000, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        return serve(args)
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_server(args)
+    try:
+        results = {'environment': environment_info(), 'config': {k: v for k, v in vars(args).items() if k not in ('serve', 'port', 'output')},
+                   **asyncio.run(run_load(url, args))}
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    output = args.output or os.path.join(args.data_dir, f"load-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{results['requests']} requests in {results['elapsed_seconds']}s "
+          f"({results['requests_per_second']} req/s), errors: {results['errors'] or 'none'}")
+    for name, stats in results['endpoints'].items():
+        print(f"  {name:<28} n={stats['n']:<6} p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  max {stats['max_ms']:8.1f} ms")
+    print(f"Results written to {output}")
+    return 1 if results['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Micro-benchmark for Gemini response post-processing (text cleanup and Sources section)
+
+Compares the single-pass cleaner, the streaming cleaner and the citation assembler in
+ai_service against the previous multi-pass implementations, and checks that they produce
+identical output. Responses are read from the shared cache database when one is available
+(e.g. after running prewarm.py with AI_CACHE_DB_PATH set), otherwise a synthetic corpus of
+response-shaped text is used:
+
+    python -m benchmarks.postprocess --db .cache/responses.db
+    python -m benchmarks.postprocess --synthetic 500
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from types import SimpleNamespace
+from typing import Callable, List
+from urllib.parse import urlparse
+
+import ai_service
+
+STREAM_CHUNK_CHARS = 120
+
+SAMPLE_SENTENCES = [
+    "The firm manages over $25billion across 4 funds and targets 10-50million equity checks.",
+    "It focuses on software andEnterprise technology, with a growing healthcare practice.",
+    "Founded in 2000, the firm has completed 461investments andExits totalling 85.",
+    "Recent deals include a $120M growth round in 2024Acme and a carve-out of Beta Systems.",
+    "Its flagship fund closed at $2.5Billion, up from $1.8billion in the prior vintage.",
+    "The team looks to partner with founders and management toScale recurring revenue businesses.",
+    "Portfolio companies have grown ARR by 30% on average, driving valuesAcross the platform.",
+    "Headquartered in Menlo Park, it also has offices in London and Mumbai.",
+    "The firm typically invests between 15–75million per transaction.",
+]
+
+
+def legacy_clean_response_text(result: str) -> str:
+    """The nine sequential re.sub passes used before the single-pass cleaner"""
+    result = re.sub(r'(\d+)[-–](\d+)(million|billion|Million|Billion)', r'\1-\2 \3', result)
+    result = re.sub(r'(\d+)(million|billion|Million|Billion)', r'\1 \2', result)
+    result = re.sub(r'(\$\d+)([a-zA-Z])', r'\1 \2', result)
+    result = re.sub(r'(and)([A-Z][a-z])', r'\1 \2', result)
+    result = re.sub(r'(to)([A-Z][a-z])', r'\1 \2', result)
+    result = re.sub(r'(up)([A-Z][a-z])', r'\1 \2', result)
+    result = re.sub(r'(values)([A-Z][a-z])', r'\1 \2', result)
+    result = re.sub(r'(\d)([A-Z][a-z])', r'\1 \2', result)
+    return result
+
+
+def legacy_add_citations(response, text: str) -> str:
+    """The list-membership dedupe and += concatenation used before format_sources"""
+    metadata = response.candidates[0].grounding_metadata
+    supports, chunks = metadata.grounding_supports, metadata.grounding_chunks
+    citation_urls = []
+    for support in supports:
+        if hasattr(support, 'grounding_chunk_indices') and support.grounding_chunk_indices:
+            for chunk_idx in support.grounding_chunk_indices:
+                if chunk_idx < len(chunks) and hasattr(chunks[chunk_idx], 'web') and chunks[chunk_idx].web:
+                    uri = chunks[chunk_idx].web.uri
+                    if uri and 'vertexaisearch.cloud.google.com' not in uri and uri not in citation_urls:
+                        citation_urls.append(uri)
+    if citation_urls:
+        text += "\n\n## Sources\n"
+        for i, uri in enumerate(citation_urls, 1):
+            try:
+                domain = urlparse(uri).netloc.replace('www.', '') or uri
+                text += f"{i}. [{domain}]({uri})\n"
+            except ValueError:
+                text += f"{i}. [Source]({uri})\n"
+    return text
+
+
+def load_cached_responses(db_path: str) -> List[str]:
+    """Response bodies stored by ResponseCache, without their Sources sections"""
+    with sqlite3.connect(db_path) as db:
+        rows = db.execute("SELECT value FROM responses").fetchall()
+    texts = []
+    for (value,) in rows:
+        if value.startswith('{'):
+            # Link previews share the table; they are not Gemini text
+            try:
+                json.loads(value)
+                continue
+            except ValueError:
+                pass
+        texts.append(value.split("\n\n## Sources\n", 1)[0])
+    return texts
+
+
+def synthetic_responses(count: int, seed: int = 7) -> List[str]:
+    """Response-shaped markdown seeded with the glitches the cleaner fixes"""
+    rng = random.Random(seed)
+    responses = []
+    for _ in range(count):
+        sections = []
+        for heading in ("About the Company", "What They Do", "Major Investments", "Recent News"):
+            sentences = rng.choices(SAMPLE_SENTENCES, k=rng.randint(4, 12))
+            sections.append(f"## {heading}\n" + " ".join(sentences))
+        responses.append("\n\n".join(sections))
+    return responses
+
+
+def fake_grounded_response(rng: random.Random, sources: int = 40, supports: int = 120):
+    """Grounding metadata shaped like a Gemini search-grounded response"""
+    chunks = [
+        SimpleNamespace(web=SimpleNamespace(uri=f"https://www.source{rng.randint(0, sources // 2)}.com/article/{i}"))
+        for i in range(sources)
+    ]
+    support_list = [
+        SimpleNamespace(grounding_chunk_indices=rng.sample(range(sources), k=rng.randint(1, 4)))
+        for _ in range(supports)
+    ]
+    metadata = SimpleNamespace(grounding_supports=support_list, grounding_chunks=chunks)
+    return SimpleNamespace(text="", candidates=[SimpleNamespace(grounding_metadata=metadata)])
+
+
+def time_per_item(fn: Callable, items: list, repeat: int) -> float:
+    """Best-of-repeat mean seconds per item"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - started)
+    return best / len(items)
+
+
+def clean_streamed(text: str) -> str:
+    cleaner = ai_service.StreamingCleaner()
+    for start in range(0, len(text), STREAM_CHUNK_CHARS):
+        cleaner.feed(text[start:start + STREAM_CHUNK_CHARS])
+    return cleaner.finish()
+
+
+def legacy_clean_streamed(text: str) -> str:
+    """Accumulate the raw stream, then clean the whole text once it is complete"""
+    accumulated = ""
+    for start in range(0, len(text), STREAM_CHUNK_CHARS):
+        accumulated += text[start:start + STREAM_CHUNK_CHARS]
+    return legacy_clean_response_text(accumulated)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Gemini response post-processing")
+    parser.add_argument('--db', default=os.getenv('AI_CACHE_DB_PATH'), help="ResponseCache SQLite file to read responses from")
+    parser.add_argument('--synthetic', type=int, default=300, help="Synthetic responses to use when no database is given")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing repetitions (best is reported)")
+    args = parser.parse_args(argv)
+
+    corpus = load_cached_responses(args.db) if args.db and os.path.exists(args.db) else []
+    source = f"{len(corpus)} cached responses from {args.db}" if corpus else f"{args.synthetic} synthetic responses"
+    if not corpus:
+        corpus = synthetic_responses(args.synthetic)
+
+    mismatches = sum(ai_service.clean_response_text(text) != legacy_clean_response_text(text) for text in corpus)
+    mismatches += sum(clean_streamed(text) != legacy_clean_response_text(text) for text in corpus)
+
+    rng = random.Random(11)
+    grounded = [(fake_grounded_response(rng), text) for text in corpus[:100]]
+    mismatches += sum(ai_service.add_wikipedia_style_citations(response, text) != legacy_add_citations(response, text)
+                      for response, text in grounded)
+
+    average_chars = sum(map(len, corpus)) / len(corpus)
+    print(f"Corpus: {source}, {average_chars:,.0f} characters on average")
+    results = [
+        ("clean (9 passes)", time_per_item(legacy_clean_response_text, corpus, args.repeat)),
+        ("clean (single pass)", time_per_item(ai_service.clean_response_text, corpus, args.repeat)),
+        ("stream + clean at end", time_per_item(legacy_clean_streamed, corpus, args.repeat)),
+        ("stream (incremental)", time_per_item(clean_streamed, corpus, args.repeat)),
+        ("citations (list, +=)", time_per_item(lambda item: legacy_add_citations(*item), grounded, args.repeat)),
+        ("citations (dict, join)", time_per_item(lambda item: ai_service.add_wikipedia_style_citations(*item), grounded, args.repeat)),
+    ]
+    for name, seconds in results:
+        print(f"{name:<24} {seconds * 1e6:10.1f} µs/response")
+
+    if mismatches:
+        print(f"❌ {mismatches} outputs differ from the previous implementation")
+        return 1
+    print("✅ Outputs identical to the previous implementation")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,390 @@
+"""End-to-end benchmark suite: data loading, search and the details/chat flows by dataset size
+
+For each size a synthetic investor CSV in the Yogen.csv schema is generated (see
+benchmarks.datasets) and the app's own functions are timed: load_investor_data (CSV parse and
+Parquet reload), get_all_company_names, fuzzy_search_investors and get_search_suggestions.
+The details and chat flows are then driven through Streamlit's AppTest against
+FakeGeminiClient, so no API key is needed and Gemini latency and failures are under control.
+Results are written as JSON; pass an earlier file as --baseline to flag regressions:
+
+    python -m benchmarks.suite --sizes 1000 10000 --output before.json
+    python -m benchmarks.suite --sizes 1000 10000 --baseline before.json
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from benchmarks.datasets import DEFAULT_DATA_DIR, write_synthetic_csv
+from benchmarks.fake_gemini import FakeGeminiClient
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+CHAT_QUESTIONS = [
+    "What is their investment strategy?",
+    "Which sectors do they focus on?",
+    "What are their most recent deals?",
+    "How large is their latest fund?",
+    "Who leads the firm?",
+]
+
+# Timings that grew by more than this share (and by at least MIN_REGRESSION_MS) are reported
+DEFAULT_TOLERANCE = 0.2
+MIN_REGRESSION_MS = 1.0
+
+
+def summarize(samples: Sequence[float]) -> Dict:
+    """Count, mean and percentiles of durations in seconds, reported in milliseconds"""
+    if not samples:
+        return {'n': 0}
+    values = np.asarray(samples) * 1000
+    return {
+        'n': len(values),
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+
+
+def time_each(fn: Callable, items: Sequence) -> List[float]:
+    """Seconds taken by fn for each item"""
+    durations = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def time_once(fn: Callable):
+    """(seconds, result) of one call"""
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def search_queries(names: List[str], count: int, rng: random.Random) -> List[str]:
+    """Exact names, prefixes, names with a typo and bare keywords, in equal parts"""
+    queries = []
+    for i in range(count):
+        name = rng.choice(names)
+        kind = i % 4
+        if kind == 0:
+            queries.append(name)
+        elif kind == 1:
+            queries.append(name[:rng.randint(3, 6)].lower())
+        elif kind == 2 and len(name) > 4:
+            cut = rng.randint(1, len(name) - 2)
+            queries.append(name[:cut] + name[cut + 1:])
+        else:
+            queries.append(rng.choice(["capital", "healthcare", "growth", "london", "partners"]))
+    return queries
+
+
+def facet_queries(index, count: int, rng: random.Random) -> List[Dict]:
+    """Filter changes as a visitor makes them: one or two facet values, a metric floor and a sort"""
+    queries = []
+    for _ in range(count):
+        facets = rng.sample(sorted(index.values), rng.randint(1, 2))
+        selected = {facet: rng.sample(index.values[facet], min(rng.randint(1, 2), len(index.values[facet])))
+                    for facet in facets if index.values[facet]}
+        metric = rng.choice(sorted(index.metrics))
+        low, high = index.value_range(metric)
+        ranges = {metric: (rng.uniform(low, high) / 10, None)} if low is not None else {}
+        queries.append({'selected': selected, 'ranges': ranges, 'sort_by': rng.choice(sorted(index.metrics)), 'limit': 20})
+    return queries
+
+
+@contextlib.contextmanager
+def patched_environment(values: Dict[str, str]):
+    """Set environment variables for the duration of the block"""
+    previous = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def bench_data(app, csv_path: str, queries: int, seed: int) -> Dict:
+    """Load, name-list, index build, search and suggestion timings for one dataset"""
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            patched_environment({'INVESTOR_CSV_PATH': csv_path, 'INVESTOR_CACHE_DIR': cache_dir}):
+        app.load_investor_data.clear()
+        results['load_csv_seconds'], df = time_once(app.load_investor_data)
+        app.load_investor_data.clear()
+        results['load_parquet_seconds'], df = time_once(app.load_investor_data)
+
+    from investor_data import get_all_company_names
+    from search_index import build_search_index
+
+    results['company_names_seconds'], names = time_once(lambda: get_all_company_names(df))
+    results['search_index_build_seconds'], index = time_once(lambda: build_search_index(df))
+    results['suggestion_index_build_seconds'], suggestion_index = time_once(lambda: app.SuggestionIndex(names))
+
+    rng = random.Random(seed)
+    search = search_queries(names, queries, rng)
+    # Typeahead sees what is typed so far: short lowercase prefixes
+    typed = [name[:rng.randint(2, 8)].lower() for name in rng.sample(names, min(queries, len(names)))]
+    results['fuzzy_search_investors'] = summarize(time_each(lambda q: app.fuzzy_search_investors(q, df, index=index), search))
+    results['get_search_suggestions'] = summarize(time_each(lambda q: app.get_search_suggestions(q, names, index=suggestion_index), typed))
+
+    from facets import FacetIndex
+
+    results['facet_index_build_seconds'], facet_index = time_once(lambda: FacetIndex(df))
+    results['facet_query'] = summarize(time_each(lambda q: facet_index.query(**q), facet_queries(facet_index, queries, rng)))
+
+    from peers import PeerIndex
+
+    results['peer_index_build_seconds'], peer_index = time_once(lambda: PeerIndex(df))
+    # Distinct rows, so the per-index result cache is not what gets timed
+    rows = rng.sample(range(len(df)), min(queries, len(df)))
+    results['peer_query'] = summarize(time_each(peer_index.similar, rows))
+
+    results['reload_seconds'] = bench_reload(df, seed)
+
+    for key in list(results):
+        if key.endswith('_seconds'):
+            results[key] = round(results[key], 4)
+    results['rows'] = len(df)
+    return results
+
+
+def bench_reload(df, seed: int) -> float:
+    """Applying an edited CSV (0.1% of rows changed, removed and added) to a warm service"""
+    import pandas as pd
+
+    from investor_service import InvestorService
+
+    service = InvestorService(df)
+    service.search_index, service.alias_index, service.suggestion_index
+    rng = np.random.default_rng(seed)
+    edits = max(len(df) // 1000, 1)
+    edited = df.copy()
+    edited.loc[rng.choice(len(df), edits, replace=False), 'AUM'] = 1.0
+    added = df.iloc[:edits].assign(Investors=[f"Reloaded Capital {i}" for i in range(edits)])
+    edited = pd.concat([edited.drop(index=rng.choice(len(df), edits, replace=False)), added], ignore_index=True)
+    seconds, _ = time_once(lambda: service.apply_dataset(edited))
+    return seconds
+
+
+def open_details(row_id: int, timeout: float):
+    """A fresh browser session on the details page of one investor"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state['selected_investor_id'] = row_id
+    at.session_state['current_page'] = 'details'
+    return at
+
+
+def ask(at, question: str):
+    at.text_input(key='chat_input').input(question)
+    next(button for button in at.button if 'Ask' in button.label).click()
+    at.run()
+
+
+def bench_flows(rows: int, iterations: int, timeout: float, seed: int) -> Dict:
+    """Details page and chat timings, cold (Gemini call) and warm (served from the caches)
+
+    Each iteration opens a different investor so its first view misses the shared caches.
+    """
+    samples = {name: [] for name in ('details_cold', 'details_rerun', 'details_shared_cache', 'chat_cold', 'chat_cached')}
+    errors = 0
+    rng = random.Random(seed)
+    for row_id in rng.sample(range(rows), min(iterations, rows)):
+        question = rng.choice(CHAT_QUESTIONS)
+
+        first = open_details(row_id, timeout)
+        samples['details_cold'].append(time_once(first.run)[0])
+        if first.exception:
+            # The page itself failed; there is no chat box to time
+            errors += len(first.exception)
+            continue
+        samples['details_rerun'].append(time_once(first.run)[0])
+        samples['chat_cold'].append(time_once(lambda: ask(first, question))[0])
+
+        # A second attendee opening the same company and asking the same question
+        second = open_details(row_id, timeout)
+        samples['details_shared_cache'].append(time_once(second.run)[0])
+        samples['chat_cached'].append(time_once(lambda: ask(second, question))[0])
+
+        errors += sum(len(at.exception) + len(at.error) for at in (first, second))
+
+    results = {name: summarize(values) for name, values in samples.items()}
+    results['errors'] = errors
+    return results
+
+
+def run_size(rows: int, args, fake: FakeGeminiClient) -> Dict:
+    import streamlit as st
+    import app
+
+    csv_path = write_synthetic_csv(rows, args.data_dir, args.seed)
+    logging.getLogger(__name__).info(f"📊 Benchmarking {rows:,} rows from {csv_path}")
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    results = {'csv_bytes': os.path.getsize(csv_path), **bench_data(app, csv_path, args.queries, args.seed)}
+
+    if args.flow_iterations:
+        st.cache_resource.clear()
+        st.cache_data.clear()
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                patched_environment({'INVESTOR_CSV_PATH': csv_path, 'INVESTOR_CACHE_DIR': cache_dir}):
+            calls_before = fake.stats()
+            results['flows'] = bench_flows(rows, args.flow_iterations, args.timeout, args.seed)
+            calls_after = fake.stats()
+        results['flows']['gemini_calls'] = {kind: count - calls_before['calls'][kind]
+                                            for kind, count in calls_after['calls'].items()}
+        results['flows']['injected_failures'] = calls_after['injected_failures'] - calls_before['injected_failures']
+    return results
+
+
+def environment_info() -> Dict:
+    import pandas
+    import rapidfuzz
+    import streamlit
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(APP_PATH), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pandas': pandas.__version__,
+        'rapidfuzz': rapidfuzz.__version__,
+        'streamlit': streamlit.__version__,
+    }
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """Millisecond and second timings keyed by their path, e.g. sizes.1000.fuzzy_search_investors.p95_ms"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and (key.endswith('_ms') or key.endswith('_seconds')):
+            flat[path] = value * 1000 if key.endswith('_seconds') else value
+    return flat
+
+
+def find_regressions(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Timings that are slower than the baseline by more than the tolerance"""
+    current, previous = flatten(results['sizes'], 'sizes'), flatten(baseline.get('sizes', {}), 'sizes')
+    regressions = []
+    for path, value in sorted(current.items()):
+        old = previous.get(path)
+        if old is None or path.endswith('max_ms'):
+            continue
+        if value > old * (1 + tolerance) and value - old >= MIN_REGRESSION_MS:
+            regressions.append(f"{path}: {old:.1f} ms -> {value:.1f} ms ({value / old - 1:+.0%})" if old else
+                               f"{path}: {old:.1f} ms -> {value:.1f} ms")
+    return regressions
+
+
+def print_summary(results: Dict):
+    for rows, size in results['sizes'].items():
+        search, suggest, facets, peers = (size['fuzzy_search_investors'], size['get_search_suggestions'],
+                                          size['facet_query'], size['peer_query'])
+        print(f"{int(rows):>9,} rows  load csv {size['load_csv_seconds']:7.2f}s  parquet {size['load_parquet_seconds']:6.2f}s  "
+              f"names {size['company_names_seconds'] * 1000:8.1f}ms  search p95 {search['p95_ms']:8.1f}ms  "
+              f"suggest p95 {suggest['p95_ms']:7.1f}ms  facets p95 {facets['p95_ms']:6.1f}ms  peers p95 {peers['p95_ms']:6.1f}ms  reload {size['reload_seconds']:6.2f}s")
+        flows = size.get('flows')
+        if flows:
+            print(" " * 16 + "  ".join(f"{name} p50 {flows[name]['p50_ms']:.0f}ms" for name in
+                                       ('details_cold', 'details_shared_cache', 'chat_cold', 'chat_cached')
+                                       if flows[name].get('n')) + f"  errors {flows['errors']}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark loading, search and the details/chat flows on synthetic data")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Dataset sizes in rows")
+    parser.add_argument('--queries', type=int, default=40, help="Search and suggestion queries per size")
+    parser.add_argument('--flow-iterations', type=int, default=5, help="Companies opened per size (0 skips the flows)")
+    parser.add_argument('--latency', type=float, default=0.5, help="Fake Gemini response time in seconds")
+    parser.add_argument('--first-token', type=float, default=0.2, help="Fake Gemini time to first streamed chunk in seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of fake Gemini calls failing with 429/503")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Seconds allowed for one app run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="Where the synthetic CSVs are kept")
+    parser.add_argument('--output', help="JSON results file (default: results-<timestamp>.json in --data-dir)")
+    parser.add_argument('--baseline', help="Earlier results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown vs the baseline")
+    args = parser.parse_args(argv)
+
+    import streamlit.logger
+
+    logging.basicConfig(level=logging.INFO)
+    # Bare-mode warnings from importing the app outside `streamlit run`
+    streamlit.logger.set_log_level('error')
+
+    fake = FakeGeminiClient(latency_seconds=args.latency, time_to_first_token_seconds=args.first_token,
+                            failure_rate=args.failure_rate, seed=args.seed)
+    import ai_service
+    ai_service.create_client = lambda *a, **kw: fake
+
+    env = {
+        'GOOGLE_API_KEY': 'benchmark',
+        'AI_PREWARM': '0',
+        'INVESTOR_RELOAD_SECONDS': '0',
+        'AI_CACHE_DB_PATH': '',
+        # Measure the app, not the production request quota
+        'GEMINI_FLASH_RPM': '1000000', 'GEMINI_FLASH_BURST': '1000000',
+        'GEMINI_PRO_RPM': '1000000', 'GEMINI_PRO_BURST': '1000000',
+    }
+    results = {
+        'environment': environment_info(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline', 'data_dir')},
+        'sizes': {},
+    }
+    with patched_environment(env):
+        for rows in args.sizes:
+            results['sizes'][str(rows)] = run_size(rows, args, fake)
+    results['fake_gemini'] = fake.stats()
+
+    output = args.output or os.path.join(args.data_dir, f"results-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print_summary(results)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} timings regressed by more than {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
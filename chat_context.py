@@ -0,0 +1,479 @@
+"""Token-budgeted prompt construction for the ARIA chat
+
+The chat prompt used to inline the full insights, the full news digest and the last six
+exchanges on every turn. Here the prompt is assembled against a token budget instead:
+older turns are folded into a short running summary, only the insight/news sections that
+match the question are included, and the company's static context (metadata, insights,
+news) can be held in a Gemini context cache so follow-up turns only send the question,
+the summary and the most recent exchanges.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from google.genai import types
+
+import ai_service
+from investor_data import AMOUNT_COLUMNS
+from response_cache import make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Rough upper bound on the whole chat prompt (about four characters per token)
+DEFAULT_TOKEN_BUDGET = 6000
+CHARS_PER_TOKEN = 4
+
+# Exchanges kept verbatim; older ones are folded into the running summary
+RECENT_TURNS = 3
+RECENT_TURN_TOKENS = 400
+SUMMARY_TOKEN_BUDGET = 400
+QUESTION_TOKEN_BUDGET = 300
+
+# Gemini only accepts explicit caches above a minimum size (1,024 tokens for 2.5 Flash)
+MIN_CACHE_TOKENS = 1024
+CONTEXT_CACHE_TTL_SECONDS = 60 * 60
+# Treat a cache as expired this long before Gemini does, so it never lapses mid-request
+CONTEXT_CACHE_MARGIN_SECONDS = 60
+# After a failed cache creation, send context inline for this long before trying again
+CONTEXT_CACHE_RETRY_SECONDS = 10 * 60
+
+METADATA_FIELDS = [
+    ('Name', 'Investors'),
+    ('Type', 'Primary Investor Type'),
+    ('Location', 'HQ Location'),
+    ('Country', 'HQ Country/Territory/Region'),
+    ('AUM', 'AUM'),
+    ('PE Category', 'PE Category'),
+    ('Total Investments', 'Investments'),
+    ('Active Portfolio', 'Active Portfolio'),
+    ('Exits', 'Exits'),
+    ('Investments (Last 12 Months)', 'Investments in the last 12 months'),
+    ('Dry Powder', 'Dry Powder'),
+    ('Description', 'Description'),
+]
+
+STOPWORDS = {
+    'a', 'about', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'company', 'do', 'does',
+    'for', 'from', 'has', 'have', 'how', 'i', 'in', 'is', 'it', 'its', 'me', 'more', 'of', 'on',
+    'or', 'tell', 'that', 'the', 'their', 'them', 'they', 'this', 'to', 'was', 'what', 'when',
+    'where', 'which', 'who', 'why', 'with', 'you', 'your',
+}
+
+# Question words that point at a section even when they do not appear in it
+SECTION_HINTS = {
+    'news': ('news', 'recent', 'latest', 'announce', 'announced', 'update', 'updates', 'lately', 'today'),
+    'Major Investments': ('portfolio', 'investments', 'invested', 'deals', 'holdings', 'backed'),
+    'What They Do': ('strategy', 'focus', 'sector', 'sectors', 'thesis', 'approach'),
+    'About the Company': ('founded', 'founder', 'founders', 'history', 'headquarters', 'leadership', 'ceo'),
+}
+
+# Words that ask how the company compares with others; answered from the local peer list
+PEER_WORDS = {'peer', 'peers', 'compare', 'compared', 'comparison', 'comparable', 'competitor', 'competitors',
+              'rival', 'rivals', 'similar', 'versus', 'vs', 'alternatives', 'benchmark'}
+
+# Words that tie a question to the previous answer ("why is that?", "tell me more")
+REFERENCE_WORDS = {'that', 'this', 'those', 'these', 'it', 'them', 'more', 'elaborate', 'else', 'earlier',
+                   'mentioned', 'said', 'why', 'also', 'another', 'other', 'same'}
+
+CONTRACTIONS = [(re.compile(pattern), expansion) for pattern, expansion in (
+    (r"n't\b", " not"), (r"'re\b", " are"), (r"'s\b", " is"), (r"'ve\b", " have"),
+    (r"'ll\b", " will"), (r"'d\b", " would"),
+)]
+NON_WORD = re.compile(r'[^\w\s]+')
+WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9'&.-]*")
+HEADING_PATTERN = re.compile(r'^#{2,4}\s+(.*)$')
+SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+CITATION_MARKERS = re.compile(r'\s*(?:<sup>.*?</sup>|\[\d+\])')
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for budgeting (no tokenizer round trip)"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens at a word boundary"""
+    max_chars = max(0, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(' ', 0, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip() + "…"
+
+
+def keywords(text: str) -> set:
+    """Lowercase content words of a question or section"""
+    return {word.strip(".'-") for word in WORD_PATTERN.findall(text.lower())} - STOPWORDS - {''}
+
+
+def format_metadata_value(column: str, value) -> str:
+    """Render a typed dataset value for the prompt ('N/A' for nulls, amounts in $M/$B)"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return 'N/A'
+    if column in AMOUNT_COLUMNS:
+        return f"${value / 1000:.1f}B" if value >= 1000 else f"${value:,.0f}M"
+    text = str(value).strip()
+    return text if text and text.lower() not in ('nan', '<na>', '#n/a') else 'N/A'
+
+
+def format_company_metadata(metadata: Optional[Dict]) -> str:
+    """Company metadata block of the prompt"""
+    if not metadata:
+        return ""
+    lines = ["**COMPANY METADATA:**"]
+    for label, column in METADATA_FIELDS:
+        value = format_metadata_value(column, metadata.get(column))
+        if column == 'Description' and value == 'N/A':
+            continue
+        lines.append(f"{label}: {value}")
+    return "\n".join(lines)
+
+
+def format_peers(peers: Optional[List[Dict]]) -> str:
+    """Similar investors block of the prompt, from InvestorService.peers"""
+    if not peers:
+        return ""
+    lines = ["**SIMILAR INVESTORS AT THIS EVENT** (nearest in the event list by AUM, deal counts, dry powder and description):"]
+    for peer in peers:
+        investor = peer['investor']
+        details = "; ".join(f"{label} {format_metadata_value(column, investor.get(column))}" for label, column in (
+            ('AUM', 'AUM'), ('Dry Powder', 'Dry Powder'), ('Investments', 'Investments'),
+            ('Active Portfolio', 'Active Portfolio'), ('Exits', 'Exits'),
+        ))
+        lines.append(f"- {format_metadata_value('Investors', investor.get('Investors'))} "
+                     f"({format_metadata_value('Primary Investor Type', investor.get('Primary Investor Type'))}, "
+                     f"{format_metadata_value('HQ Location', investor.get('HQ Location'))}): {details}; "
+                     f"similarity {peer['similarity']:.2f}")
+    return "\n".join(lines)
+
+
+def split_sections(markdown: str, source: str) -> List[Dict[str, str]]:
+    """Split generated markdown into its ## sections, dropping the Sources list"""
+    sections = []
+    title, lines = source, []
+
+    def flush():
+        body = CITATION_MARKERS.sub('', "\n".join(lines)).strip()
+        if body and title.lower() != 'sources':
+            sections.append({'source': source, 'title': title, 'body': body})
+
+    for line in (markdown or "").splitlines():
+        match = HEADING_PATTERN.match(line.strip())
+        if match:
+            flush()
+            title, lines = match.group(1).strip(), []
+        else:
+            lines.append(line)
+    flush()
+    return sections
+
+
+def rank_sections(sections: List[Dict[str, str]], question: str) -> List[Dict[str, str]]:
+    """Sections most relevant to the question first; ties keep document order"""
+    question_words = keywords(question)
+
+    def score(item: Tuple[int, Dict[str, str]]) -> Tuple[int, int]:
+        position, section = item
+        title_words = keywords(section['title'])
+        relevance = 3 * len(question_words & title_words) + len(question_words & keywords(section['body']))
+        for target, hints in SECTION_HINTS.items():
+            if target in (section['source'], section['title']) and question_words.intersection(hints):
+                relevance += 5
+        return -relevance, position
+
+    return [section for _, section in sorted(enumerate(sections), key=score)]
+
+
+def select_sections(sections: List[Dict[str, str]], question: str, budget_tokens: int) -> str:
+    """Most relevant sections that fit in the budget, as a markdown block"""
+    blocks = []
+    remaining = budget_tokens
+    for section in rank_sections(sections, question):
+        label = "NEWS" if section['source'] == 'news' else "INSIGHTS"
+        block = f"**{label} – {section['title']}:**\n{section['body']}"
+        cost = estimate_tokens(block)
+        if cost > remaining:
+            # Partially include a section only if a useful amount of room is left
+            if remaining >= 150:
+                blocks.append(truncate_to_tokens(block, remaining))
+            break
+        blocks.append(block)
+        remaining -= cost
+    return "\n\n".join(blocks)
+
+
+def strip_sources(text: str) -> str:
+    """Answer text without citation markers or the trailing Sources list"""
+    return CITATION_MARKERS.sub('', (text or "").split("\n## Sources\n", 1)[0]).strip()
+
+
+def first_sentence(text: str) -> str:
+    """First sentence of an answer, without citation markers"""
+    text = strip_sources(text)
+    return SENTENCE_END.split(text, maxsplit=1)[0] if text else ""
+
+
+def compact_history(chat_history: List[Dict], summary_state: Dict,
+                    recent_turns: int = RECENT_TURNS) -> Tuple[str, List[Dict]]:
+    """Fold exchanges older than the recent window into summary_state; returns (summary, recent)
+
+    summary_state is updated in place and only the exchanges that left the window since the
+    last call are summarized, so the cost per turn stays constant as the chat grows.
+    """
+    older_count = max(0, len(chat_history) - recent_turns)
+    if summary_state.get('turns', 0) > older_count:
+        # History was cleared or replaced; start over
+        summary_state.clear()
+
+    lines = summary_state.setdefault('lines', [])
+    for entry in chat_history[summary_state.get('turns', 0):older_count]:
+        question = truncate_to_tokens(entry['user'].strip(), 30)
+        answer = truncate_to_tokens(first_sentence(entry['assistant']), 60)
+        lines.append(f"- Asked \"{question}\"; answered: {answer}")
+    summary_state['turns'] = older_count
+
+    # Oldest points go first once the summary outgrows its budget
+    while lines and estimate_tokens("\n".join(lines)) > SUMMARY_TOKEN_BUDGET:
+        lines.pop(0)
+
+    return "\n".join(lines), chat_history[older_count:]
+
+
+def format_recent_turns(recent: List[Dict]) -> str:
+    """Most recent exchanges verbatim (each answer capped)"""
+    return "\n\n".join(
+        f"User: {entry['user']}\nAssistant: {truncate_to_tokens(strip_sources(entry['assistant']), RECENT_TURN_TOKENS)}"
+        for entry in recent
+    )
+
+
+def analyze_conversation(company_name: str, question: str, chat_history: List[Dict]) -> str:
+    """Topics covered so far and whether the question is a follow-up"""
+    if not chat_history:
+        return ""
+    analysis = "**CONVERSATION ANALYSIS:**\n"
+    analysis += f"We've had {len(chat_history)} exchanges about {company_name}. "
+
+    topics_discussed = []
+    for exchange in chat_history:
+        if "strategy" in exchange['user'].lower():
+            topics_discussed.append("investment strategy")
+        if "compare" in exchange['user'].lower() or "peer" in exchange['user'].lower():
+            topics_discussed.append("competitive analysis")
+        if "performance" in exchange['user'].lower():
+            topics_discussed.append("performance metrics")
+        if "portfolio" in exchange['user'].lower():
+            topics_discussed.append("portfolio analysis")
+
+    if topics_discussed:
+        analysis += f"Previous topics covered: {', '.join(sorted(set(topics_discussed)))}. "
+
+    follow_up_indicators = ["what", "how", "why", "tell me more", "explain", "elaborate", "details"]
+    if any(indicator in question.lower() for indicator in follow_up_indicators) and len(question.split()) < 5:
+        analysis += "This appears to be a follow-up question requiring context from our previous discussion. "
+    return analysis
+
+
+def build_static_context(company_name: str, metadata: Optional[Dict], insights: str = None,
+                         news: str = None, peers: List[Dict] = None) -> str:
+    """Everything about the company that does not change between chat turns"""
+    parts = [f"Reference material about {company_name} for the conversation that follows."]
+    for block in (format_company_metadata(metadata), format_peers(peers)):
+        if block:
+            parts.append(block)
+    for label, source, text in (("AI-GENERATED COMPANY INSIGHTS", 'insights', insights),
+                                ("RECENT NEWS & DEVELOPMENTS", 'news', news)):
+        sections = split_sections(text, source)
+        if sections:
+            parts.append(f"**{label}:**\n" + "\n\n".join(f"### {s['title']}\n{s['body']}" for s in sections))
+    return "\n\n".join(parts)
+
+
+def normalize_question(question: str) -> str:
+    """Question reduced to lowercase words so trivial rewordings share a cache entry"""
+    text = unicodedata.normalize('NFKC', question).lower().replace("\u2019", "'")
+    for pattern, expansion in CONTRACTIONS:
+        text = pattern.sub(expansion, text)
+    return " ".join(NON_WORD.sub(' ', text).split())
+
+
+def is_peer_question(question: str) -> bool:
+    """True if the question compares the company with other investors"""
+    return bool(set(normalize_question(question).split()) & PEER_WORDS)
+
+
+def is_follow_up(question: str, chat_history: List[Dict]) -> bool:
+    """True if the question only makes sense given the previous exchanges"""
+    if not chat_history:
+        return False
+    words = set(normalize_question(question).split())
+    return not keywords(question) or bool(words & REFERENCE_WORDS)
+
+
+def context_digest(static_context: str) -> str:
+    """Digest identifying one version of a company's chat context"""
+    return hashlib.sha256(static_context.encode('utf-8')).hexdigest()
+
+
+def chat_cache_key(company_name: str, question: str, static_context: str, chat_history: List[Dict]) -> str:
+    """Deterministic cache key for a chat answer
+
+    Self-contained questions are keyed only by the company, the normalized question and a
+    digest of the company context, so every attendee asking "What is their investment
+    strategy?" shares one answer. Follow-ups also include the recent exchanges they refer to.
+    """
+    parts = [normalize_question(question), context_digest(static_context)]
+    if is_follow_up(question, chat_history):
+        parts.extend(normalize_question(entry['user']) for entry in chat_history[-RECENT_TURNS:])
+        parts.append(strip_sources(chat_history[-1]['assistant']))
+    return make_cache_key(f"chat|{company_name}", ai_service.INSIGHTS_MODEL, "\n".join(parts))
+
+
+def build_chat_prompt(company_name: str, question: str, chat_history: List[Dict], summary_state: Dict,
+                      metadata: Optional[Dict] = None, insights: str = None, news: str = None,
+                      cached_context: bool = False, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                      peers: List[Dict] = None) -> str:
+    """ARIA prompt for one turn, kept within token_budget
+
+    With cached_context the company material is assumed to be in a Gemini context cache
+    and only a pointer to it is included. peers (see format_peers) are listed after the
+    metadata, ahead of the insight and news sections.
+    """
+    question = truncate_to_tokens(question.strip(), QUESTION_TOKEN_BUDGET)
+    summary, recent = compact_history(chat_history, summary_state)
+
+    history = ""
+    if summary:
+        history += f"Earlier in this conversation:\n{summary}\n\n"
+    if recent:
+        history += format_recent_turns(recent)
+
+    aum = format_metadata_value('AUM', metadata.get('AUM')) if metadata else 'N/A'
+    investments = format_metadata_value('Investments', metadata.get('Investments')) if metadata else 'N/A'
+    peer_instruction = ("\n6. **PEERS**: For comparisons, use the SIMILAR INVESTORS list and its metrics; name the peers you compare against."
+                        if peers else "")
+
+    def render(company_context: str) -> str:
+        return f"""You are ARIA, an expert investment analyst having a dynamic conversation about {company_name}. Be conversational, specific, and NEVER repeat the same information.
+
+{company_context}
+
+{analyze_conversation(company_name, question, chat_history)}
+
+**CONVERSATION HISTORY:**
+{history}
+
+**CURRENT QUESTION:** "{question}"
+
+**CRITICAL INSTRUCTIONS:**
+1. **NO REPETITION**: If you've already discussed something, don't repeat it. Build on it or explore new angles.
+2. **BE CONVERSATIONAL**: This is a dialogue, not a report. Respond naturally to follow-up questions.
+3. **USE SPECIFIC DATA**: Reference the actual numbers from the company metadata (AUM: {aum}, Investments: {investments}, etc.)
+4. **CONTEXT AWARENESS**: If the user asks "What" or "How" or similar short questions, they're asking about the previous topic.
+5. **VARY YOUR RESPONSES**: Each answer should feel fresh and explore different aspects.{peer_instruction}
+
+**RESPONSE STYLE:**
+- Keep it to 2-3 sentences maximum
+- Be specific and data-driven using the provided metrics
+- If it's a follow-up, directly reference what we discussed before
+- Offer new insights or angles on the topic
+- Be conversational, not robotic
+
+**FOR FOLLOW-UP QUESTIONS:**
+- If user asks "What?" after discussing strategy, explain specifics about their strategy
+- If user asks "How?" after mentioning performance, explain their approach
+- If user asks "Why?" after any statement, provide reasoning or context
+- Always connect back to the specific data about this company
+
+Answer the question naturally, as if you're an expert who has been studying this company and can provide specific insights based on their actual metrics and data:"""
+
+    if cached_context:
+        return render(f"(Company metadata, insights and news for {company_name} are in the cached reference material.)")
+
+    metadata_block = "\n\n".join(block for block in (format_company_metadata(metadata), format_peers(peers)) if block)
+    sections = split_sections(insights, 'insights') + split_sections(news, 'news')
+    remaining = token_budget - estimate_tokens(render(metadata_block))
+    selected = select_sections(sections, question, remaining) if sections and remaining > 0 else ""
+    prompt = render("\n\n".join(part for part in (metadata_block, selected) if part))
+
+    if estimate_tokens(prompt) > token_budget:
+        logger.info(f"✂️ Chat prompt for {company_name} is {estimate_tokens(prompt)} tokens, over the {token_budget} budget")
+    return prompt
+
+
+class CompanyContextCache:
+    """Gemini context caches holding each company's static chat context
+
+    One cache is created per (company, model, context) the first time a chat needs it and
+    reused by every session until shortly before it expires. Contexts below Gemini's minimum
+    cacheable size, and failed creations, fall back to inline context.
+    """
+
+    def __init__(self, ttl_seconds: int = CONTEXT_CACHE_TTL_SECONDS, min_tokens: int = MIN_CACHE_TOKENS):
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Optional[str], float]] = {}  # key -> (cache name, local expiry)
+
+    def get_or_create(self, client, company_name: str, model: str, static_context: str,
+                      system_instruction: str = None) -> Optional[str]:
+        """Name of a live context cache for this context, or None to send it inline"""
+        if estimate_tokens(static_context) < self.min_tokens:
+            return None
+
+        digest = hashlib.sha256(static_context.encode('utf-8')).hexdigest()[:16]
+        key = f"context|{company_name}|{model}|{digest}"
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[1] > time.time():
+            return entry[0]
+
+        return ai_service.SINGLE_FLIGHT.do(key, self._create, client, key, company_name, model,
+                                           static_context, system_instruction)
+
+    def _create(self, client, key: str, company_name: str, model: str, static_context: str,
+                system_instruction: str = None) -> Optional[str]:
+        """Create the Gemini cache, remembering failures so they are not retried every turn"""
+        try:
+            cache = client.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"aria-{company_name}"[:128],
+                    contents=[types.Content(role='user', parts=[types.Part(text=static_context)])],
+                    system_instruction=system_instruction,
+                    tools=ai_service.build_grounded_config().tools,
+                    ttl=f"{self.ttl_seconds}s",
+                ),
+            )
+            entry = (cache.name, time.time() + self.ttl_seconds - CONTEXT_CACHE_MARGIN_SECONDS)
+            logger.info(f"🧊 Created context cache {cache.name} for {company_name} "
+                        f"(~{estimate_tokens(static_context)} tokens)")
+        except Exception as e:
+            entry = (None, time.time() + CONTEXT_CACHE_RETRY_SECONDS)
+            logger.warning(f"⚠️ Context cache unavailable for {company_name}, sending context inline: {str(e)}")
+
+        with self._lock:
+            now = time.time()
+            for stale_key in [k for k, (_, expires_at) in self._entries.items() if expires_at <= now]:
+                del self._entries[stale_key]
+            self._entries[key] = entry
+        return entry[0]
+
+    def forget(self, company_name: str):
+        """Stop using the caches of a company (e.g. after its insights were refreshed)"""
+        prefix = f"context|{company_name}|"
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+
+def create_context_cache() -> Optional[CompanyContextCache]:
+    """Context cache configured from CHAT_CONTEXT_CACHE / CHAT_CONTEXT_CACHE_TTL_SECONDS, or None if disabled"""
+    if os.getenv('CHAT_CONTEXT_CACHE', '1').lower() in ('0', 'false', 'no'):
+        return None
+    return CompanyContextCache(ttl_seconds=int(os.getenv('CHAT_CONTEXT_CACHE_TTL_SECONDS', CONTEXT_CACHE_TTL_SECONDS)))
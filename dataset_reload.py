@@ -0,0 +1,171 @@
+"""Hot reload of the investor CSV into a running InvestorService
+
+Organizers can replace the attendee CSV mid-event: DatasetWatcher polls its mtime and size,
+waits until the file has stopped changing, compares a content hash and then hands the new
+rows to InvestorService.apply_dataset. Rows are matched on the company name (and its
+occurrence, for duplicated names), so only changed, added and removed rows are re-indexed
+and only their companies' cached AI responses are dropped.
+
+Row ids stay valid across reloads, because open sessions and API clients hold them: a changed
+row keeps its position, new rows are appended and removed rows are left in place but hidden.
+"""
+import hashlib
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from investor_data import CATEGORY_COLUMNS, DEFAULT_CSV_PATH, load_investor_dataset
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RELOAD_SECONDS = 10
+KEY_COLUMN = 'Investors'
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def row_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """(name, occurrence) identifying each row; the nth row with a name matches the nth"""
+    names = df[KEY_COLUMN].astype(object).where(df[KEY_COLUMN].notna(), '').to_numpy()
+    occurrence = np.zeros(len(names), dtype=np.int64)
+    # Names are nearly unique, so only number the duplicated ones
+    duplicated = pd.Series(names).duplicated(keep=False).to_numpy()
+    if duplicated.any():
+        occurrence[duplicated] = pd.Series(names[duplicated]).groupby(names[duplicated]).cumcount().to_numpy()
+    return pd.DataFrame({'name': names, 'occurrence': occurrence})
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """One content hash per row"""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def diff_datasets(current: pd.DataFrame, new: pd.DataFrame, removed_rows=(),
+                  current_hashes: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """Row positions that changed, appeared or disappeared between two typed datasets
+
+    Returns 'changed_rows' with the matching 'changed_new_rows' in new, 'added_new_rows'
+    (positions in new) and 'removed_rows'; rows already in removed_rows are ignored.
+    'new_hashes' are the row hashes of new, to pass back as current_hashes next time.
+    """
+    live = np.ones(len(current), dtype=bool)
+    live[list(removed_rows)] = False
+    live_rows = np.flatnonzero(live)
+    if current_hashes is None:
+        current_hashes = row_hashes(current)
+    new_hashes = row_hashes(new[current.columns])
+
+    old = row_keys(current.iloc[live_rows])
+    old['old_row'] = live_rows
+    old['old_hash'] = current_hashes[live_rows]
+    fresh = row_keys(new)
+    fresh['new_row'] = np.arange(len(new))
+    fresh['new_hash'] = new_hashes
+
+    merged = old.merge(fresh, on=['name', 'occurrence'], how='outer', indicator=True, sort=False)
+    both = merged[merged['_merge'] == 'both']
+    changed = both[both['old_hash'] != both['new_hash']]
+    return {
+        'changed_rows': changed['old_row'].to_numpy(dtype=np.int64),
+        'changed_new_rows': changed['new_row'].to_numpy(dtype=np.int64),
+        'added_new_rows': np.sort(merged.loc[merged['_merge'] == 'right_only', 'new_row'].to_numpy(dtype=np.int64)),
+        'removed_rows': np.sort(merged.loc[merged['_merge'] == 'left_only', 'old_row'].to_numpy(dtype=np.int64)),
+        'new_hashes': new_hashes,
+    }
+
+
+def merge_order(size: int, diff: Dict[str, np.ndarray]) -> np.ndarray:
+    """Positions in current + new (concatenated) of each merged row"""
+    take = np.arange(size)
+    take[diff['changed_rows']] = size + diff['changed_new_rows']
+    return np.concatenate([take, size + diff['added_new_rows']])
+
+
+def merge_datasets(current: pd.DataFrame, new: pd.DataFrame, diff: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """The current rows with changed ones replaced and added ones appended, positions kept"""
+    take = merge_order(len(current), diff)
+    merged = pd.concat([current, new[current.columns]], ignore_index=True).take(take).reset_index(drop=True)
+    # Concatenating categoricals with different categories falls back to object
+    for column in CATEGORY_COLUMNS:
+        if column in merged.columns and not isinstance(merged[column].dtype, pd.CategoricalDtype):
+            merged[column] = merged[column].astype('category')
+    return merged
+
+
+class DatasetWatcher:
+    """Polls an investor CSV and applies its edits to a running service"""
+
+    def __init__(self, service, path: str, interval_seconds: float = DEFAULT_RELOAD_SECONDS):
+        self.service = service
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self._signature = self._stat()
+        self._pending_signature = None
+        self._digest = file_digest(path) if self._signature else None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> Optional[Dict]:
+        """Apply the file if it changed and has settled since the last check; returns the reload summary"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            self._pending_signature = None
+            return None
+        if signature != self._pending_signature:
+            # Still being written (or just finished): look again next poll before reading it
+            self._pending_signature = signature
+            return None
+
+        self._pending_signature = None
+        digest = file_digest(self.path)
+        if digest == self._digest:
+            self._signature = signature
+            return None
+        df = load_investor_dataset(self.path)
+        summary = self.service.apply_dataset(df)
+        self._signature, self._digest = signature, digest
+        return summary
+
+    def run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                # A half-copied or malformed file: keep serving the current data and retry
+                logger.error(f"❌ Investor data reload failed for {self.path}: {str(e)}")
+
+    def start(self) -> "DatasetWatcher":
+        self._thread = threading.Thread(target=self.run, name="dataset-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"👀 Watching {self.path} for changes every {self.interval_seconds:g}s")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def start_dataset_watcher(service, path: str = None) -> Optional[DatasetWatcher]:
+    """Watch INVESTOR_CSV_PATH every INVESTOR_RELOAD_SECONDS (0 disables) for a service"""
+    interval = float(os.getenv('INVESTOR_RELOAD_SECONDS', DEFAULT_RELOAD_SECONDS))
+    path = path or os.getenv('INVESTOR_CSV_PATH', DEFAULT_CSV_PATH)
+    if interval <= 0 or not os.path.exists(path):
+        return None
+    return DatasetWatcher(service, path, interval).start()
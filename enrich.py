@@ -0,0 +1,473 @@
+"""Offline enrichment: generate insights and news for every investor in a CSV
+
+Rows are streamed from the CSV (in the Yogen.csv schema) and enriched with the same prompts
+as the details page, either by a bounded pool of workers going through the Gemini scheduler
+at background priority, or as Gemini Batch API jobs (--batch-api) which cost less per company
+but can take hours. Each enriched company is written as soon as it is done, with the CSV
+columns plus `insights` and `news`:
+
+    python enrich.py --csv attendees.csv --out briefings.jsonl --workers 8
+    python enrich.py --csv attendees.csv --out briefings/ --format parquet --batch-api
+
+The output is the checkpoint: rerunning the same command skips companies already in it, and
+Batch API jobs that were submitted but not collected (listed in <out>.batches.json) are
+collected instead of resubmitted. Failed companies are appended to <out>.errors.jsonl and
+retried on the next run. Generated text also goes into the shared response cache, so with
+AI_CACHE_DB_PATH set the app serves it without calling Gemini again.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Set
+
+import pandas as pd
+from dotenv import load_dotenv
+from google.genai import types
+
+import ai_service
+import metrics
+from gemini_scheduler import PRIORITY_BACKGROUND, create_gemini_scheduler
+from investor_data import DEFAULT_CSV_PATH, investor_record, iter_investor_csv
+from response_cache import ResponseCache, create_response_cache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_MAX_JOBS = 2
+DEFAULT_POLL_SECONDS = 30
+DEFAULT_FLUSH_EVERY = 500
+PROGRESS_EVERY = 10
+
+# How each section is generated, online and through the Batch API
+SECTIONS = {
+    'insights': {
+        'model': ai_service.INSIGHTS_MODEL,
+        'prompt': ai_service.build_company_info_prompt,
+        'system_instruction': ai_service.CONCISE_INSTRUCTION,
+        'clean': True,
+        'generate': ai_service.generate_company_info,
+    },
+    'news': {
+        'model': ai_service.NEWS_MODEL,
+        'prompt': ai_service.build_news_prompt,
+        'system_instruction': None,
+        'clean': False,
+        'generate': ai_service.generate_news_articles,
+    },
+}
+
+BATCH_DONE_STATES = {'JOB_STATE_SUCCEEDED', 'JOB_STATE_PARTIALLY_SUCCEEDED'}
+BATCH_FINAL_STATES = BATCH_DONE_STATES | {'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'}
+
+
+class JsonlOutput:
+    """Enriched companies appended one JSON line at a time"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.completed = set()
+        if os.path.exists(path):
+            self._drop_partial_line()
+            with open(path, encoding='utf-8') as f:
+                self.completed = {json.loads(line)['Investors'] for line in f if line.strip()}
+        else:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _drop_partial_line(self):
+        """Truncate a line left half-written by an interrupted run"""
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def write(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self.completed.add(record['Investors'])
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetOutput:
+    """Enriched companies written as part-NNNNN.parquet files of up to flush_every rows
+
+    Parts are renamed into place once complete, so an interrupted run loses at most the
+    rows buffered since the last part (they are regenerated, usually from the response cache).
+    """
+
+    def __init__(self, directory: str, flush_every: int = DEFAULT_FLUSH_EVERY):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.completed = set()
+        self._buffer: List[Dict] = []
+        os.makedirs(directory, exist_ok=True)
+        parts = sorted(glob.glob(os.path.join(directory, 'part-*.parquet')))
+        for part in parts:
+            self.completed.update(pd.read_parquet(part, columns=['Investors'])['Investors'])
+        self._next_part = len(parts)
+
+    def write(self, record: Dict):
+        self._buffer.append(record)
+        self.completed.add(record['Investors'])
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        path = os.path.join(self.directory, f"part-{self._next_part:05d}.parquet")
+        tmp_path = f"{path}.tmp"
+        pd.DataFrame(self._buffer).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self._next_part += 1
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+
+
+class ErrorLog:
+    """Companies that could not be enriched, appended to <out>.errors.jsonl"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, company_name: str, error: str):
+        logger.error(f"❌ Enrichment failed for {company_name}: {error}")
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'company': company_name, 'error': error, 'at': now()}) + '\n')
+
+
+class Progress:
+    """Counts outcomes and logs throughput in companies per minute"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stats = {'enriched': 0, 'failed': 0, 'skipped': 0}
+
+    def record(self, outcome: str):
+        self.stats[outcome] += 1
+        finished = self.stats['enriched'] + self.stats['failed']
+        if outcome != 'skipped' and finished % PROGRESS_EVERY == 0:
+            logger.info(f"📦 Enrichment progress: {self.stats} ({self.companies_per_minute():.1f} companies/min)")
+
+    def companies_per_minute(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.stats['enriched'] / elapsed * 60 if elapsed > 0 else 0.0
+
+    def summary(self) -> Dict:
+        return {**self.stats, 'elapsed_seconds': round(time.perf_counter() - self.started, 1),
+                'companies_per_minute': round(self.companies_per_minute(), 1)}
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def iter_companies(csv_path: str, completed: Set[str], progress: Progress, limit: int = None,
+                   chunksize: int = 1000) -> Iterator[pd.Series]:
+    """Investor rows still to enrich, one per company name, in CSV order
+
+    limit counts companies from the top of the CSV including completed ones, so a resumed
+    run covers the same companies as the interrupted one.
+    """
+    seen = set()
+    for chunk in iter_investor_csv(csv_path, chunksize):
+        for _, investor in chunk.iterrows():
+            name = investor['Investors']
+            if pd.isna(name) or not str(name).strip() or name in seen:
+                continue
+            if limit is not None and len(seen) >= limit:
+                return
+            seen.add(name)
+            if name in completed:
+                progress.record('skipped')
+                continue
+            yield investor
+
+
+def enriched_record(investor_fields: Dict, texts: Dict[str, str], mode: str) -> Dict:
+    return {**investor_fields, **texts, 'enriched_at': now(), 'enrichment_mode': mode}
+
+
+def enrich_company(client, investor: pd.Series, cache: ResponseCache, sections: List[str]) -> Dict:
+    """Output record for one company; raises if a section fails or comes back empty"""
+    name = investor['Investors']
+    texts = {}
+    for section in sections:
+        text = SECTIONS[section]['generate'](client, name, cache)
+        if not text:
+            raise ValueError(f"empty {section} response")
+        texts[section] = text
+    return enriched_record(investor_record(investor), texts, 'online')
+
+
+def enrich_online(client, companies: Iterator[pd.Series], output, errors: ErrorLog, progress: Progress,
+                  cache: ResponseCache, sections: List[str], max_workers: int = DEFAULT_WORKERS):
+    """Enrich companies on a worker pool, keeping at most two per worker queued
+
+    Pass a scheduled client (GeminiScheduler.bind) so requests are rate limited. Sections
+    already in the shared cache are not regenerated, so retrying a company whose news failed
+    only calls Gemini for the news.
+    """
+    pending = {}
+
+    def finish(done):
+        for future in done:
+            name = pending.pop(future)
+            try:
+                output.write(future.result())
+                progress.record('enriched')
+            except Exception as e:
+                errors.write(name, str(e))
+                progress.record('failed')
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="enrich") as executor:
+        for investor in companies:
+            if len(pending) >= max_workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                finish(done)
+            pending[executor.submit(enrich_company, client, investor, cache, sections)] = investor['Investors']
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            finish(done)
+
+
+def job_state(job) -> str:
+    return getattr(job.state, 'value', str(job.state))
+
+
+class BatchEnricher:
+    """Enrich companies through Gemini Batch API jobs of inlined requests
+
+    Every group of batch_size companies becomes one job per section (the models differ).
+    Submitted groups are saved to state_path with the companies' CSV fields before anything
+    else happens, so an interrupted run collects them on restart instead of paying for them
+    twice.
+    """
+
+    def __init__(self, client, output, errors: ErrorLog, progress: Progress, cache: ResponseCache,
+                 sections: List[str], state_path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_jobs: int = DEFAULT_MAX_JOBS, poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.client = client
+        self.output = output
+        self.errors = errors
+        self.progress = progress
+        self.cache = cache
+        self.sections = sections
+        self.state_path = state_path
+        self.batch_size = batch_size
+        self.max_jobs = max_jobs
+        self.poll_seconds = poll_seconds
+        self.groups: List[Dict] = []
+        if os.path.exists(state_path):
+            with open(state_path, encoding='utf-8') as f:
+                self.groups = json.load(f)['groups']
+            logger.info(f"📦 Resuming {len(self.groups)} submitted batch group(s) from {state_path}")
+        self._last_group_id = max((group['id'] for group in self.groups), default=0)
+
+    def run(self, companies: Iterator[pd.Series]):
+        submitted = {name for group in self.groups for name in group['records']}
+        batch: List[pd.Series] = []
+        for investor in companies:
+            if investor['Investors'] in submitted:
+                continue
+            batch.append(investor)
+            if len(batch) >= self.batch_size:
+                self.wait_for_slot()
+                self.submit(batch)
+                batch = []
+        if batch:
+            self.wait_for_slot()
+            self.submit(batch)
+        while self.groups:
+            if not self.collect_finished():
+                time.sleep(self.poll_seconds)
+
+    def wait_for_slot(self):
+        while len(self.groups) >= self.max_jobs:
+            if not self.collect_finished():
+                time.sleep(self.poll_seconds)
+
+    def save_state(self):
+        if not self.groups:
+            if os.path.exists(self.state_path):
+                os.remove(self.state_path)
+            return
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'groups': self.groups}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def submit(self, investors: List[pd.Series]):
+        self._last_group_id += 1
+        group_id = self._last_group_id
+        names = [investor['Investors'] for investor in investors]
+        jobs = {}
+        try:
+            for section in self.sections:
+                spec = SECTIONS[section]
+                config = ai_service.build_grounded_config(spec['system_instruction'])
+                requests = [types.InlinedRequest(model=spec['model'], contents=spec['prompt'](name), config=config,
+                                                 metadata={'company': name})
+                            for name in names]
+                job = self.client.batches.create(
+                    model=spec['model'],
+                    src=requests,
+                    config=types.CreateBatchJobConfig(display_name=f"enrich-{group_id}-{section}"),
+                )
+                jobs[section] = job.name
+        except Exception:
+            # Do not leave a half-submitted group running unrecorded
+            for name in jobs.values():
+                self.client.batches.cancel(name=name)
+            raise
+        self.groups.append({
+            'id': group_id,
+            'jobs': jobs,
+            'records': {investor['Investors']: investor_record(investor) for investor in investors},
+        })
+        self.save_state()
+        logger.info(f"📤 Submitted batch group {group_id} ({len(names)} companies): {', '.join(jobs.values())}")
+
+    def collect_finished(self) -> bool:
+        """Write out every group whose jobs have all finished; True if any did"""
+        collected = False
+        for group in list(self.groups):
+            jobs = {section: self.client.batches.get(name=name) for section, name in group['jobs'].items()}
+            if not all(job_state(job) in BATCH_FINAL_STATES for job in jobs.values()):
+                continue
+            self.collect(group, jobs)
+            self.groups.remove(group)
+            self.save_state()
+            collected = True
+        return collected
+
+    def collect(self, group: Dict, jobs: Dict):
+        companies = list(group['records'])
+        texts: Dict[str, Dict[str, str]] = {name: {} for name in companies}
+        failures: Dict[str, List[str]] = {name: [] for name in companies}
+
+        for section, job in jobs.items():
+            spec = SECTIONS[section]
+            state = job_state(job)
+            responses = job.dest.inlined_responses if state in BATCH_DONE_STATES and job.dest else None
+            if not responses:
+                for name in companies:
+                    failures[name].append(f"{section} batch job {job.name} ended in {state}")
+                continue
+            for i, item in enumerate(responses):
+                # Responses come back in request order; metadata confirms which company
+                name = (item.metadata or {}).get('company') or companies[i]
+                if name not in texts:
+                    continue
+                text = self.response_text(item.response, spec) if item.error is None else None
+                if not text:
+                    error = getattr(item.error, 'message', None) or "empty response"
+                    failures[name].append(f"{section}: {error}")
+                    continue
+                texts[name][section] = text
+                prompt = spec['prompt'](name)
+                if self.cache is not None:
+                    self.cache.set(make_cache_key(name, spec['model'], prompt), text, name)
+            for name in companies:
+                if section not in texts[name] and not failures[name]:
+                    failures[name].append(f"{section}: missing from batch results")
+
+        for name in companies:
+            if name in self.output.completed:
+                continue
+            if failures[name]:
+                self.errors.write(name, "; ".join(failures[name]))
+                self.progress.record('failed')
+            else:
+                self.output.write(enriched_record(group['records'][name], texts[name], 'batch'))
+                self.progress.record('enriched')
+        logger.info(f"📥 Collected batch group {group['id']}")
+
+    @staticmethod
+    def response_text(response, spec: Dict) -> Optional[str]:
+        """Finished text with cleanup and Sources, as generate_grounded_text returns it"""
+        if not response or not response.text:
+            return None
+        ai_service.record_usage(spec['model'], getattr(response, 'usage_metadata', None))
+        text = response.text.strip()
+        if spec['clean']:
+            text = ai_service.clean_response_text(text)
+        return ai_service.add_wikipedia_style_citations(response, text)
+
+
+def open_output(path: str, output_format: str, flush_every: int = DEFAULT_FLUSH_EVERY):
+    if output_format == 'parquet':
+        return ParquetOutput(path, flush_every)
+    return JsonlOutput(path)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate AI insights and news for every investor in a CSV")
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH, help="Investor CSV in the Yogen.csv schema")
+    parser.add_argument('--out', required=True, help="JSONL file, or directory of Parquet parts with --format parquet")
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Companies enriched concurrently")
+    parser.add_argument('--limit', type=int, default=None, help="Only enrich the first N companies")
+    parser.add_argument('--skip-news', action='store_true', help="Only generate company insights")
+    parser.add_argument('--flush-every', type=int, default=DEFAULT_FLUSH_EVERY, help="Rows per Parquet part")
+    parser.add_argument('--batch-api', action='store_true', help="Submit Gemini Batch API jobs instead of online requests")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Companies per batch job")
+    parser.add_argument('--max-jobs', type=int, default=DEFAULT_MAX_JOBS, help="Batch groups in flight at once")
+    parser.add_argument('--poll-seconds', type=float, default=DEFAULT_POLL_SECONDS, help="Batch job status poll interval")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+    registry = metrics.configure_from_env()
+
+    if not ai_service.get_api_key():
+        logger.error("❌ Set GOOGLE_API_KEY or GEMINI_API_KEY to enrich investors")
+        return 1
+
+    sections = ['insights'] if args.skip_news else ['insights', 'news']
+    cache = create_response_cache()
+    output = open_output(args.out, args.format, args.flush_every)
+    base_path = args.out.rstrip('/\\')
+    errors = ErrorLog(f"{base_path}.errors.jsonl")
+    progress = Progress()
+    if output.completed:
+        logger.info(f"📦 {len(output.completed)} companies already in {args.out}; resuming")
+
+    companies = iter_companies(args.csv, output.completed, progress, limit=args.limit)
+    client = ai_service.create_client()
+    try:
+        if args.batch_api:
+            BatchEnricher(client, output, errors, progress, cache, sections, f"{base_path}.batches.json",
+                          batch_size=args.batch_size, max_jobs=args.max_jobs,
+                          poll_seconds=args.poll_seconds).run(companies)
+        else:
+            scheduler = create_gemini_scheduler()
+            enrich_online(scheduler.bind(client, PRIORITY_BACKGROUND), companies, output, errors, progress,
+                          cache, sections, max_workers=args.workers)
+            logger.info(f"🚦 Scheduler stats: {scheduler.stats()}")
+    finally:
+        output.close()
+
+    summary = progress.summary()
+    logger.info(f"✅ Enrichment finished: {summary}")
+    print(f"Enriched {summary['enriched']} companies in {summary['elapsed_seconds']}s "
+          f"({summary['companies_per_minute']} companies/min); {summary['failed']} failed, "
+          f"{summary['skipped']} already done")
+    if registry.enabled and os.getenv('METRICS_FILE'):
+        registry.write_prometheus_file(os.getenv('METRICS_FILE'))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""Faceted filtering and metric ranking over the investor list
+
+FacetIndex holds the dataset as NumPy arrays: one integer code per row for each facet column
+and one float per row for each metric. A query such as "growth investors in the US with more
+than $1B of dry powder, by recent deal count" becomes a few boolean masks ANDed together and
+one argsort. The mask for each filter clause is cached, so while a visitor changes one filter
+the others are not recomputed, and the counts shown next to every facet value (how many rows
+match it given all the other filters) come from one bincount per facet.
+
+Like the search indexes the object is never modified once built; InvestorService builds a new
+one after a dataset reload.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from investor_data import AMOUNT_COLUMNS, CATEGORY_COLUMNS, COUNT_COLUMNS
+
+# Short names used by the UI and the API for the filterable columns
+FACETS = {
+    'type': 'Primary Investor Type',
+    'country': 'HQ Country/Territory/Region',
+    'category': 'PE Category',
+}
+# Metrics that can be range-filtered and sorted by; AUM and Dry Powder are in millions (USD)
+METRICS = {
+    'aum': 'AUM',
+    'dry_powder': 'Dry Powder',
+    'investments': 'Investments',
+    'active_portfolio': 'Active Portfolio',
+    'exits': 'Exits',
+    'recent_investments': 'Investments in the last 12 months',
+}
+
+# Clause masks kept per index; each is one byte per row
+MASK_CACHE_SIZE = 256
+
+Range = Tuple[Optional[float], Optional[float]]
+
+
+def top_k_order(keys: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k smallest keys in ascending order, ties kept in position order
+
+    Only the rows up to the k-th smallest key (and any tied with it) are sorted, so a page of
+    results out of 100k matches does not sort all of them.
+    """
+    if k < len(keys):
+        threshold = np.partition(keys, k - 1)[k - 1] if k > 0 else -np.inf
+        candidates = np.flatnonzero(keys <= threshold)
+    else:
+        candidates = np.arange(len(keys))
+    return candidates[np.argsort(keys[candidates], kind='stable')][:k]
+
+
+class FacetIndex:
+    """Facet codes and metric values as arrays, with cached masks for each filter clause"""
+
+    def __init__(self, df: pd.DataFrame, removed_rows: Iterable[int] = ()):
+        self.num_rows = len(df)
+        self.live = np.ones(self.num_rows, dtype=bool)
+        self.live[list(removed_rows)] = False
+        self.codes: Dict[str, np.ndarray] = {}
+        self.values: Dict[str, List[str]] = {}
+        self.value_ids: Dict[str, Dict[str, int]] = {}
+        self.metrics: Dict[str, np.ndarray] = {}
+
+        for facet, column in FACETS.items():
+            if column not in df.columns:
+                continue
+            series = df[column]
+            if column in CATEGORY_COLUMNS and isinstance(series.dtype, pd.CategoricalDtype):
+                codes, values = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, values = pd.factorize(series, sort=True)
+            self.codes[facet] = codes.astype(np.int32)
+            self.values[facet] = [str(value) for value in values]
+            self.value_ids[facet] = {value: code for code, value in enumerate(self.values[facet])}
+
+        for metric, column in METRICS.items():
+            if column in AMOUNT_COLUMNS + COUNT_COLUMNS and column in df.columns:
+                self.metrics[metric] = df[column].to_numpy(dtype='float64', na_value=np.nan)
+
+        self._masks: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached_mask(self, key: tuple, build) -> np.ndarray:
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+        mask = build()
+        with self._lock:
+            self._masks[key] = mask
+            while len(self._masks) > MASK_CACHE_SIZE:
+                self._masks.popitem(last=False)
+        return mask
+
+    def facet_mask(self, facet: str, values: Sequence[str]) -> np.ndarray:
+        """Rows whose facet is any of values"""
+        ids = sorted({self.value_ids[facet][value] for value in values if value in self.value_ids[facet]})
+
+        def build():
+            # Lookup table over the codes (the last slot is the missing value's -1)
+            selected = np.zeros(len(self.values[facet]) + 1, dtype=bool)
+            selected[ids] = True
+            return selected[self.codes[facet]]
+        return self._cached_mask(('facet', facet, tuple(ids)), build)
+
+    def range_mask(self, metric: str, low: Optional[float], high: Optional[float]) -> np.ndarray:
+        """Rows whose metric lies in [low, high]; rows without a value never match"""
+        def build():
+            column = self.metrics[metric]
+            mask = ~np.isnan(column)
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+            return mask
+        return self._cached_mask(('range', metric, low, high), build)
+
+    def value_range(self, metric: str) -> Range:
+        """Smallest and largest value of a metric among the listed investors"""
+        column = self.metrics[metric][self.live]
+        column = column[~np.isnan(column)]
+        if not len(column):
+            return None, None
+        return float(column.min()), float(column.max())
+
+    @metrics.timed('search_seconds', kind='facets')
+    def query(self, selected: Dict[str, Sequence[str]] = None, ranges: Dict[str, Range] = None,
+              sort_by: str = None, descending: bool = True, limit: int = 50, offset: int = 0) -> Dict:
+        """Rows matching every filter, ranked by a metric, with per-facet value counts
+
+        Values selected within one facet are alternatives (OR); facets and ranges are combined
+        with AND. Each facet's counts apply every filter except that facet's own, so they show
+        what picking another value would return. Unknown facets and metrics raise KeyError.
+        Returns {'total', 'row_ids', 'counts': {facet: {value: count}}}.
+        """
+        facet_masks = {facet: self.facet_mask(facet, values)
+                       for facet, values in (selected or {}).items() if values}
+        base = self.live.copy()
+        for metric, (low, high) in (ranges or {}).items():
+            if low is not None or high is not None:
+                base &= self.range_mask(metric, low, high)
+
+        counts = {}
+        for facet, codes in self.codes.items():
+            others = base.copy()
+            for other, mask in facet_masks.items():
+                if other != facet:
+                    others &= mask
+            facet_codes = codes[others]
+            tally = np.bincount(facet_codes[facet_codes >= 0], minlength=len(self.values[facet]))
+            counts[facet] = {self.values[facet][code]: int(tally[code]) for code in np.flatnonzero(tally)}
+
+        matches = base
+        for mask in facet_masks.values():
+            matches = matches & mask
+        row_ids = np.flatnonzero(matches)
+        if sort_by is not None:
+            keys = self.metrics[sort_by][row_ids]
+            if descending:
+                keys = -keys
+            # Missing values go last either way
+            keys = np.nan_to_num(keys, nan=np.inf)
+            total = len(row_ids)
+            row_ids = row_ids[top_k_order(keys, offset + limit)]
+        else:
+            total = len(row_ids)
+        return {
+            'total': total,
+            'row_ids': row_ids[offset:offset + limit].tolist(),
+            'counts': counts,
+        }
@@ -0,0 +1,254 @@
+"""Process-wide Gemini request scheduler: per-model token buckets, priorities and retry backoff
+
+Every Gemini call in the process goes through one GeminiScheduler. Each model has its own
+token bucket (requests per minute with a burst allowance) and its own priority queue, so a
+backlog of Pro news requests never holds up Flash calls. Within a model, interactive chat is
+served before details-page loads, which are served before prewarm and batch work. A global
+concurrency cap bounds open requests, and 429/5xx responses are retried with exponential
+backoff and full jitter.
+"""
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Iterator, Tuple
+
+import metrics
+from ai_service import INSIGHTS_MODEL, NEWS_MODEL
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PAGE = 1
+PRIORITY_BACKGROUND = 2
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# (requests per minute, burst) per model
+DEFAULT_LIMITS = {
+    INSIGHTS_MODEL: (60.0, 10),
+    NEWS_MODEL: (20.0, 5),
+}
+DEFAULT_MODEL_LIMIT = (30.0, 5)
+
+
+class TokenBucket:
+    """Classic token bucket; not thread-safe on its own (the scheduler holds the lock)"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_available(self) -> float:
+        """Seconds until one token can be taken (0 if one is available now)"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        if self.rate <= 0:
+            return float('inf')
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class _ModelLane:
+    """Token bucket plus the priority queue of callers waiting for it"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.waiting = []  # heap of (priority, sequence)
+        self.requests = 0
+        self.retries = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate-limit and server errors reported by the Gemini SDK"""
+    code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    return code in RETRYABLE_STATUS_CODES
+
+
+class GeminiScheduler:
+    """Admits Gemini calls by model quota, priority and a global concurrency cap"""
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]] = None, max_concurrency: int = 8,
+                 max_retries: int = 4, backoff_base: float = 1.0, backoff_cap: float = 30.0):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._cond = threading.Condition()
+        self._lanes: Dict[str, _ModelLane] = {}
+        self._sequence = itertools.count()
+        self._active = 0
+
+    def _lane(self, model: str) -> _ModelLane:
+        """Lane for a model, created on first use; caller must hold the lock"""
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = self._lanes[model] = _ModelLane(*self.limits.get(model, DEFAULT_MODEL_LIMIT))
+        return lane
+
+    def acquire(self, model: str, priority: int = PRIORITY_PAGE):
+        """Block until this call is first in its model's queue, has a token and a free slot"""
+        started = time.monotonic()
+        with self._cond:
+            lane = self._lane(model)
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(lane.waiting, ticket)
+            while True:
+                if lane.waiting[0] == ticket and self._active < self.max_concurrency:
+                    delay = lane.bucket.time_until_available()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(timeout=delay)
+                else:
+                    self._cond.wait()
+            heapq.heappop(lane.waiting)
+            lane.bucket.take()
+            self._active += 1
+            waited = time.monotonic() - started
+            lane.requests += 1
+            lane.wait_total += waited
+            lane.wait_max = max(lane.wait_max, waited)
+            queue_depth = len(lane.waiting)
+            # Wake the next caller in line so it can re-check the bucket
+            self._cond.notify_all()
+
+        metrics.observe('gemini_queue_wait_seconds', waited, model=model, priority=priority)
+        if waited > 1.0:
+            logger.info(f"🚦 Gemini {model} waited {waited:.2f}s (priority {priority}, queue depth {queue_depth})")
+
+    def release(self):
+        """Free the concurrency slot taken by acquire"""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _backoff(self, model: str, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff delay for a retryable failure"""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+        with self._cond:
+            self._lane(model).retries += 1
+        metrics.inc('gemini_retries_total', model=model, code=getattr(error, 'code', 'unknown'))
+        logger.warning(f"🔁 Gemini {model} failed with {getattr(error, 'code', '?')}, retrying in {delay:.1f}s "
+                       f"(attempt {attempt + 1}/{self.max_retries})")
+        return delay
+
+    def call(self, model_name: str, priority: int, fn, *args, **kwargs):
+        """Run a blocking Gemini call under the scheduler, retrying 429/5xx"""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(model_name, priority)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._backoff(model_name, attempt, e)
+            finally:
+                self.release()
+            time.sleep(delay)
+
+    def stream(self, model_name: str, priority: int, fn, *args, **kwargs) -> Iterator:
+        """Run a streaming Gemini call, holding a slot until the stream is consumed
+
+        Failures are only retried before the first chunk; after that they are raised.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(model_name, priority)
+            received_chunk = False
+            try:
+                for chunk in fn(*args, **kwargs):
+                    received_chunk = True
+                    yield chunk
+                return
+            except Exception as e:
+                if received_chunk or attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._backoff(model_name, attempt, e)
+            finally:
+                self.release()
+            time.sleep(delay)
+
+    def bind(self, client, priority: int = PRIORITY_PAGE) -> "ScheduledClient":
+        """Wrap a genai.Client so its model calls are scheduled at the given priority"""
+        return ScheduledClient(self, client, priority)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Queue depth, wait-time and retry metrics per model"""
+        with self._cond:
+            return {
+                model: {
+                    'queue_depth': len(lane.waiting),
+                    'requests': lane.requests,
+                    'retries': lane.retries,
+                    'wait_seconds_avg': lane.wait_total / lane.requests if lane.requests else 0.0,
+                    'wait_seconds_max': lane.wait_max,
+                    'tokens_available': lane.bucket.tokens,
+                }
+                for model, lane in self._lanes.items()
+            }
+
+    @property
+    def active(self) -> int:
+        with self._cond:
+            return self._active
+
+
+class _ScheduledModels:
+    """Stand-in for client.models that routes generation through the scheduler"""
+
+    def __init__(self, scheduler: GeminiScheduler, models, priority: int):
+        self._scheduler = scheduler
+        self._models = models
+        self._priority = priority
+
+    def generate_content(self, *, model: str, **kwargs):
+        return self._scheduler.call(model, self._priority, self._models.generate_content, model=model, **kwargs)
+
+    def generate_content_stream(self, *, model: str, **kwargs):
+        return self._scheduler.stream(model, self._priority, self._models.generate_content_stream, model=model, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class ScheduledClient:
+    """genai.Client wrapper bound to one priority; other attributes pass through"""
+
+    def __init__(self, scheduler: GeminiScheduler, client, priority: int):
+        self._client = client
+        self.priority = priority
+        self.models = _ScheduledModels(scheduler, client.models, priority)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def create_gemini_scheduler() -> GeminiScheduler:
+    """Scheduler configured from GEMINI_* environment variables"""
+    flash_rpm, flash_burst = DEFAULT_LIMITS[INSIGHTS_MODEL]
+    pro_rpm, pro_burst = DEFAULT_LIMITS[NEWS_MODEL]
+    limits = {
+        INSIGHTS_MODEL: (float(os.getenv('GEMINI_FLASH_RPM', flash_rpm)), int(os.getenv('GEMINI_FLASH_BURST', flash_burst))),
+        NEWS_MODEL: (float(os.getenv('GEMINI_PRO_RPM', pro_rpm)), int(os.getenv('GEMINI_PRO_BURST', pro_burst))),
+    }
+    return GeminiScheduler(
+        limits=limits,
+        max_concurrency=int(os.getenv('GEMINI_MAX_CONCURRENCY', 8)),
+        max_retries=int(os.getenv('GEMINI_MAX_RETRIES', 4)),
+    )
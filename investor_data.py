@@ -0,0 +1,166 @@
+"""Investor dataset loading shared by the Streamlit app and offline jobs
+
+The CSV is parsed once against an explicit schema (typed numerics, categorical facets,
+'#N/A' as null) and written to a Parquet file next to it in the cache directory. Later
+loads read the Parquet copy as long as the CSV's mtime and size are unchanged.
+"""
+import glob
+import logging
+import math
+import os
+from typing import Dict, Iterator, List
+
+import pandas as pd
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Default investor list shipped with the app
+DEFAULT_CSV_PATH = 'Yogen.csv'
+
+# Where typed Parquet copies of investor CSVs are kept
+DEFAULT_CACHE_DIR = '.cache'
+
+# Bump when the schema below changes so stale Parquet copies are ignored
+SCHEMA_VERSION = 1
+
+TEXT_COLUMNS = ['Investors', 'Name in PEI Event List', 'HQ Location', 'Last Investment Company', 'Description']
+CATEGORY_COLUMNS = ['Primary Investor Type', 'HQ Country/Territory/Region', 'PE Category']
+# Amounts in millions (USD)
+AMOUNT_COLUMNS = ['AUM', 'Dry Powder']
+COUNT_COLUMNS = ['Investments', 'Active Portfolio', 'Exits', 'Investments in the last 12 months']
+
+# Values treated as missing on top of pandas' defaults (which already include '#N/A')
+NULL_VALUES = ['#N/A', 'N/A', 'n/a', '-', '']
+
+
+def read_investor_csv(path: str = DEFAULT_CSV_PATH) -> pd.DataFrame:
+    """Read an investor CSV in the Yogen.csv schema and apply the typed schema"""
+    df = pd.read_csv(path, dtype=str, na_values=NULL_VALUES, keep_default_na=True)
+    return apply_schema(df)
+
+
+def iter_investor_csv(path: str = DEFAULT_CSV_PATH, chunksize: int = 1000) -> Iterator[pd.DataFrame]:
+    """Typed chunks of an investor CSV, for jobs that stream lists too large to hold at once"""
+    reader = pd.read_csv(path, dtype=str, na_values=NULL_VALUES, keep_default_na=True, chunksize=chunksize)
+    for chunk in reader:
+        yield apply_schema(chunk)
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert raw string columns to their schema dtypes"""
+    df = df.copy()
+    for column in TEXT_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].str.strip()
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].str.strip().astype('category')
+    for column in AMOUNT_COLUMNS:
+        if column in df.columns:
+            df[column] = to_number(df[column]).astype('float64')
+    for column in COUNT_COLUMNS:
+        if column in df.columns:
+            df[column] = to_number(df[column]).round().astype('Int64')
+    return df
+
+
+def to_number(series: pd.Series) -> pd.Series:
+    """Parse numbers such as '1,234.5' or '$2,760'; anything unparseable becomes null"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    cleaned = series.astype('string').str.replace(r'[,$\s]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def cache_path_for(path: str, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    """Parquet cache file name tied to the CSV's mtime and size"""
+    stat = os.stat(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}.v{SCHEMA_VERSION}.{stat.st_mtime_ns}.{stat.st_size}.parquet")
+
+
+def load_investor_dataset(path: str = DEFAULT_CSV_PATH, cache_dir: str = None) -> pd.DataFrame:
+    """Load the typed dataset, reusing the Parquet copy when the CSV is unchanged"""
+    cache_dir = cache_dir or os.getenv('INVESTOR_CACHE_DIR', DEFAULT_CACHE_DIR)
+    cached_path = cache_path_for(path, cache_dir)
+
+    if os.path.exists(cached_path):
+        try:
+            with metrics.timer('investor_data_load_seconds', source='parquet'):
+                df = pd.read_parquet(cached_path)
+            logger.info(f"📦 Loaded {len(df)} investors from {cached_path}")
+            return df
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable investor cache {cached_path}: {str(e)}")
+
+    with metrics.timer('investor_data_load_seconds', source='csv'):
+        df = read_investor_csv(path)
+    write_parquet_cache(df, path, cached_path)
+    return df
+
+
+def write_parquet_cache(df: pd.DataFrame, path: str, cached_path: str):
+    """Write the typed copy and remove copies made from older versions of the CSV"""
+    try:
+        os.makedirs(os.path.dirname(cached_path) or '.', exist_ok=True)
+        tmp_path = f"{cached_path}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cached_path)
+    except Exception as e:
+        # pyarrow missing or read-only disk: keep serving from the CSV
+        logger.warning(f"⚠️ Could not write investor cache {cached_path}: {str(e)}")
+        return
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for stale_path in glob.glob(os.path.join(os.path.dirname(cached_path), f"{glob.escape(stem)}.v*.parquet")):
+        if stale_path != cached_path:
+            try:
+                os.remove(stale_path)
+            except OSError as e:
+                # Another loader (the app or the API) may have removed it first
+                logger.warning(f"⚠️ Could not remove stale investor cache {stale_path}: {str(e)}")
+    logger.info(f"📦 Cached {len(df)} investors to {cached_path}")
+
+
+def json_safe(value):
+    """Plain JSON value for a DataFrame cell (NaN/NA become null, NumPy scalars Python ones)"""
+    if value is None:
+        return None
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        value = value.item()
+    if isinstance(value, (str, bool, int)):
+        return value
+    if isinstance(value, float):
+        return None if math.isnan(value) else value
+    return None if pd.isna(value) else str(value)
+
+
+def investor_record(investor: pd.Series) -> Dict:
+    """One investor row as a JSON-serializable dict"""
+    return {column: json_safe(value) for column, value in investor.items()}
+
+
+def get_investor_names(df: pd.DataFrame) -> List[str]:
+    """Unique primary investor names in file order"""
+    if df is None or 'Investors' not in df.columns:
+        return []
+    names = df['Investors'].dropna().astype(str).str.strip()
+    return [name for name in names.unique().tolist() if name and name != '#N/A']
+
+
+def get_all_company_names(df: pd.DataFrame) -> List[str]:
+    """Sorted unique names from both name columns, for search suggestions"""
+    if df is None:
+        return []
+
+    # A set keeps the merge linear; the list membership test was quadratic in the row count
+    names = set()
+    if 'Investors' in df.columns:
+        names.update(df['Investors'].dropna().astype(str).unique().tolist())
+    if 'Name in PEI Event List' in df.columns:
+        alt_names = df['Name in PEI Event List'].dropna().astype(str).unique().tolist()
+        names.update(name for name in alt_names if name != '#N/A')
+
+    return sorted([name for name in names if name and name.strip()])
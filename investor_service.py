@@ -0,0 +1,391 @@
+"""Headless investor search and AI features shared by the Streamlit UI and the JSON API
+
+InvestorService owns the process-wide pieces: the typed dataset and its search indexes, the
+shared response, chat and semantic caches, Gemini context caches, the scheduler and the
+pooled Gemini client. Nothing in this module touches Streamlit, so one instance serves
+app.py in process and api.py over HTTP, and both see the same caches. apply_dataset swaps in
+an edited investor list without a restart (see dataset_reload).
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+import ai_service
+import chat_context
+import dataset_reload
+import metrics
+from ai_service import CONCISE_INSTRUCTION, INSIGHTS_MODEL, NEWS_MODEL
+from facets import FacetIndex
+from peers import DEFAULT_PEERS, PeerIndex
+from gemini_scheduler import GeminiScheduler, PRIORITY_INTERACTIVE, PRIORITY_PAGE, create_gemini_scheduler
+from investor_data import DEFAULT_CSV_PATH, get_all_company_names, load_investor_dataset
+from response_cache import ResponseCache, create_response_cache, make_cache_key
+from search_index import NAME_COLUMNS, AliasIndex, SearchIndex, SuggestionIndex, build_search_index
+from semantic_cache import SemanticCache, create_semantic_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHAT_CACHE_MAX_ENTRIES = 1000
+DEFAULT_CHAT_CACHE_TTL_SECONDS = 60 * 60
+
+
+class InvestorService:
+    """Dataset lookups plus cached insights, news and ARIA chat for every front end"""
+
+    def __init__(self, df: pd.DataFrame, client=None, response_cache: ResponseCache = None,
+                 chat_cache: ResponseCache = None, semantic_cache: SemanticCache = None,
+                 context_cache: chat_context.CompanyContextCache = None, scheduler: GeminiScheduler = None,
+                 chat_token_budget: int = chat_context.DEFAULT_TOKEN_BUDGET):
+        # The DataFrame is shared by every caller, so treat it as read-only
+        self.df = df
+        self.client = client
+        self.response_cache = response_cache if response_cache is not None else create_response_cache()
+        self.chat_cache = chat_cache if chat_cache is not None else create_chat_cache()
+        self.semantic_cache = semantic_cache if semantic_cache is not None else create_semantic_cache()
+        self.context_cache = context_cache
+        self.scheduler = scheduler if scheduler is not None else create_gemini_scheduler()
+        self.chat_token_budget = chat_token_budget
+        self._index_lock = threading.Lock()
+        self._search_index: Optional[SearchIndex] = None
+        self._suggestion_index: Optional[SuggestionIndex] = None
+        self._alias_index: Optional[AliasIndex] = None
+        self._facet_index: Optional[FacetIndex] = None
+        self._peer_index: Optional[PeerIndex] = None
+        self._peer_build_lock = threading.Lock()
+        # Rows dropped by a reload; they keep their position so other row ids stay valid
+        self.removed_rows: Set[int] = set()
+        self._row_hashes: Optional[np.ndarray] = None
+        self.dataset_version = 0
+        self._reload_lock = threading.Lock()
+        self._reload_listeners: List[Callable[[Dict], None]] = []
+
+    # Indexes are built on first use so a process that only serves one feature pays for one.
+    # Readers take the index before self.df: a reload publishes the rows first, so an index
+    # never points past the end of the DataFrame it is used with.
+
+    @property
+    def search_index(self) -> SearchIndex:
+        with self._index_lock:
+            if self._search_index is None:
+                index = build_search_index(self.df)
+                if self.removed_rows:
+                    index = index.updated(self.df, self.df, self.removed_rows, [])
+                self._search_index = index
+            return self._search_index
+
+    @property
+    def suggestion_index(self) -> SuggestionIndex:
+        with self._index_lock:
+            if self._suggestion_index is None:
+                self._suggestion_index = SuggestionIndex(get_all_company_names(self.live_df()))
+            return self._suggestion_index
+
+    @property
+    def alias_index(self) -> AliasIndex:
+        with self._index_lock:
+            if self._alias_index is None:
+                index = AliasIndex(self.df)
+                if self.removed_rows:
+                    index = index.updated(self.df, self.df, self.removed_rows, [])
+                self._alias_index = index
+            return self._alias_index
+
+    @property
+    def facet_index(self) -> FacetIndex:
+        with self._index_lock:
+            if self._facet_index is None:
+                self._facet_index = FacetIndex(self.df, self.removed_rows)
+            return self._facet_index
+
+    @property
+    def peer_index(self) -> PeerIndex:
+        # Takes seconds at 100k rows, so it is built outside _index_lock and searches carry on
+        with self._peer_build_lock:
+            with self._index_lock:
+                if self._peer_index is not None:
+                    return self._peer_index
+                df, removed_rows = self.df, set(self.removed_rows)
+            index = PeerIndex(df, removed_rows)
+            with self._index_lock:
+                # A reload during the build leaves it to the next caller to rebuild
+                if self.df is df:
+                    self._peer_index = index
+            return index
+
+    def warm_peer_index(self) -> threading.Thread:
+        """Build the peer index in the background so the first details page does not wait for it"""
+        thread = threading.Thread(target=lambda: self.peer_index, name="peer-index", daemon=True)
+        thread.start()
+        return thread
+
+    def live_df(self) -> pd.DataFrame:
+        """The investors still in the list, indexed by row id"""
+        if not self.removed_rows:
+            return self.df
+        return self.df.drop(index=list(self.removed_rows))
+
+    def investor(self, row_id: Optional[int]) -> Optional[pd.Series]:
+        """Investor row for a row id from the alias or search index"""
+        df = self.df
+        if row_id is None or not 0 <= row_id < len(df) or row_id in self.removed_rows:
+            return None
+        return df.iloc[row_id]
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Row id for a company name from either name column"""
+        return self.alias_index.lookup(name)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Fuzzy matches across the search fields, each with its investor row"""
+        if not query or not query.strip():
+            return []
+        matches = self.search_index.search(query, limit=limit)
+        df = self.df
+        for match in matches:
+            match['investor'] = df.iloc[match['row_id']]
+        return matches
+
+    def peers(self, row_id: int, limit: int = DEFAULT_PEERS) -> List[Dict]:
+        """Most similar listed investors by metrics and description, each with its investor row"""
+        index = self.peer_index
+        if self.investor(row_id) is None or row_id >= index.num_rows:
+            return []
+        peers = index.similar(row_id, limit)
+        df = self.df
+        for peer in peers:
+            peer['investor'] = df.iloc[peer['row_id']]
+        return peers
+
+    def suggest(self, query: str, limit: int = 10) -> List[str]:
+        """Typeahead company names for a partial query"""
+        if not query:
+            return []
+        return self.suggestion_index.suggest(query, limit=limit)
+
+    def filter_investors(self, selected: Dict[str, List[str]] = None, ranges: Dict = None, sort_by: str = None,
+                         descending: bool = True, limit: int = 50, offset: int = 0) -> Dict:
+        """Faceted filter and metric ranking (see FacetIndex.query), with each matching investor row"""
+        result = self.facet_index.query(selected, ranges, sort_by=sort_by, descending=descending,
+                                        limit=limit, offset=offset)
+        df = self.df
+        result['investors'] = [df.iloc[row_id] for row_id in result['row_ids']]
+        return result
+
+    def scheduled_client(self, priority: int = PRIORITY_PAGE):
+        """The shared Gemini client, routed through the scheduler at a priority"""
+        if self.client is None:
+            raise RuntimeError("Gemini client not initialized")
+        return self.scheduler.bind(self.client, priority)
+
+    def company_info(self, company_name: str, on_text: Callable[[str], None] = None) -> Optional[str]:
+        """Verified company overview, from the shared cache or Gemini Flash"""
+        return ai_service.generate_company_info(self.scheduled_client(PRIORITY_PAGE), company_name,
+                                                self.response_cache, on_text)
+
+    def news(self, company_name: str, on_text: Callable[[str], None] = None) -> Optional[str]:
+        """Recent verified news, from the shared cache or Gemini Pro"""
+        return ai_service.generate_news_articles(self.scheduled_client(PRIORITY_PAGE), company_name,
+                                                 self.response_cache, on_text)
+
+    def cached_company_info(self, company_name: str) -> Optional[str]:
+        """Company overview if it has already been generated; never calls Gemini"""
+        prompt = ai_service.build_company_info_prompt(company_name)
+        return self.response_cache.get(make_cache_key(company_name, INSIGHTS_MODEL, prompt))
+
+    def cached_news(self, company_name: str) -> Optional[str]:
+        """Recent news if it has already been generated; never calls Gemini"""
+        prompt = ai_service.build_news_prompt(company_name)
+        return self.response_cache.get(make_cache_key(company_name, NEWS_MODEL, prompt))
+
+    def chat(self, company_name: str, question: str, chat_history: List[Dict], summary_state: Dict,
+             metadata: Dict = None, insights: str = None, news: str = None, peers: List[Dict] = None,
+             on_text: Callable[[str], None] = None) -> Optional[str]:
+        """ARIA answer to a question about one company, or None for an empty response
+
+        The prompt is kept within chat_token_budget: older turns are summarized into
+        summary_state (the caller keeps it per conversation), only the relevant insight/news
+        sections are inlined, and when the company's material is large enough it is sent once
+        as a Gemini context cache instead. Answers are shared across callers through the chat
+        cache (see chat_context.chat_cache_key), and reworded questions reuse them through
+        the semantic cache. peers (from peers()) are part of the context, and a question
+        comparing the company with them is answered from that list without Google Search.
+        API errors are raised.
+        """
+        static_context = chat_context.build_static_context(company_name, metadata, insights, news, peers)
+        chat_key = chat_context.chat_cache_key(company_name, question, static_context, chat_history)
+        cached_answer = self.chat_cache.get(chat_key)
+        if cached_answer is not None:
+            logger.info(f"💬 Chat cache hit for key: {chat_key}")
+            return cached_answer
+
+        # Self-contained questions can also reuse the answer to a differently worded one
+        follow_up = chat_context.is_follow_up(question, chat_history)
+        digest = chat_context.context_digest(static_context)
+        if not follow_up:
+            for similar_key in self.semantic_cache.candidates(company_name, question, digest):
+                cached_answer = self.chat_cache.get(similar_key)
+                if cached_answer is not None:
+                    self.semantic_cache.record_hit()
+                    return cached_answer
+
+        client = self.scheduled_client(PRIORITY_INTERACTIVE)
+        # The peers are already in the dataset, so a comparison needs no web search; a context
+        # cache carries the search tool, so these prompts are always sent inline
+        local_answer = bool(peers) and chat_context.is_peer_question(question)
+        cached_content = None
+        if self.context_cache is not None and not local_answer:
+            cached_content = self.context_cache.get_or_create(
+                client, company_name, INSIGHTS_MODEL, static_context, system_instruction=CONCISE_INSTRUCTION
+            )
+
+        prompt = chat_context.build_chat_prompt(
+            company_name,
+            question,
+            chat_history,
+            summary_state,
+            metadata=metadata,
+            insights=insights,
+            news=news,
+            cached_context=cached_content is not None,
+            token_budget=self.chat_token_budget,
+            peers=peers,
+        )
+        logger.info(f"🧮 Chat prompt ~{chat_context.estimate_tokens(prompt)} tokens (context cache: {cached_content or 'none'})")
+
+        options = dict(system_instruction=CONCISE_INSTRUCTION, clean=True, on_text=on_text, search=not local_answer)
+        if cached_content:
+            options = dict(clean=True, on_text=on_text, cached_content=cached_content)
+        try:
+            response = ai_service.SINGLE_FLIGHT.do(
+                make_cache_key("", INSIGHTS_MODEL, prompt), ai_service.generate_grounded_text,
+                client, INSIGHTS_MODEL, prompt, **options
+            )
+        except Exception:
+            if cached_content:
+                # The cache may have been deleted or expired server-side; inline the context next turn
+                self.context_cache.forget(company_name)
+            raise
+
+        if response:
+            self.chat_cache.set(chat_key, response, company_name)
+            if not follow_up:
+                self.semantic_cache.add(company_name, question, digest, chat_key)
+        return response
+
+    def add_reload_listener(self, listener: Callable[[Dict], None]):
+        """Call listener with the summary of every dataset reload (e.g. to clear per-session caches)"""
+        self._reload_listeners.append(listener)
+
+    def apply_dataset(self, new_df: pd.DataFrame) -> Dict:
+        """Swap in an edited investor list, re-indexing and invalidating only the rows that changed
+
+        Rows are matched by company name (see dataset_reload). Readers keep using the previous
+        DataFrame and indexes until the new ones are published together. Returns a summary
+        with the changed, added and removed row counts and the affected company names.
+        """
+        with self._reload_lock:
+            started = time.perf_counter()
+            old_df = self.df
+            if list(new_df.columns) != list(old_df.columns):
+                logger.warning("⚠️ Investor CSV columns changed; restart the app to load it")
+                return {'version': self.dataset_version, 'changed': 0, 'added': 0, 'removed': 0, 'companies': []}
+
+            diff = dataset_reload.diff_datasets(old_df, new_df, self.removed_rows, self._row_hashes)
+            # Kept for the next reload, so only the incoming file is hashed each time
+            self._row_hashes = np.concatenate([
+                self._row_hashes if self._row_hashes is not None else dataset_reload.row_hashes(old_df),
+                diff['new_hashes'],
+            ])[dataset_reload.merge_order(len(old_df), diff)]
+            changed, removed = diff['changed_rows'], diff['removed_rows']
+            added = np.arange(len(old_df), len(old_df) + len(diff['added_new_rows']))
+            if not (len(changed) or len(added) or len(removed)):
+                return {'version': self.dataset_version, 'changed': 0, 'added': 0, 'removed': 0, 'companies': []}
+
+            df = dataset_reload.merge_datasets(old_df, new_df, diff)
+            removed_rows = self.removed_rows | {int(row_id) for row_id in removed}
+            rows_out = np.concatenate([changed, removed])
+            rows_in = np.concatenate([changed, added])
+
+            # Suggestions hold names, not rows: a name goes once no remaining row carries it
+            affected_names = set(get_all_company_names(old_df.iloc[rows_out])) | set(get_all_company_names(df.iloc[rows_in]))
+            carrying = np.zeros(len(df), dtype=bool)
+            for column in NAME_COLUMNS:
+                if column in df.columns:
+                    carrying |= df[column].isin(affected_names).to_numpy()
+            carrying[list(removed_rows)] = False
+            remaining = set(get_all_company_names(df[carrying]))
+
+            with self._index_lock:
+                search_index = self._search_index.updated(old_df, df, rows_out, rows_in) if self._search_index else None
+                alias_index = self._alias_index.updated(old_df, df, rows_out, rows_in) if self._alias_index else None
+                suggestion_index = (self._suggestion_index.updated(affected_names - remaining, remaining)
+                                    if self._suggestion_index else None)
+                self.df = df
+                self.removed_rows = removed_rows
+                self._search_index = search_index
+                self._alias_index = alias_index
+                self._suggestion_index = suggestion_index
+                # Rebuilt from the new rows on next use; it is all vectorized and takes milliseconds
+                self._facet_index = None
+                rebuild_peers = self._peer_index is not None
+                self._peer_index = None
+                self.dataset_version += 1
+
+            # Insights and news are generated per company name, so only these need regenerating
+            companies = sorted(set(old_df['Investors'].iloc[np.concatenate([changed, removed])].dropna()))
+            for company_name in companies:
+                self.invalidate_company(company_name)
+            summary = {'version': self.dataset_version, 'changed': len(changed), 'added': len(added),
+                       'removed': len(removed), 'companies': companies}
+            elapsed = time.perf_counter() - started
+            metrics.observe('investor_data_reload_seconds', elapsed)
+            logger.info(f"🔄 Investor data v{self.dataset_version} in {elapsed:.2f}s: {len(changed)} changed, "
+                        f"{len(added)} added, {len(removed)} removed ({len(df) - len(removed_rows)} investors)")
+
+        if rebuild_peers:
+            self.warm_peer_index()
+        for listener in self._reload_listeners:
+            try:
+                listener(summary)
+            except Exception as e:
+                logger.error(f"❌ Reload listener failed: {str(e)}")
+        return summary
+
+    def invalidate_company(self, company_name: str):
+        """Drop every shared cached response for a company so the next request regenerates it"""
+        self.response_cache.invalidate_company(company_name)
+        self.chat_cache.invalidate_company(company_name)
+        self.semantic_cache.invalidate_company(company_name)
+        if self.context_cache is not None:
+            self.context_cache.forget(company_name)
+
+
+def create_chat_cache() -> ResponseCache:
+    """LRU of ARIA answers configured from CHAT_CACHE_MAX_ENTRIES / CHAT_CACHE_TTL_SECONDS"""
+    return ResponseCache(
+        max_entries=int(os.getenv('CHAT_CACHE_MAX_ENTRIES', DEFAULT_CHAT_CACHE_MAX_ENTRIES)),
+        ttl_seconds=float(os.getenv('CHAT_CACHE_TTL_SECONDS', DEFAULT_CHAT_CACHE_TTL_SECONDS)),
+        name='chat',
+    )
+
+
+def create_investor_service(df: pd.DataFrame = None, client=None) -> InvestorService:
+    """Service over INVESTOR_CSV_PATH with caches and scheduler configured from the environment
+
+    Without a client one is created from GOOGLE_API_KEY / GEMINI_API_KEY when a key is set.
+    """
+    if df is None:
+        df = load_investor_dataset(os.getenv('INVESTOR_CSV_PATH', DEFAULT_CSV_PATH))
+    if client is None and ai_service.get_api_key():
+        client = ai_service.create_client(pool_size=int(os.getenv('GEMINI_POOL_SIZE', 20)))
+    return InvestorService(
+        df,
+        client=client,
+        context_cache=chat_context.create_context_cache(),
+        chat_token_budget=int(os.getenv('CHAT_PROMPT_TOKEN_BUDGET', chat_context.DEFAULT_TOKEN_BUDGET)),
+    )
@@ -0,0 +1,147 @@
+"""Pooled, concurrent and cached link previews for news and source URLs"""
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+
+import metrics
+from response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+DEFAULT_TIMEOUT = 5
+DEFAULT_MAX_BYTES = 64 * 1024
+DEFAULT_WORKERS = 8
+PREVIEW_TTL_SECONDS = 24 * 60 * 60
+FAILURE_TTL_SECONDS = 10 * 60
+
+# Only <title> and <meta> tags are needed for a preview
+HEAD_TAGS = SoupStrainer(['title', 'meta'])
+
+# http(s) URLs in markdown, whether link targets or bare; stops at whitespace, quotes and closing brackets
+URL_PATTERN = re.compile(r"https?://[^\s<>()\[\]\"']+")
+
+
+def get_domain(url: str) -> str:
+    """Domain without the www. prefix, or "unknown" if the URL cannot be parsed"""
+    try:
+        return urlparse(url).netloc.replace('www.', '') if url else "unknown"
+    except Exception:
+        return "unknown"
+
+
+def extract_urls(text: str) -> List[str]:
+    """Unique article URLs in a markdown text, in order of first appearance"""
+    urls = (url.rstrip('.,;:*') for url in URL_PATTERN.findall(text or ''))
+    return list(dict.fromkeys(url for url in urls if 'vertexaisearch.cloud.google.com' not in url))
+
+
+def parse_preview(html: bytes, url: str, encoding: str = None) -> Dict[str, str]:
+    """Extract title and description from the <head> of a page"""
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=HEAD_TAGS, from_encoding=encoding)
+
+    title = soup.find('title')
+    title_text = title.get_text().strip() if title else ""
+    if not title_text:
+        og_title = soup.find('meta', attrs={'property': 'og:title'})
+        title_text = og_title.get('content', '').strip() if og_title else ""
+
+    description = soup.find('meta', attrs={'name': 'description'}) or soup.find('meta', attrs={'property': 'og:description'})
+
+    return {
+        'title': title_text or "No title available",
+        'description': description.get('content', '').strip() if description else "No description available",
+        'domain': get_domain(url)
+    }
+
+
+class LinkPreviewer:
+    """Fetches previews over one pooled HTTP session, reading at most max_bytes of each page"""
+
+    def __init__(self, cache: ResponseCache = None, session: requests.Session = None,
+                 max_workers: int = DEFAULT_WORKERS, timeout: float = DEFAULT_TIMEOUT,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache = cache if cache is not None else ResponseCache(max_entries=1000, ttl_seconds=PREVIEW_TTL_SECONDS, name='link_preview')
+        self.session = session or self._create_session(max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preview")
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def _create_session(pool_size: int) -> requests.Session:
+        """Keep-alive session whose connection pool matches the worker count"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['User-Agent'] = USER_AGENT
+        return session
+
+    def get(self, url: str) -> Dict[str, str]:
+        """Preview one URL, serving repeated (including failed) lookups from the cache"""
+        if not url or 'vertexaisearch.cloud.google.com' in url:
+            return {
+                'title': "Invalid link",
+                'description': "Unable to preview this link",
+                'domain': "unknown"
+            }
+
+        cache_key = f"preview|{url}"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
+
+        try:
+            preview = self._fetch(url)
+            ttl_seconds = None
+        except Exception as e:
+            logger.info(f"🔗 Link preview failed for {url}: {str(e)}")
+            preview = {
+                'title': "Link preview unavailable",
+                'description': f"Could not fetch preview: {str(e)[:50]}",
+                'domain': get_domain(url)
+            }
+            ttl_seconds = FAILURE_TTL_SECONDS
+
+        self.cache.set(cache_key, json.dumps(preview), ttl_seconds=ttl_seconds)
+        return preview
+
+    def get_many(self, urls: List[str]) -> Dict[str, Dict[str, str]]:
+        """Preview many URLs concurrently; the result keeps the order of the input"""
+        unique_urls = list(dict.fromkeys(urls))
+        previews = self.executor.map(self.get, unique_urls)
+        return dict(zip(unique_urls, previews))
+
+    @metrics.timed('link_preview_fetch_seconds')
+    def _fetch(self, url: str) -> Dict[str, str]:
+        """Download only the <head> of a page (bounded by max_bytes) and parse it"""
+        with self.session.get(url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            html = self._read_head(response)
+            encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '') else None
+        return parse_preview(html, url, encoding)
+
+    def _read_head(self, response: requests.Response) -> bytes:
+        """Read the body until </head> appears or the byte cap is reached"""
+        data = bytearray()
+        for chunk in response.iter_content(chunk_size=8192):
+            search_from = max(0, len(data) - len(b'</head>'))
+            data.extend(chunk)
+            if bytes(data[search_from:]).lower().find(b'</head>') != -1 or len(data) >= self.max_bytes:
+                break
+        return bytes(data[:self.max_bytes])
+
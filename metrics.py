@@ -0,0 +1,313 @@
+"""Lightweight counters, histograms and timers for the request path
+
+Disabled unless METRICS_ENABLED=1; when disabled every call returns immediately, so
+instrumented code pays one attribute check. When enabled, metrics can be exported as:
+
+- a Prometheus text file (METRICS_FILE), rewritten every METRICS_INTERVAL_SECONDS, for the
+  node_exporter textfile collector or any scraper that can read a file, and
+- a structured JSON log line per timed event (METRICS_JSON_LOG=1) on the "metrics.events" logger.
+
+    with metrics.timer('gemini_request_seconds', model=model) as timing:
+        ...
+        timing.labels['status'] = 'ok'
+"""
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+event_logger = logging.getLogger('metrics.events')
+
+# Seconds; covers cache hits (milliseconds) through slow grounded Pro calls (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+# Token counts per Gemini call
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+DEFAULT_INTERVAL_SECONDS = 15
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{name}="{escape_label(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class _Histogram:
+    """Cumulative-bucket histogram for one label set"""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, bucket_count: int):
+        self.counts = [0] * (bucket_count + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Thread-safe in-process store of counters, histograms and callback gauges"""
+
+    def __init__(self, enabled: bool = False, json_log: bool = False):
+        self.enabled = enabled
+        self.json_log = json_log
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._help: Dict[str, str] = {}
+        self._gauges: Dict[str, Callable[[], Iterable[Tuple[Dict, float]]]] = {}
+
+    def describe(self, name: str, help_text: str, buckets: Tuple[float, ...] = None):
+        """Set the HELP text (and histogram buckets) of a metric"""
+        with self._lock:
+            self._help[name] = help_text
+            if buckets is not None:
+                self._buckets[name] = tuple(buckets)
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        key = label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one histogram observation"""
+        if not self.enabled:
+            return
+        key = label_key(labels)
+        with self._lock:
+            buckets = self._buckets.setdefault(name, DEFAULT_BUCKETS)
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(buckets))
+            histogram.counts[bisect.bisect_left(buckets, value)] += 1
+            histogram.sum += value
+            histogram.count += 1
+        if self.json_log:
+            event_logger.info(json.dumps({'ts': round(time.time(), 3), 'metric': name, 'value': round(value, 6), **labels}))
+
+    def gauge(self, name: str, fn: Callable[[], Iterable[Tuple[Dict, float]]], help_text: str = None):
+        """Register a gauge read at export time; fn returns (labels, value) pairs"""
+        with self._lock:
+            self._gauges[name] = fn
+            if help_text:
+                self._help[name] = help_text
+
+    def timer(self, name: str, **labels) -> "Timer":
+        """Context manager observing its wall time in seconds into a histogram"""
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name, labels)
+
+    def quantile(self, name: str, q: float, **labels) -> Optional[float]:
+        """Bucket upper bound at quantile q, summed over series matching the labels"""
+        wanted = set(label_key(labels))
+        with self._lock:
+            buckets = self._buckets.get(name, DEFAULT_BUCKETS)
+            totals = [0] * (len(buckets) + 1)
+            for key, histogram in self._histograms.get(name, {}).items():
+                if wanted <= set(key):
+                    totals = [a + b for a, b in zip(totals, histogram.counts)]
+        count = sum(totals)
+        if not count:
+            return None
+        running = 0
+        for bound, bucket_count in zip(list(buckets) + [float('inf')], totals):
+            running += bucket_count
+            if running >= q * count:
+                return bound
+        return float('inf')
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {key: (list(h.counts), h.sum, h.count) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+            buckets = dict(self._buckets)
+            help_texts = dict(self._help)
+            gauges = dict(self._gauges)
+
+        for name in sorted(counters):
+            self._header(lines, name, 'counter', help_texts)
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{format_labels(key)} {value:g}")
+
+        for name in sorted(histograms):
+            self._header(lines, name, 'histogram', help_texts)
+            bounds = [f"{bound:g}" for bound in buckets.get(name, DEFAULT_BUCKETS)] + ["+Inf"]
+            for key, (counts, total, count) in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, bucket_count in zip(bounds, counts):
+                    cumulative += bucket_count
+                    le_label = 'le="' + bound + '"'
+                    lines.append(f"{name}_bucket{format_labels(key, le_label)} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(key)} {total:.6f}")
+                lines.append(f"{name}_count{format_labels(key)} {count}")
+
+        for name in sorted(gauges):
+            try:
+                samples = list(gauges[name]())
+            except Exception as e:
+                logger.warning(f"⚠️ Gauge {name} failed: {str(e)}")
+                continue
+            self._header(lines, name, 'gauge', help_texts)
+            for labels, value in samples:
+                lines.append(f"{name}{format_labels(label_key(labels))} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _header(lines: List[str], name: str, kind: str, help_texts: Dict[str, str]):
+        if name in help_texts:
+            lines.append(f"# HELP {name} {help_texts[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def write_prometheus_file(self, path: str):
+        """Atomically replace path with the current metrics"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        """Drop every recorded value (gauges and descriptions are kept)"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+class Timer:
+    """Times a block; labels may be added inside the block (e.g. status)"""
+
+    __slots__ = ('registry', 'name', 'labels', 'started', 'elapsed')
+
+    def __init__(self, registry: MetricsRegistry, name: str, labels: Dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.started
+        self.labels.setdefault('status', 'error' if exc_type is not None else 'ok')
+        self.registry.observe(self.name, self.elapsed, **self.labels)
+        return False
+
+
+def timed(name: str, **labels):
+    """Decorator form of timer for whole functions"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return fn(*args, **kwargs)
+            with Timer(REGISTRY, name, dict(labels)):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _NullTimer:
+    """Shared no-op timer used while metrics are disabled"""
+
+    elapsed = 0.0
+
+    @property
+    def labels(self) -> Dict:
+        # A fresh dict each time, so callers tagging a result cannot change the shared timer
+        return {}
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+# The process-wide registry used by every module
+REGISTRY = MetricsRegistry()
+
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+gauge = REGISTRY.gauge
+describe = REGISTRY.describe
+
+
+def configure_from_env() -> MetricsRegistry:
+    """Enable metrics per METRICS_ENABLED / METRICS_JSON_LOG and start the file exporter if configured"""
+    REGISTRY.enabled = os.getenv('METRICS_ENABLED', '0').lower() in ('1', 'true', 'yes')
+    REGISTRY.json_log = REGISTRY.enabled and os.getenv('METRICS_JSON_LOG', '0').lower() in ('1', 'true', 'yes')
+    path = os.getenv('METRICS_FILE')
+    if REGISTRY.enabled and path:
+        start_file_exporter(path, float(os.getenv('METRICS_INTERVAL_SECONDS', DEFAULT_INTERVAL_SECONDS)))
+    return REGISTRY
+
+
+_exporter_lock = threading.Lock()
+_exporters: Dict[str, threading.Thread] = {}
+
+
+def start_file_exporter(path: str, interval_seconds: float = DEFAULT_INTERVAL_SECONDS) -> threading.Thread:
+    """Rewrite the Prometheus file every interval from a daemon thread (once per path)"""
+    with _exporter_lock:
+        thread = _exporters.get(path)
+        if thread is not None and thread.is_alive():
+            return thread
+
+        def run():
+            while True:
+                try:
+                    REGISTRY.write_prometheus_file(path)
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not write metrics to {path}: {str(e)}")
+                time.sleep(interval_seconds)
+
+        thread = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+        thread.start()
+        _exporters[path] = thread
+        logger.info(f"📈 Writing metrics to {path} every {interval_seconds:g}s")
+        return thread
+
+
+describe('gemini_request_seconds', "Gemini call duration by model, mode and status")
+describe('gemini_time_to_first_token_seconds', "Time until the first streamed chunk by model")
+describe('gemini_tokens', "Tokens per Gemini call by model and kind", buckets=TOKEN_BUCKETS)
+describe('gemini_queue_wait_seconds', "Time waiting for the Gemini scheduler by model and priority")
+describe('cache_requests_total', "Cache lookups by cache and result (hit/miss)")
+describe('investor_data_load_seconds', "Investor dataset load time by source")
+describe('search_seconds', "Search and suggestion latency by kind")
+describe('link_preview_fetch_seconds', "Link preview download and parse time by status")
+describe('page_render_seconds', "Streamlit script run time by page")
@@ -0,0 +1,158 @@
+"""Local "investors like this one" from metrics and descriptions
+
+PeerIndex turns every investor into one float32 row. The first columns are the log-scaled,
+standardized AUM, Investments, Exits, Active Portfolio and Dry Powder. The rest are a TF-IDF
+vector of the Description's words and word pairs, L2-normalized. Once the vocabulary is larger
+than TEXT_DIMENSIONS, terms are hashed into that many signed columns. The nearest investors
+are the closest rows by Euclidean distance, so a lookup is one matrix-vector product and a
+partial sort, with no Gemini call.
+
+Like the other indexes it is never modified once built; InvestorService builds a new one
+after a dataset reload.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+NUMERIC_COLUMNS = ['AUM', 'Investments', 'Exits', 'Active Portfolio', 'Dry Powder']
+TEXT_COLUMN = 'Description'
+
+# Columns of the hashed description vector (float32, so 100k investors take about 50 MB)
+TEXT_DIMENSIONS = 128
+# Weight of the metrics against the description: 1.0 makes an average pair of investors
+# about as far apart in metrics as in wording
+NUMERIC_WEIGHT = 1.0
+DEFAULT_PEERS = 5
+# Peer lists kept per index; a details page asks for the same one on every rerun
+PEER_CACHE_SIZE = 1024
+
+TOKEN_PATTERN = r"[a-z][a-z0-9&'-]+"
+STOPWORDS = {
+    'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'in', 'is', 'it', 'its',
+    'of', 'on', 'or', 'that', 'the', 'their', 'this', 'to', 'was', 'which', 'with',
+}
+
+
+def numeric_features(df: pd.DataFrame, columns: List[str] = None) -> np.ndarray:
+    """Log-scaled metrics standardized per column; missing values sit at the column mean (0)"""
+    columns = [column for column in (columns or NUMERIC_COLUMNS) if column in df.columns]
+    features = np.zeros((len(df), len(columns)), dtype=np.float32)
+    for i, column in enumerate(columns):
+        values = np.log1p(np.clip(df[column].to_numpy(dtype='float64', na_value=np.nan), 0, None))
+        present = ~np.isnan(values)
+        if not present.any():
+            continue
+        std = values[present].std()
+        values = (values - values[present].mean()) / (std if std > 0 else 1.0)
+        features[:, i] = np.where(present, values, 0.0)
+    return features
+
+
+def description_terms(descriptions: pd.Series) -> (np.ndarray, np.ndarray):
+    """(row position, term id) of every word and adjacent word pair, stopwords dropped"""
+    text = descriptions.reset_index(drop=True).fillna('').astype(str).str.lower()
+    words = text.str.findall(TOKEN_PATTERN).explode().dropna()
+    words = words[~words.isin(STOPWORDS)]
+    rows = words.index.to_numpy(dtype=np.int64)
+    word_ids, vocabulary = pd.factorize(words.to_numpy())
+    word_ids = word_ids.astype(np.int64)
+
+    # Pairs of consecutive words within one description, as one integer each
+    same_row = rows[1:] == rows[:-1]
+    pair_keys = word_ids[:-1][same_row] * len(vocabulary) + word_ids[1:][same_row]
+    pair_ids = len(vocabulary) + pd.factorize(pair_keys)[0]
+    return (np.concatenate([rows, rows[:-1][same_row]]),
+            np.concatenate([word_ids, pair_ids]).astype(np.int64))
+
+
+def text_features(descriptions: pd.Series, dimensions: int = TEXT_DIMENSIONS) -> np.ndarray:
+    """L2-normalized TF-IDF of each description, hashed into at most `dimensions` columns"""
+    num_rows = len(descriptions)
+    rows, terms = description_terms(descriptions)
+    if not len(terms):
+        return np.zeros((num_rows, 0), dtype=np.float32)
+
+    # Term frequency per (row, term), then the number of rows each term appears in
+    width = terms.max() + 1
+    pairs, tf = np.unique(rows * width + terms, return_counts=True)
+    rows, terms = pairs // width, pairs % width
+    document_frequency = np.bincount(terms)
+    # A term in one description cannot make two investors alike
+    shared = document_frequency[terms] > 1
+    rows, terms, tf = rows[shared], terms[shared], tf[shared]
+    kept_terms, terms = np.unique(terms, return_inverse=True)
+    if not len(kept_terms):
+        return np.zeros((num_rows, 0), dtype=np.float32)
+    idf = np.log((1 + num_rows) / (1 + document_frequency[kept_terms])) + 1
+    weights = (1 + np.log(tf)) * idf[terms]
+
+    if len(kept_terms) <= dimensions:
+        columns, signs = terms, 1.0
+        dimensions = len(kept_terms)
+    else:
+        # Signed feature hashing keeps dot products unbiased despite collisions
+        rng = np.random.default_rng(0)
+        buckets = rng.integers(0, dimensions, len(kept_terms))
+        bucket_signs = rng.choice(np.array([-1.0, 1.0]), len(kept_terms))
+        columns, signs = buckets[terms], bucket_signs[terms]
+    features = np.zeros((num_rows, dimensions), dtype=np.float32)
+    np.add.at(features, (rows, columns), (weights * signs).astype(np.float32))
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / np.where(norms > 0, norms, 1.0)
+
+
+class PeerIndex:
+    """Metric and description vectors for every investor, for nearest-neighbour lookups"""
+
+    def __init__(self, df: pd.DataFrame, removed_rows: Iterable[int] = (),
+                 text_dimensions: int = TEXT_DIMENSIONS, numeric_weight: float = NUMERIC_WEIGHT):
+        self.num_rows = len(df)
+        self.live = np.ones(self.num_rows, dtype=bool)
+        self.live[list(removed_rows)] = False
+        numeric = numeric_features(df)
+        if numeric.shape[1]:
+            numeric *= numeric_weight / np.sqrt(numeric.shape[1])
+        text = (text_features(df[TEXT_COLUMN], text_dimensions) if TEXT_COLUMN in df.columns
+                else np.zeros((self.num_rows, 0), dtype=np.float32))
+        self.vectors = np.ascontiguousarray(np.hstack([numeric, text]), dtype=np.float32)
+        self.squared_norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+        self._results: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @metrics.timed('search_seconds', kind='peers')
+    def similar(self, row_id: int, limit: int = DEFAULT_PEERS) -> List[Dict]:
+        """Closest listed investors to a row, nearest first, as {'row_id', 'similarity'}
+
+        similarity is 1 / (1 + distance): 1.0 for identical vectors, falling towards 0.
+        """
+        if limit <= 0:
+            return []
+        key = (row_id, limit)
+        with self._lock:
+            peers = self._results.get(key)
+            if peers is not None:
+                self._results.move_to_end(key)
+                return [dict(peer) for peer in peers]
+
+        vector = self.vectors[row_id]
+        distances = self.squared_norms - 2 * (self.vectors @ vector) + self.squared_norms[row_id]
+        distances[~self.live] = np.inf
+        distances[row_id] = np.inf
+        if limit < len(distances):
+            candidates = np.argpartition(distances, limit - 1)[:limit]
+        else:
+            candidates = np.arange(len(distances))
+        candidates = candidates[np.isfinite(distances[candidates])]
+        candidates = candidates[np.lexsort((candidates, distances[candidates]))]
+        peers = [{'row_id': int(peer), 'similarity': round(float(1 / (1 + np.sqrt(max(distances[peer], 0.0)))), 3)}
+                 for peer in candidates]
+        with self._lock:
+            self._results[key] = peers
+            while len(self._results) > PEER_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return [dict(peer) for peer in peers]
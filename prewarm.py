@@ -0,0 +1,145 @@
+"""Pre-generate AI insights and news for every investor so event-day page loads are cache hits
+
+Run before the event (results persist when AI_CACHE_DB_PATH is set):
+
+    python prewarm.py --csv Yogen.csv --workers 4
+
+or set AI_PREWARM=1 to run it in a background thread when the Streamlit app starts.
+Requests run at background priority through the Gemini scheduler, so per-model quotas
+(GEMINI_FLASH_RPM, GEMINI_PRO_RPM) are respected and interactive users go first.
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+import ai_service
+import metrics
+from investor_data import DEFAULT_CSV_PATH, load_investor_dataset, get_investor_names
+from gemini_scheduler import create_gemini_scheduler, PRIORITY_BACKGROUND
+from response_cache import ResponseCache, create_response_cache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+
+
+def build_tasks(company_names: List[str], include_news: bool = True) -> List[Dict]:
+    """One task per (company, section) with the shared-cache key it will fill"""
+    tasks = []
+    for name in company_names:
+        tasks.append({
+            'company': name,
+            'section': 'insights',
+            'key': make_cache_key(name, ai_service.INSIGHTS_MODEL, ai_service.build_company_info_prompt(name)),
+            'generate': ai_service.generate_company_info,
+        })
+        if include_news:
+            tasks.append({
+                'company': name,
+                'section': 'news',
+                'key': make_cache_key(name, ai_service.NEWS_MODEL, ai_service.build_news_prompt(name)),
+                'generate': ai_service.generate_news_articles,
+            })
+    return tasks
+
+
+def prewarm(client, company_names: List[str], cache: ResponseCache, max_workers: int = DEFAULT_WORKERS,
+            include_news: bool = True) -> Dict[str, int]:
+    """Fill the shared cache for every company with bounded concurrency
+    
+    Pass a scheduled client (GeminiScheduler.bind) so requests are rate limited.
+    """
+    tasks = build_tasks(company_names, include_news)
+    if len(tasks) > cache.max_entries:
+        logger.warning(f"⚠️ {len(tasks)} prewarm entries exceed the cache size of {cache.max_entries}; "
+                       "raise AI_CACHE_MAX_ENTRIES to keep them all")
+
+    stats = {'generated': 0, 'cached': 0, 'empty': 0, 'failed': 0}
+    started = time.perf_counter()
+
+    def run(task: Dict) -> str:
+        # Not counted as a lookup: on a miss the generate path below records the one miss
+        if cache.peek(task['key']) is not None:
+            return 'cached'
+        text = task['generate'](client, task['company'], cache)
+        return 'generated' if text else 'empty'
+
+    logger.info(f"🔥 Prewarming {len(tasks)} responses for {len(company_names)} companies")
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prewarm") as executor:
+        futures = {executor.submit(run, task): task for task in tasks}
+        for done, future in enumerate(as_completed(futures), 1):
+            task = futures[future]
+            try:
+                stats[future.result()] += 1
+            except Exception as e:
+                stats['failed'] += 1
+                logger.error(f"❌ Prewarm failed for {task['company']} ({task['section']}): {str(e)}")
+            if done % 10 == 0 or done == len(tasks):
+                logger.info(f"🔥 Prewarm progress {done}/{len(tasks)}: {stats}")
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"✅ Prewarm finished in {elapsed:.1f}s: {stats}")
+    return stats
+
+
+def start_background_prewarm(client, company_names: List[str], cache: ResponseCache,
+                             max_workers: int = DEFAULT_WORKERS) -> threading.Thread:
+    """Run prewarm in a daemon thread so app startup is not blocked"""
+    thread = threading.Thread(
+        target=prewarm,
+        args=(client, company_names, cache),
+        kwargs={'max_workers': max_workers},
+        name="prewarm",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-generate AI insights and news into the shared response cache")
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH, help="Investor CSV in the Yogen.csv schema")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Maximum concurrent Gemini requests")
+    parser.add_argument('--limit', type=int, default=None, help="Only prewarm the first N companies")
+    parser.add_argument('--skip-news', action='store_true', help="Only generate company insights")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+    registry = metrics.configure_from_env()
+
+    if not ai_service.get_api_key():
+        logger.error("❌ Set GOOGLE_API_KEY or GEMINI_API_KEY to prewarm the cache")
+        return 1
+
+    cache = create_response_cache()
+    if cache.db_path is None:
+        logger.warning("⚠️ AI_CACHE_DB_PATH is not set; prewarmed responses will be lost when this process exits")
+
+    company_names = get_investor_names(load_investor_dataset(args.csv))
+    if args.limit is not None:
+        company_names = company_names[:args.limit]
+
+    scheduler = create_gemini_scheduler()
+    stats = prewarm(
+        scheduler.bind(ai_service.create_client(), PRIORITY_BACKGROUND),
+        company_names,
+        cache,
+        max_workers=args.workers,
+        include_news=not args.skip_news,
+    )
+    logger.info(f"🚦 Scheduler stats: {scheduler.stats()}")
+    if registry.enabled and os.getenv('METRICS_FILE'):
+        registry.write_prometheus_file(os.getenv('METRICS_FILE'))
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
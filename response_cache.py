@@ -0,0 +1,223 @@
+"""Process-wide Gemini response cache shared by every session"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+DEFAULT_MAX_ENTRIES = 2000
+# Access times of hits are written to SQLite in one batch at most this often (and on every set)
+ACCESS_FLUSH_SECONDS = 30
+
+
+def make_cache_key(company_name: str, model: str, prompt: str) -> str:
+    """Build a stable cache key from the company, the model and a hash of the prompt"""
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+    return f"{company_name}|{model}|{prompt_hash}"
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache with an optional SQLite backend that survives restarts"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 db_path: Optional[str] = None, name: str = 'responses'):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, Tuple[str, float, str]]" = OrderedDict()  # key -> (value, expires_at, company)
+        self._lock = threading.Lock()
+        self._db = None
+        self._accessed: Dict[str, float] = {}  # key -> last hit not yet written to SQLite
+        self._accessed_flushed_at = time.time()
+        self.hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str):
+        """Open (or create) the SQLite store; fall back to memory-only on failure"""
+        try:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, company TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_company ON responses (company)")
+            self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+            logger.info(f"💾 Response cache persisted to {db_path}")
+        except sqlite3.Error as e:
+            logger.error(f"❌ Could not open response cache database {db_path}: {str(e)}")
+            self._db = None
+
+    def _db_error(self, action: str, error: sqlite3.Error):
+        """Log a failed SQLite call; the in-memory tier keeps serving. Caller must hold the lock"""
+        logger.warning(f"⚠️ Response cache database error while {action}, using memory only: {str(error)}")
+        try:
+            self._db.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _record_access(self, key: str, now: float):
+        """Note a hit for the disk LRU and write pending ones if the last batch is old enough"""
+        if self._db is None:
+            return
+        self._accessed[key] = now
+        if now - self._accessed_flushed_at >= ACCESS_FLUSH_SECONDS:
+            try:
+                self._flush_accessed()
+                self._db.commit()
+            except sqlite3.Error as e:
+                self._db_error("recording access times", e)
+
+    def _flush_accessed(self):
+        """Write pending access times without committing; caller must hold the lock"""
+        self._accessed_flushed_at = time.time()
+        if self._accessed:
+            pending = [(accessed_at, key) for key, accessed_at in self._accessed.items()]
+            self._accessed.clear()
+            self._db.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?", pending)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached value, or None if missing or expired"""
+        with self._lock:
+            value = self._read(key)
+            if value is not None:
+                self.hits += 1
+                metrics.inc('cache_requests_total', cache=self.name, result='hit')
+            else:
+                self.misses += 1
+                metrics.inc('cache_requests_total', cache=self.name, result='miss')
+            return value
+
+    def peek(self, key: str) -> Optional[str]:
+        """Like get, but not counted as a hit or miss (for re-checks by a caller that already looked)"""
+        with self._lock:
+            return self._read(key)
+
+    def _read(self, key: str) -> Optional[str]:
+        """Look a key up in memory, then on disk; caller must hold the lock"""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at, _ = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self._record_access(key, now)
+                return value
+            del self._entries[key]
+
+        if self._db is not None:
+            try:
+                row = self._db.execute(
+                    "SELECT value, company, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, company, expires_at = row
+                    if expires_at > now:
+                        self._remember(key, value, expires_at, company)
+                        self._record_access(key, now)
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+            except sqlite3.Error as e:
+                self._db_error("reading", e)
+        return None
+
+    def set(self, key: str, value: str, company: str = "", ttl_seconds: float = None):
+        """Store a value for the configured (or given) TTL, evicting least recently used entries"""
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._remember(key, value, expires_at, company)
+            if self._db is not None:
+                try:
+                    # Pending access times first, so eviction below sees recent hits
+                    self._accessed.pop(key, None)
+                    self._flush_accessed()
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, company, expires_at, accessed_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (key, value, company, expires_at, now)
+                    )
+                    self._db.execute(
+                        "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                        "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    self._db_error("writing", e)
+
+    def _remember(self, key: str, value: str, expires_at: float, company: str):
+        """Insert into the in-memory LRU; caller must hold the lock"""
+        self._entries[key] = (value, expires_at, company)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, _ = self._entries.popitem(last=False)
+            logger.info(f"🧹 Evicted shared cache entry: {evicted_key}")
+
+    def delete(self, key: str):
+        """Remove a single entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._accessed.pop(key, None)
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    self._db_error("deleting", e)
+
+    def invalidate_company(self, company: str):
+        """Remove every cached response for one company"""
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[2] == company]:
+                del self._entries[key]
+                self._accessed.pop(key, None)
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM responses WHERE company = ?", (company,))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    self._db_error(f"invalidating {company}", e)
+
+    def clear(self):
+        """Drop every entry from memory and disk"""
+        with self._lock:
+            self._entries.clear()
+            self._accessed.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM responses")
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    self._db_error("clearing", e)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def create_response_cache() -> ResponseCache:
+    """Create the shared cache from AI_CACHE_* environment variables"""
+    return ResponseCache(
+        max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+        ttl_seconds=float(os.getenv('AI_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS)),
+        db_path=os.getenv('AI_CACHE_DB_PATH') or None,
+    )
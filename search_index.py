@@ -0,0 +1,335 @@
+"""Precomputed fuzzy search index over the investor list
+
+Indexes are never modified once built: updated() returns a copy with only the changed rows
+re-indexed, so a dataset reload can swap it in while other threads keep searching the old one.
+"""
+import bisect
+import copy
+import numpy as np
+import pandas as pd
+from rapidfuzz import process, fuzz
+from typing import Iterable, List, Dict, Optional, Set, Tuple
+
+import metrics
+
+# Fields searched by fuzzy_search_investors, in tie-break priority order
+SEARCH_FIELDS = ['Investors', 'Name in PEI Event List', 'HQ Location', 'Primary Investor Type']
+
+# Columns that name an investor, in lookup priority order
+NAME_COLUMNS = ['Investors', 'Name in PEI Event List']
+
+# Minimum fuzzy score for a match to be returned
+MIN_SCORE = 60
+
+
+def normalize_text(value) -> str:
+    """Lowercase and collapse whitespace so equivalent values share one index entry"""
+    return " ".join(str(value).lower().split())
+
+
+class SearchIndex:
+    """Unique normalized field values mapped to the row positions that contain them"""
+
+    def __init__(self, df: pd.DataFrame, fields: List[str] = None):
+        self.fields = [field for field in (fields or SEARCH_FIELDS) if field in df.columns]
+        self.num_rows = len(df)
+        self.choices: List[str] = []         # normalized strings scored against the query
+        self.choice_fields: List[str] = []   # field each choice came from
+        self.choice_values: List[str] = []   # original (display) value for each choice
+        self.postings: List[np.ndarray] = []  # row positions for each choice
+        # field -> {choice: position in choices}, built on the first update
+        self._choice_ids: Optional[Dict[str, Dict[str, int]]] = None
+
+        for field in self.fields:
+            self._add_field(df, field)
+
+    def _add_field(self, df: pd.DataFrame, field: str):
+        """Group the rows of one column by normalized value"""
+        series = df[field]
+        mask = series.notna().to_numpy()
+        if not mask.any():
+            return
+
+        positions = np.flatnonzero(mask)
+        raw_values = series[mask].astype(str).tolist()
+        normalized = [normalize_text(value) for value in raw_values]
+
+        codes, uniques = pd.factorize(pd.Series(normalized, dtype=object), sort=False)
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes, minlength=len(uniques))
+        groups = np.split(positions[order], np.cumsum(counts)[:-1])
+        first_seen = order[np.concatenate(([0], np.cumsum(counts)[:-1]))]
+
+        for code, choice in enumerate(uniques):
+            if not choice or choice == '#n/a':
+                continue
+            self.choices.append(choice)
+            self.choice_fields.append(field)
+            self.choice_values.append(raw_values[first_seen[code]])
+            self.postings.append(groups[code])
+
+    def __len__(self) -> int:
+        return len(self.choices)
+
+    def updated(self, old_df: pd.DataFrame, df: pd.DataFrame, rows_out: Iterable[int],
+                rows_in: Iterable[int]) -> "SearchIndex":
+        """Copy with rows_out unindexed (using their old_df values) and rows_in indexed from df
+
+        A changed row is in both. Values left without rows keep an empty posting list, so
+        choice positions never move.
+        """
+        index = copy.copy(self)
+        index.num_rows = len(df)
+        index.choices = list(self.choices)
+        index.choice_fields = list(self.choice_fields)
+        index.choice_values = list(self.choice_values)
+        index.postings = list(self.postings)
+        index._choice_ids = {field: dict(ids) for field, ids in self._get_choice_ids().items()}
+
+        removals: Dict[int, List[int]] = {}
+        additions: Dict[int, List[int]] = {}
+        for field in self.fields:
+            ids = index._choice_ids.setdefault(field, {})
+            for row_id, choice, _ in field_choices(old_df, field, rows_out):
+                if choice in ids:
+                    removals.setdefault(ids[choice], []).append(row_id)
+            for row_id, choice, value in field_choices(df, field, rows_in):
+                if choice not in ids:
+                    ids[choice] = len(index.choices)
+                    index.choices.append(choice)
+                    index.choice_fields.append(field)
+                    index.choice_values.append(value)
+                    index.postings.append(np.array([], dtype=np.int64))
+                additions.setdefault(ids[choice], []).append(row_id)
+
+        for choice_idx in removals.keys() | additions.keys():
+            postings = np.setdiff1d(index.postings[choice_idx], removals.get(choice_idx, []))
+            index.postings[choice_idx] = np.union1d(postings, additions.get(choice_idx, [])).astype(np.int64)
+        return index
+
+    def _get_choice_ids(self) -> Dict[str, Dict[str, int]]:
+        if self._choice_ids is None:
+            self._choice_ids = {}
+            for choice_idx, (field, choice) in enumerate(zip(self.choice_fields, self.choices)):
+                self._choice_ids.setdefault(field, {})[choice] = choice_idx
+        return self._choice_ids
+
+    @metrics.timed('search_seconds', kind='search')
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Score the query against every indexed value in one call and return matching rows"""
+        query = normalize_text(query)
+        if not query or not self.choices:
+            return []
+
+        # One (1 x N) batched scoring pass across all fields; cdist zeroes scores below the cutoff
+        scores = process.cdist(
+            [query],
+            self.choices,
+            scorer=fuzz.partial_ratio,
+            processor=None,
+            score_cutoff=MIN_SCORE,
+            dtype=np.float32,
+            workers=-1,
+        )[0]
+        candidates = np.flatnonzero(scores > MIN_SCORE)
+        ranked = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        results = []
+        seen_rows = set()
+        for choice_idx in ranked:
+            score = float(scores[choice_idx])
+            for row_id in self.postings[choice_idx]:
+                row_id = int(row_id)
+                if row_id in seen_rows:
+                    continue
+                seen_rows.add(row_id)
+                results.append({
+                    'row_id': row_id,
+                    'score': score,
+                    'matched_field': self.choice_fields[choice_idx],
+                    'matched_value': self.choice_values[choice_idx]
+                })
+                if len(results) >= limit:
+                    return results
+
+        return results
+
+
+def field_choices(df: pd.DataFrame, field: str, rows: Iterable[int]) -> List[Tuple[int, str, str]]:
+    """(row, normalized value, value) for the indexable values of one field in some rows"""
+    if field not in df.columns:
+        return []
+    series = df[field]
+    entries = []
+    for row_id in rows:
+        value = series.iat[row_id]
+        if pd.isna(value):
+            continue
+        choice = normalize_text(value)
+        if choice and choice != '#n/a':
+            entries.append((int(row_id), choice, str(value)))
+    return entries
+
+
+class SuggestionIndex:
+    """Lowercased company names held as a NumPy array for vectorized typeahead matching"""
+
+    def __init__(self, company_names: List[str]):
+        self.names = list(company_names)
+        self.lowered_list = [name.lower() for name in self.names]
+        self.lowered = np.array(self.lowered_list, dtype=str)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def updated(self, removed_names: Iterable[str], added_names: Iterable[str]) -> "SuggestionIndex":
+        """Copy with some names dropped and others inserted in sorted position
+
+        Assumes the names are sorted, as get_all_company_names returns them.
+        """
+        names = list(self.names)
+        lowered_list = list(self.lowered_list)
+        for name in set(removed_names):
+            position = bisect.bisect_left(names, name)
+            if position < len(names) and names[position] == name:
+                del names[position]
+                del lowered_list[position]
+        for name in sorted(set(added_names)):
+            position = bisect.bisect_left(names, name)
+            if position == len(names) or names[position] != name:
+                names.insert(position, name)
+                lowered_list.insert(position, name.lower())
+
+        index = copy.copy(self)
+        index.names = names
+        index.lowered_list = lowered_list
+        index.lowered = np.array(lowered_list, dtype=str)
+        return index
+
+    @metrics.timed('search_seconds', kind='suggest')
+    def suggest(self, query: str, limit: int = 10) -> List[str]:
+        """Substring matches first (in list order), then fuzzy matches to fill up to limit"""
+        query = query.lower()
+        if not query or not self.names:
+            return []
+
+        # Vectorized substring prefilter instead of a Python loop over every name
+        substring_hits = np.flatnonzero(np.char.find(self.lowered, query) >= 0)
+        suggestions = [self.names[i] for i in substring_hits[:limit]]
+        if len(suggestions) >= limit:
+            return suggestions
+
+        scores = process.cdist(
+            [query],
+            self.lowered_list,
+            scorer=fuzz.partial_ratio,
+            processor=None,
+            score_cutoff=MIN_SCORE,
+            dtype=np.float32,
+            workers=-1,
+        )[0]
+        scores[substring_hits] = 0
+        candidates = np.flatnonzero(scores > MIN_SCORE)
+        ranked = candidates[np.argsort(-scores[candidates], kind='stable')]
+        suggestions.extend(self.names[i] for i in ranked[:limit - len(suggestions)])
+
+        return suggestions
+
+
+class AliasIndex:
+    """Case-insensitive map from either investor name column to the row id (position) of the investor"""
+
+    def __init__(self, df: pd.DataFrame, columns: List[str] = None):
+        self.columns = [column for column in (columns or NAME_COLUMNS) if column in df.columns]
+        self.row_ids: Dict[str, int] = {}
+        # Other rows claiming an alias, so removing the winner can promote the next one
+        self.shadowed: Dict[str, List[int]] = {}
+        for column in self.columns:
+            series = df[column]
+            for row_id in np.flatnonzero(series.notna().to_numpy()):
+                alias = normalize_text(series.iat[row_id])
+                # Earlier columns win, so an Investors name is never shadowed by a PEI alias
+                if alias and alias != '#n/a':
+                    winner = self.row_ids.setdefault(alias, int(row_id))
+                    if winner != row_id:
+                        self._shadow(alias, int(row_id))
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def updated(self, old_df: pd.DataFrame, df: pd.DataFrame, rows_out: Iterable[int],
+                rows_in: Iterable[int]) -> "AliasIndex":
+        """Copy with rows_out's old_df aliases released and rows_in's df aliases claimed
+
+        Ties are resolved as when building from scratch: earlier column, then lower row id.
+        """
+        index = copy.copy(self)
+        index.row_ids = dict(self.row_ids)
+        index.shadowed = {alias: list(rows) for alias, rows in self.shadowed.items()}
+        leaving = {int(row_id) for row_id in rows_out}
+        for row_id in leaving:
+            for _, alias in row_aliases(old_df, row_id, self.columns):
+                index._release(alias, row_id, df, leaving)
+        for row_id in rows_in:
+            for rank, alias in row_aliases(df, int(row_id), self.columns):
+                index._claim(alias, int(row_id), rank, df)
+        return index
+
+    def _shadow(self, alias: str, row_id: int):
+        rows = self.shadowed.setdefault(alias, [])
+        if row_id not in rows:
+            rows.append(row_id)
+
+    def _priority(self, alias: str, row_id: int, df: pd.DataFrame) -> Tuple[int, int]:
+        rank = next(rank for rank, row_alias in row_aliases(df, row_id, self.columns) if row_alias == alias)
+        return rank, row_id
+
+    def _release(self, alias: str, row_id: int, df: pd.DataFrame, leaving: Set[int]):
+        rows = self.shadowed.get(alias, [])
+        if row_id in rows:
+            rows.remove(row_id)
+        if self.row_ids.get(alias) == row_id:
+            del self.row_ids[alias]
+            # Rows that are also leaving are re-claimed from their new values afterwards
+            candidates = [row for row in rows if row not in leaving]
+            if candidates:
+                winner = min(candidates, key=lambda row: self._priority(alias, row, df))
+                rows.remove(winner)
+                self.row_ids[alias] = winner
+        if not rows:
+            self.shadowed.pop(alias, None)
+
+    def _claim(self, alias: str, row_id: int, rank: int, df: pd.DataFrame):
+        winner = self.row_ids.get(alias)
+        if winner is None:
+            self.row_ids[alias] = row_id
+        elif winner != row_id:
+            if (rank, row_id) < self._priority(alias, winner, df):
+                self.row_ids[alias] = row_id
+                self._shadow(alias, winner)
+            else:
+                self._shadow(alias, row_id)
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Row id for a company name from either column, or None"""
+        if not name:
+            return None
+        return self.row_ids.get(normalize_text(name))
+
+
+def row_aliases(df: pd.DataFrame, row_id: int, columns: List[str]) -> List[Tuple[int, str]]:
+    """(column rank, alias) for each name column of one row"""
+    aliases = []
+    for rank, column in enumerate(columns):
+        value = df[column].iat[row_id]
+        if pd.isna(value):
+            continue
+        alias = normalize_text(value)
+        if alias and alias != '#n/a':
+            aliases.append((rank, alias))
+    return aliases
+
+
+def build_search_index(df: pd.DataFrame) -> SearchIndex:
+    """Build the search index for a freshly loaded investor DataFrame"""
+    return SearchIndex(df)
@@ -0,0 +1,205 @@
+"""Per-company semantic FAQ cache for ARIA chat questions
+
+Attendees ask the same few questions with different wording ("What's their strategy?",
+"what is their investment strategy"). Each stored question is turned into a hashed
+character n-gram TF-IDF vector held in a per-company NumPy matrix. A new question whose
+cosine similarity to a stored one reaches the threshold reuses that question's cached
+answer, but only if both ask about the same things: n-grams barely move when one year or
+country code changes ("deals in 2023" vs "in 2024", "the US" vs "the UK"), so a stored
+question whose content words or numbers differ is never reused. The cache stores only the chat cache keys; the answers themselves (and their TTL)
+stay in the chat ResponseCache.
+"""
+import logging
+import os
+import threading
+import zlib
+from typing import Dict, List
+
+import numpy as np
+
+from chat_context import keywords, normalize_question
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_MAX_PER_COMPANY = 200
+
+# Hashed feature space for character n-grams and whole words
+DIMENSIONS = 2 ** 12
+NGRAM_SIZES = (3, 4)
+
+# Best-match similarities are counted in these buckets for the stats
+HISTOGRAM_EDGES = np.linspace(0.0, 1.0, 11)
+
+# Typical phrasings counted into the document frequencies up front, so question boilerplate
+# ("what is their", "tell me about") carries little weight before real questions accumulate
+SEED_QUESTIONS = [
+    "What is their investment strategy?",
+    "What sectors do they focus on?",
+    "Who are the founders?",
+    "What are their recent deals?",
+    "How big is their fund?",
+    "Where are they headquartered?",
+    "Tell me about their portfolio companies",
+    "How do they compare to their peers?",
+    "What is their typical check size?",
+    "Do they invest in early stage companies?",
+    "What is the latest news about them?",
+    "Can you tell me more about this firm?",
+]
+
+# Log a stats line every this many lookups
+LOG_EVERY = 50
+
+
+def vectorize(question: str) -> np.ndarray:
+    """Sublinear term counts of the question's character n-grams and words"""
+    text = normalize_question(question)
+    padded = f" {text} "
+    features = [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+    features.extend(f"w:{word}" for word in text.split())
+    counts = np.zeros(DIMENSIONS, dtype=np.float32)
+    if features:
+        indices = [zlib.crc32(feature.encode('utf-8')) % DIMENSIONS for feature in features]
+        np.add.at(counts, indices, 1.0)
+        nonzero = counts > 0
+        counts[nonzero] = 1.0 + np.log(counts[nonzero])
+    return counts
+
+
+def question_terms(question: str) -> frozenset:
+    """Content words and numbers of a question, plurals folded (short tokens like "us" kept as is)"""
+    return frozenset(word[:-1] if len(word) > 3 and word.endswith('s') else word
+                     for word in keywords(normalize_question(question)))
+
+
+class _CompanyQuestions:
+    """Stored question vectors of one company, oldest first"""
+
+    def __init__(self):
+        self.matrix = np.zeros((0, DIMENSIONS), dtype=np.float32)
+        self.keys: List[str] = []
+        self.digests: List[str] = []
+        self.terms: List[frozenset] = []
+
+
+class SemanticCache:
+    """Thread-safe near-duplicate question lookup with hit-rate and similarity metrics"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, max_per_company: int = DEFAULT_MAX_PER_COMPANY):
+        self.threshold = threshold
+        self.max_per_company = max_per_company
+        self._lock = threading.Lock()
+        self._companies: Dict[str, _CompanyQuestions] = {}
+        # Document frequencies over every stored question, for IDF weighting
+        self._doc_freq = np.zeros(DIMENSIONS, dtype=np.float32)
+        for seed in SEED_QUESTIONS:
+            self._doc_freq += vectorize(seed) > 0
+        self._doc_count = len(SEED_QUESTIONS)
+        self.lookups = 0
+        self.hits = 0
+        self._similarity_counts = np.zeros(len(HISTOGRAM_EDGES) - 1, dtype=np.int64)
+
+    def _idf(self) -> np.ndarray:
+        """Smoothed IDF weights; caller must hold the lock"""
+        return np.log((1.0 + self._doc_count) / (1.0 + self._doc_freq)) + 1.0
+
+    def candidates(self, company_name: str, question: str, context_digest: str) -> List[str]:
+        """Chat cache keys of stored questions similar enough to reuse, best match first"""
+        query = vectorize(question)
+        terms = question_terms(question)
+        with self._lock:
+            self.lookups += 1
+            entries = self._companies.get(company_name)
+            keys = []
+            best = 0.0
+            if entries is not None and entries.keys and query.any():
+                idf = self._idf()
+                weighted_query = query * idf
+                weighted_query /= np.linalg.norm(weighted_query)
+                weighted = entries.matrix * idf
+                norms = np.linalg.norm(weighted, axis=1)
+                norms[norms == 0] = 1.0
+                similarities = (weighted @ weighted_query) / norms
+                # Same company context and the same content words and numbers, or no reuse
+                comparable = np.array([digest == context_digest and stored == terms
+                                       for digest, stored in zip(entries.digests, entries.terms)])
+                similarities[~comparable] = 0.0
+                best = float(similarities.max())
+                order = np.argsort(-similarities)
+                keys = [entries.keys[i] for i in order if similarities[i] >= self.threshold]
+
+            bucket = min(np.searchsorted(HISTOGRAM_EDGES, best, side='right') - 1, len(self._similarity_counts) - 1)
+            self._similarity_counts[bucket] += 1
+            should_log = self.lookups % LOG_EVERY == 0
+
+        if keys:
+            logger.info(f"🧠 Semantic match for '{question[:50]}' at {company_name} (similarity {best:.2f})")
+        if should_log:
+            logger.info(f"🧠 Semantic cache stats: {self.stats()}")
+        return keys
+
+    def record_hit(self):
+        """Count a lookup whose candidate answer was actually served"""
+        with self._lock:
+            self.hits += 1
+
+    def add(self, company_name: str, question: str, context_digest: str, chat_key: str):
+        """Remember that chat_key answers this question for the company"""
+        vector = vectorize(question)
+        if not vector.any():
+            return
+        with self._lock:
+            entries = self._companies.setdefault(company_name, _CompanyQuestions())
+            if chat_key in entries.keys:
+                return
+            entries.matrix = np.vstack([entries.matrix, vector])
+            entries.keys.append(chat_key)
+            entries.digests.append(context_digest)
+            entries.terms.append(question_terms(question))
+            self._doc_freq += vector > 0
+            self._doc_count += 1
+            while len(entries.keys) > self.max_per_company:
+                self._remove_row(entries, 0)
+
+    def _remove_row(self, entries: _CompanyQuestions, row: int):
+        """Drop one stored question; caller must hold the lock"""
+        self._doc_freq -= entries.matrix[row] > 0
+        self._doc_count -= 1
+        entries.matrix = np.delete(entries.matrix, row, axis=0)
+        del entries.keys[row]
+        del entries.digests[row]
+        del entries.terms[row]
+
+    def invalidate_company(self, company_name: str):
+        """Forget every stored question of a company"""
+        with self._lock:
+            entries = self._companies.pop(company_name, None)
+            if entries is not None and entries.keys:
+                self._doc_freq -= (entries.matrix > 0).sum(axis=0)
+                self._doc_count -= len(entries.keys)
+
+    def stats(self) -> Dict:
+        """Hit rate, size and the distribution of best-match similarities"""
+        with self._lock:
+            histogram = {
+                f"{low:.1f}-{high:.1f}": int(count)
+                for low, high, count in zip(HISTOGRAM_EDGES[:-1], HISTOGRAM_EDGES[1:], self._similarity_counts)
+            }
+            return {
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+                'questions': self._doc_count - len(SEED_QUESTIONS),
+                'companies': len(self._companies),
+                'threshold': self.threshold,
+                'similarity_histogram': histogram,
+            }
+
+
+def create_semantic_cache() -> SemanticCache:
+    """Semantic cache configured from SEMANTIC_CACHE_THRESHOLD / SEMANTIC_CACHE_MAX_PER_COMPANY"""
+    return SemanticCache(
+        threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', DEFAULT_THRESHOLD)),
+        max_per_company=int(os.getenv('SEMANTIC_CACHE_MAX_PER_COMPANY', DEFAULT_MAX_PER_COMPANY)),
+    )
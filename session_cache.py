@@ -0,0 +1,249 @@
+"""Byte-budgeted per-session AI cache
+
+Each browser session keeps the insights and news it has shown in a SessionCache. It is an
+LRU with a TTL and a per-session byte budget, and all sessions of the process also share
+a global byte budget. When the global budget is exceeded, the least recently used entry
+across all sessions is evicted first. Sizes are measured with sys.getsizeof. Cached values
+are usually the same string objects the process-wide response cache holds, so the global
+budget counts each distinct object once, however many sessions reference it: it tracks the
+memory the session caches keep alive rather than the sum of every session's view. A session's
+own budget still charges it for everything it references.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterable, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_MAX_BYTES = 2 * 1024 * 1024
+DEFAULT_GLOBAL_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 60 * 60
+
+# Log the footprint every this many stores, on top of every eviction
+LOG_EVERY = 100
+
+_MISSING = object()
+
+
+def entry_size(key: str, value) -> int:
+    """Bytes held by one cache entry"""
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class SessionCacheBudget:
+    """Process-wide byte budget and eviction counters shared by every SessionCache"""
+
+    def __init__(self, max_bytes: int = DEFAULT_GLOBAL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        self._caches = weakref.WeakSet()
+        self.evictions: Dict[str, int] = {'session_budget': 0, 'global_budget': 0, 'expired': 0, 'oversized': 0}
+        self.stores = 0
+        # Bytes of distinct keys and values held by all sessions
+        self.bytes = 0
+        # id(object) -> [object, references from session entries, size]; holding the object keeps its id unique
+        self._objects: Dict[int, list] = {}
+
+    def register(self, cache: "SessionCache"):
+        with self.lock:
+            self._caches.add(cache)
+
+    def acquire(self, *objects):
+        """Count objects a session entry now references; caller must hold the lock"""
+        for obj in objects:
+            tracked = self._objects.get(id(obj))
+            if tracked is None:
+                size = sys.getsizeof(obj)
+                self._objects[id(obj)] = [obj, 1, size]
+                self.bytes += size
+            else:
+                tracked[1] += 1
+
+    def release(self, *objects):
+        """Forget references from a dropped session entry; caller must hold the lock"""
+        for obj in objects:
+            tracked = self._objects[id(obj)]
+            tracked[1] -= 1
+            if not tracked[1]:
+                del self._objects[id(obj)]
+                self.bytes -= tracked[2]
+
+    def release_entries(self, entries: Dict):
+        """Forget every entry of a session cache that was garbage collected"""
+        with self.lock:
+            for key, (value, _, _, _) in entries.items():
+                self.release(key, value)
+
+    def enforce(self) -> int:
+        """Evict globally least recently used entries until under budget; caller must hold the lock"""
+        evicted = 0
+        # Dropping an entry only frees its value once no other session references it
+        while self.bytes > self.max_bytes:
+            candidates = [cache for cache in list(self._caches) if cache.bytes]
+            if not candidates:
+                break
+            oldest = min(candidates, key=lambda cache: cache.oldest_access())
+            oldest.evict_oldest()
+            evicted += 1
+        if evicted:
+            self.evictions['global_budget'] += evicted
+        return evicted
+
+    def invalidate(self, keys: Iterable[str]) -> int:
+        """Drop these keys from every session, e.g. when a company's data changed; returns the count"""
+        keys = list(keys)
+        dropped = 0
+        with self.lock:
+            for cache in list(self._caches):
+                for key in keys:
+                    if cache.pop(key, None) is not None:
+                        dropped += 1
+        return dropped
+
+    def stats(self) -> Dict:
+        """Footprint and eviction counters across all sessions"""
+        with self.lock:
+            caches = list(self._caches)
+            return {
+                'sessions': len(caches),
+                'entries': sum(len(cache) for cache in caches),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': dict(self.evictions),
+            }
+
+
+class SessionCache:
+    """Dict-like LRU/TTL cache for one session, bounded in bytes"""
+
+    def __init__(self, budget: SessionCacheBudget, max_bytes: int = DEFAULT_SESSION_MAX_BYTES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.budget = budget
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.bytes = 0
+        # key -> (value, size, expires_at, last access)
+        self._entries: "OrderedDict[str, Tuple[object, int, float, float]]" = OrderedDict()
+        budget.register(self)
+        # The budget holds references to this session's values; give them back when the session goes
+        weakref.finalize(self, budget.release_entries, self._entries)
+
+    def get(self, key: str, default=None):
+        """Cached value (refreshing its recency), or default if missing or expired"""
+        now = time.time()
+        with self.budget.lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= now:
+                self._drop(key)
+                self.budget.evictions['expired'] += 1
+                entry = None
+            if entry is None:
+                metrics.inc('cache_requests_total', cache='session', result='miss')
+                return default
+            value, size, expires_at, _ = entry
+            self._entries[key] = (value, size, expires_at, now)
+            self._entries.move_to_end(key)
+            metrics.inc('cache_requests_total', cache='session', result='hit')
+            return value
+
+    def set(self, key: str, value):
+        """Store a value, evicting this session's LRU entries and then global ones as needed"""
+        size = entry_size(key, value)
+        now = time.time()
+        with self.budget.lock:
+            self.pop(key, None)
+            # Sessions hold few entries, so sweeping expired ones on every store is cheap
+            expired = [k for k, entry in self._entries.items() if entry[2] <= now]
+            for expired_key in expired:
+                self._drop(expired_key)
+            self.budget.evictions['expired'] += len(expired)
+            if size > self.max_bytes:
+                self.budget.evictions['oversized'] += 1
+                logger.warning(f"⚠️ Not caching {key} in session: {size} bytes exceeds the {self.max_bytes} byte budget")
+                return
+            self._entries[key] = (value, size, now + self.ttl_seconds, now)
+            self.bytes += size
+            self.budget.acquire(key, value)
+
+            session_evicted = 0
+            while self.bytes > self.max_bytes:
+                self.evict_oldest()
+                session_evicted += 1
+            self.budget.evictions['session_budget'] += session_evicted
+            global_evicted = self.budget.enforce()
+
+            self.budget.stores += 1
+            should_log = session_evicted or global_evicted or self.budget.stores % LOG_EVERY == 0
+        if should_log:
+            stats = self.budget.stats()
+            logger.info(f"🧹 Session cache: evicted {session_evicted} (session) / {global_evicted} (global); "
+                        f"session {self.bytes / 1024:.0f} KB in {len(self)} entries, "
+                        f"all sessions {stats['bytes'] / 1024:.0f} KB in {stats['entries']} entries "
+                        f"across {stats['sessions']} sessions; totals {stats['evictions']}")
+
+    def pop(self, key: str, default=_MISSING):
+        """Remove and return a value"""
+        with self.budget.lock:
+            if key in self._entries:
+                return self._drop(key)
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    def _drop(self, key: str):
+        """Remove an entry and release its bytes; caller must hold the lock"""
+        value, size, _, _ = self._entries.pop(key)
+        self.bytes -= size
+        self.budget.release(key, value)
+        return value
+
+    def oldest_access(self) -> float:
+        """Last access time of the least recently used entry; caller must hold the lock"""
+        return next(iter(self._entries.values()))[3] if self._entries else float('inf')
+
+    def evict_oldest(self) -> int:
+        """Drop the least recently used entry; returns the bytes released from this session"""
+        key, (value, size, _, _) = self._entries.popitem(last=False)
+        self.bytes -= size
+        self.budget.release(key, value)
+        return size
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key: str):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value):
+        self.set(key, value)
+
+    def __delitem__(self, key: str):
+        self.pop(key)
+
+    def __len__(self) -> int:
+        with self.budget.lock:
+            return len(self._entries)
+
+
+def create_session_cache_budget() -> SessionCacheBudget:
+    """Global budget from SESSION_CACHE_GLOBAL_MAX_BYTES"""
+    return SessionCacheBudget(max_bytes=int(os.getenv('SESSION_CACHE_GLOBAL_MAX_BYTES', DEFAULT_GLOBAL_MAX_BYTES)))
+
+
+def create_session_cache(budget: SessionCacheBudget) -> SessionCache:
+    """Per-session cache from SESSION_CACHE_MAX_BYTES / SESSION_CACHE_TTL_SECONDS"""
+    return SessionCache(
+        budget,
+        max_bytes=int(os.getenv('SESSION_CACHE_MAX_BYTES', DEFAULT_SESSION_MAX_BYTES)),
+        ttl_seconds=float(os.getenv('SESSION_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS)),
+    )
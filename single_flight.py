@@ -0,0 +1,53 @@
+"""Request coalescing: concurrent callers with the same key share one in-flight call"""
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Process-wide single-flight group keyed by cache key
+
+    The first caller for a key runs the function; everyone who arrives while it is running
+    waits on the same future and receives the same result or exception. Nothing is kept
+    once the call finishes, so a failed call is retried by the next caller.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def do(self, key: str, fn: Callable, *args, **kwargs):
+        """Run fn(*args, **kwargs) once for all concurrent callers with this key"""
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not is_leader:
+            logger.info(f"⏳ Joining in-flight request for: {key}")
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._forget(key)
+            future.set_exception(e)
+            raise
+        self._forget(key)
+        future.set_result(result)
+        return result
+
+    def _forget(self, key: str):
+        """Drop the finished call so later callers start a fresh one"""
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        """Number of calls currently running"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,28 @@
+"""Request validation of the HTTP API"""
+import pandas as pd
+import pytest
+from starlette.testclient import TestClient
+
+from api import create_app
+from investor_service import InvestorService
+
+
+@pytest.fixture
+def client():
+    df = pd.DataFrame({'Investors': ['Acme Capital', 'Beta Partners'],
+                       'Description': ['Buyout investor', 'Growth investor']})
+    with TestClient(create_app(InvestorService(df))) as test_client:
+        yield test_client
+
+
+@pytest.mark.parametrize('history, message', [
+    ({'user': 'hi'}, "history must be a list"),
+    (['hi'], "history[0] must be a"),
+    ([{'user': 'hi'}], "history[0].assistant must be a string"),
+    ([{'user': 'hi', 'assistant': 'hello'}, {'user': 3, 'assistant': 'x'}], "history[1].user must be a string"),
+    ([{'user': 'hi', 'assistant': None}], "history[0].assistant must be a string"),
+])
+def test_chat_rejects_malformed_history(client, history, message):
+    response = client.post('/api/companies/0/chat', json={'question': "What do they do?", 'history': history})
+    assert response.status_code == 400
+    assert message in response.json()['error']
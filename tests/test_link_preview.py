@@ -0,0 +1,85 @@
+"""LinkPreviewer against a local HTTP stub server"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from link_preview import LinkPreviewer, extract_urls
+
+DELAY_SECONDS = 0.5
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.path)
+        if self.path.startswith('/missing'):
+            self.send_error(404)
+            return
+        time.sleep(DELAY_SECONDS)
+        body = (f"<html><head><title>Article {self.path}</title>"
+                f"<meta name='description' content='About {self.path}'></head>"
+                f"<body>{'x' * 100_000}</body></html>").encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except ConnectionError:
+            pass  # the previewer stops reading after </head>
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubHandler.requests_seen = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_many_links_are_fetched_concurrently(stub_server):
+    previewer = LinkPreviewer(max_workers=8)
+    urls = [f"{stub_server}/article-{i}" for i in range(6)]
+
+    started = time.perf_counter()
+    previews = previewer.get_many(urls + urls[:2])
+    elapsed = time.perf_counter() - started
+
+    assert list(previews) == urls
+    assert previews[urls[0]]['title'] == "Article /article-0"
+    assert previews[urls[0]]['description'] == "About /article-0"
+    # Six half-second pages in well under six times the delay
+    assert elapsed < 3 * DELAY_SECONDS
+    assert len(StubHandler.requests_seen) == 6
+
+    # Served from the cache without touching the server
+    previewer.get_many(urls)
+    assert len(StubHandler.requests_seen) == 6
+
+
+def test_failures_are_cached(stub_server):
+    previewer = LinkPreviewer()
+    url = f"{stub_server}/missing"
+
+    first = previewer.get(url)
+    second = previewer.get(url)
+
+    assert first == second
+    assert first['title'] == "Link preview unavailable"
+    assert StubHandler.requests_seen == ['/missing']
+
+
+def test_extract_urls_from_news_markdown():
+    news = ("**Source:** Reuters  \n**Link:** https://www.reuters.com/deal.  \n"
+            "[PE Hub](https://pehub.com/a?b=1) and again https://www.reuters.com/deal "
+            "https://vertexaisearch.cloud.google.com/redirect")
+    assert extract_urls(news) == ["https://www.reuters.com/deal", "https://pehub.com/a?b=1"]
@@ -0,0 +1,17 @@
+"""Prewarm records one cache lookup per section"""
+from benchmarks.fake_gemini import FakeGeminiClient
+from prewarm import prewarm
+from response_cache import ResponseCache
+
+
+def test_prewarm_counts_one_miss_per_generated_section():
+    client = FakeGeminiClient(latency_seconds=0, time_to_first_token_seconds=0, response_words=20)
+    cache = ResponseCache()
+
+    stats = prewarm(client, ['Acme Capital', 'Beta Partners'], cache, max_workers=2)
+    assert stats['generated'] == 4
+    assert (cache.hits, cache.misses) == (0, 4)
+
+    stats = prewarm(client, ['Acme Capital', 'Beta Partners'], cache, max_workers=2)
+    assert stats['cached'] == 4
+    assert (cache.hits, cache.misses) == (0, 4)
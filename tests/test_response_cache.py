@@ -0,0 +1,43 @@
+"""SQLite failures fall back to memory, and hits do not write to disk one by one"""
+import response_cache
+from response_cache import ResponseCache
+
+
+def test_database_errors_fall_back_to_memory(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / 'responses.db'))
+    cache.set('a', 'answer a', company='Acme')
+    cache._db.close()  # every later SQLite call raises sqlite3.ProgrammingError
+
+    assert cache.get('a') == 'answer a'
+    assert cache.get('missing') is None
+    cache.set('b', 'answer b', company='Acme')
+    assert cache.get('b') == 'answer b'
+    cache.delete('a')
+    assert cache.get('a') is None
+    cache.invalidate_company('Acme')
+    assert cache.get('b') is None
+
+
+def test_hits_batch_access_time_updates(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'responses.db')
+    ResponseCache(db_path=db_path).set('a', 'answer a', company='Acme')
+    cache = ResponseCache(db_path=db_path)
+    statements = []
+    cache._db.set_trace_callback(statements.append)
+
+    for _ in range(5):
+        assert cache.get('a') == 'answer a'
+    assert not [sql for sql in statements if sql.startswith('UPDATE')]
+
+    # Written together once the flush interval has passed
+    monkeypatch.setattr(response_cache, 'ACCESS_FLUSH_SECONDS', 0)
+    assert cache.get('a') == 'answer a'
+    assert len([sql for sql in statements if sql.startswith('UPDATE')]) == 1
+
+
+def test_peek_is_not_counted():
+    cache = ResponseCache()
+    cache.set('a', 'answer a')
+    assert cache.peek('a') == 'answer a'
+    assert cache.peek('missing') is None
+    assert (cache.hits, cache.misses) == (0, 0)
@@ -0,0 +1,34 @@
+"""Semantic answer reuse must not cross years, countries or other content words"""
+from semantic_cache import SemanticCache
+
+COMPANY = 'Accel-KKR'
+DIGEST = 'context'
+
+
+def make_cache() -> SemanticCache:
+    cache = SemanticCache()
+    cache.add(COMPANY, "How many deals did they do in 2024?", DIGEST, 'deals-2024')
+    cache.add(COMPANY, "Do they invest in the UK?", DIGEST, 'invest-uk')
+    cache.add(COMPANY, "What is their investment strategy?", DIGEST, 'strategy')
+    return cache
+
+
+def test_different_year_is_not_reused():
+    cache = make_cache()
+    assert cache.candidates(COMPANY, "How many deals did they do in 2023?", DIGEST) == []
+
+
+def test_different_country_code_is_not_reused():
+    cache = make_cache()
+    assert cache.candidates(COMPANY, "Do they invest in the US?", DIGEST) == []
+
+
+def test_rewording_is_reused():
+    cache = make_cache()
+    assert cache.candidates(COMPANY, "What's their investment strategy", DIGEST) == ['strategy']
+    assert cache.candidates(COMPANY, "how many deals did they do in 2024", DIGEST) == ['deals-2024']
+
+
+def test_other_context_is_not_reused():
+    cache = make_cache()
+    assert cache.candidates(COMPANY, "What is their investment strategy?", 'other') == []
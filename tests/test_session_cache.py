@@ -0,0 +1,45 @@
+"""The global session budget counts an object shared by several sessions once"""
+import gc
+import sys
+
+from session_cache import SessionCache, SessionCacheBudget
+
+SHARED = "x" * 10_000
+
+
+def test_shared_values_count_once():
+    budget = SessionCacheBudget(max_bytes=10 * 1024 * 1024)
+    sessions = [SessionCache(budget) for _ in range(5)]
+    for session in sessions:
+        session.set('insights_1', SHARED)
+
+    # One value plus one key string (the literal is interned, so shared as well)
+    assert budget.stats()['bytes'] == sys.getsizeof(SHARED) + sys.getsizeof('insights_1')
+    assert all(session.bytes > sys.getsizeof(SHARED) for session in sessions)
+
+    for session in sessions[:4]:
+        session.pop('insights_1')
+    assert budget.stats()['bytes'] == sys.getsizeof(SHARED) + sys.getsizeof('insights_1')
+    sessions[4].pop('insights_1')
+    assert budget.stats()['bytes'] == 0
+
+
+def test_global_budget_is_not_exceeded_by_shared_values():
+    size = sys.getsizeof(SHARED)
+    budget = SessionCacheBudget(max_bytes=3 * size)
+    sessions = [SessionCache(budget) for _ in range(10)]
+    for session in sessions:
+        session.set('insights_1', SHARED)
+    # Ten sessions holding one string fit in a budget of three copies
+    assert budget.evictions['global_budget'] == 0
+    assert all('insights_1' in session for session in sessions)
+
+
+def test_collected_session_releases_its_values():
+    budget = SessionCacheBudget()
+    session = SessionCache(budget)
+    session.set('news_1', "y" * 5_000)
+    assert budget.stats()['bytes'] > 0
+    del session
+    gc.collect()
+    assert budget.stats()['bytes'] == 0